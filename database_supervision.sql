@@ -1,10 +1,17 @@
 -- database_supervision.sql
+-- 可重复执行：已有数据库再次执行时只补齐缺少的表、列、索引并替换触发器
 -- PM全访问账户创建
-CREATE USER pm_supervisor WITH PASSWORD 'encrypted_secure_password';
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'pm_supervisor') THEN
+        CREATE USER pm_supervisor WITH PASSWORD 'encrypted_secure_password';
+    END IF;
+END
+$$;
 GRANT ALL PRIVILEGES ON DATABASE your_project TO pm_supervisor;
 
 -- 监督专用表
-CREATE TABLE pm_supervision_log (
+CREATE TABLE IF NOT EXISTS pm_supervision_log (
     id SERIAL PRIMARY KEY,
     feature_name VARCHAR(255),
     completion_percentage INTEGER,
@@ -13,7 +20,7 @@ CREATE TABLE pm_supervision_log (
     status VARCHAR(50)
 );
 
-CREATE TABLE development_milestones (
+CREATE TABLE IF NOT EXISTS development_milestones (
     id SERIAL PRIMARY KEY,
     project_id INTEGER,
     milestone_name VARCHAR(255),
@@ -23,28 +30,181 @@ CREATE TABLE development_milestones (
     assigned_developer VARCHAR(100)
 );
 
-CREATE TABLE pm_intervention_required (
+CREATE TABLE IF NOT EXISTS pm_intervention_required (
     id SERIAL PRIMARY KEY,
     feature_name VARCHAR(255),
     missing_components TEXT[],
+    issue TEXT,
+    severity VARCHAR(20),
+    source VARCHAR(20) DEFAULT 'api',      -- api: /intervention接口；audit: 审计触发器
+    hit_count INTEGER NOT NULL DEFAULT 1,  -- 合并的重复次数
+    last_seen_at TIMESTAMP DEFAULT NOW(),
+    resolved_at TIMESTAMP,
+    fingerprint CHAR(64),                  -- /intervention的内容指纹（问题+功能+严重程度），用于合并重复干预
     created_at TIMESTAMP DEFAULT NOW()
 );
 
--- 自动化监督函数
+-- 按天、状态汇总的审计统计，由触发器增量维护，报表不需要扫描原始日志
+CREATE TABLE IF NOT EXISTS pm_supervision_daily (
+    day DATE NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT '',
+    audits INTEGER NOT NULL DEFAULT 0,
+    complete_audits INTEGER NOT NULL DEFAULT 0,   -- completion_percentage >= 100
+    scored_audits INTEGER NOT NULL DEFAULT 0,     -- completion_percentage 非空（达标率的分母）
+    completion_sum BIGINT NOT NULL DEFAULT 0,
+    last_audit_at TIMESTAMP,
+    PRIMARY KEY (day, status)
+);
+
+-- 旧版本创建的干预表补列（与 supervision_store.PostgresSupervisionStore.MIGRATIONS 一致，服务启动时也会执行）
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS issue TEXT;
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS severity VARCHAR(20);
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS source VARCHAR(20) DEFAULT 'api';
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS hit_count INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP DEFAULT NOW();
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP;
+ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS fingerprint CHAR(64);
+
+-- 汇总表新增的列没有历史值，清空后由文件末尾的回填按原始日志重建
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'pm_supervision_daily' AND column_name = 'scored_audits') THEN
+        ALTER TABLE pm_supervision_daily ADD COLUMN scored_audits INTEGER NOT NULL DEFAULT 0;
+        DELETE FROM pm_supervision_daily;
+    END IF;
+END
+$$;
+
+-- 索引
+CREATE INDEX IF NOT EXISTS idx_supervision_log_feature_name ON pm_supervision_log (feature_name);
+CREATE INDEX IF NOT EXISTS idx_supervision_log_audit_timestamp ON pm_supervision_log (audit_timestamp);
+CREATE INDEX IF NOT EXISTS idx_supervision_log_status ON pm_supervision_log (status, audit_timestamp);
+CREATE INDEX IF NOT EXISTS idx_intervention_feature_name ON pm_intervention_required (feature_name);
+CREATE INDEX IF NOT EXISTS idx_intervention_created_at ON pm_intervention_required (created_at);
+CREATE INDEX IF NOT EXISTS idx_intervention_fingerprint ON pm_intervention_required (fingerprint, created_at);
+-- 每个功能最多一条未解决的审计干预（触发器按此去重）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_intervention_open_audit_feature
+    ON pm_intervention_required (feature_name)
+    WHERE source = 'audit' AND resolved_at IS NULL;
+
+-- 自动化监督函数（语句级，通过转换表一次处理整条语句影响的所有行）
+-- 1. 未完成的功能：每个功能只保留一条未解决的干预，重复审计只更新缺失组件、最近时间和次数（仅INSERT）
+-- 2. 已完成的功能：关闭该功能未解决的审计干预（仅INSERT）
+-- 3. 增量维护 pm_supervision_daily（UPDATE/DELETE 先减去旧行）
 CREATE OR REPLACE FUNCTION check_feature_completion()
 RETURNS TRIGGER AS $$
 BEGIN
-    IF NEW.completion_percentage < 100 THEN
-        INSERT INTO pm_intervention_required (feature_name, missing_components)
-        VALUES (NEW.feature_name, NEW.missing_components);
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE pm_supervision_daily AS d
+        SET audits = d.audits - o.audits,
+            complete_audits = d.complete_audits - o.complete_audits,
+            scored_audits = d.scored_audits - o.scored_audits,
+            completion_sum = d.completion_sum - o.completion_sum
+        FROM (
+            SELECT COALESCE(audit_timestamp, NOW())::date AS day, COALESCE(status, '') AS status,
+                   COUNT(*) AS audits,
+                   COUNT(*) FILTER (WHERE completion_percentage >= 100) AS complete_audits,
+                   COUNT(completion_percentage) AS scored_audits,
+                   COALESCE(SUM(completion_percentage), 0) AS completion_sum
+            FROM old_rows
+            GROUP BY 1, 2
+        ) AS o
+        WHERE d.day = o.day AND d.status = o.status;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO pm_supervision_daily AS d
+            (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+        SELECT COALESCE(audit_timestamp, NOW())::date, COALESCE(status, ''),
+               COUNT(*),
+               COUNT(*) FILTER (WHERE completion_percentage >= 100),
+               COUNT(completion_percentage),
+               COALESCE(SUM(completion_percentage), 0),
+               MAX(audit_timestamp)
+        FROM new_rows
+        GROUP BY 1, 2
+        ON CONFLICT (day, status) DO UPDATE
+        SET audits = d.audits + EXCLUDED.audits,
+            complete_audits = d.complete_audits + EXCLUDED.complete_audits,
+            scored_audits = d.scored_audits + EXCLUDED.scored_audits,
+            completion_sum = d.completion_sum + EXCLUDED.completion_sum,
+            last_audit_at = GREATEST(d.last_audit_at, EXCLUDED.last_audit_at);
     END IF;
-    RETURN NEW;
+
+    -- 干预只由新审计产生或关闭；修正、删除历史审计只调整汇总
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO pm_intervention_required AS i
+            (feature_name, missing_components, issue, severity, source, hit_count, last_seen_at, created_at)
+        SELECT feature_name, missing_components, 'feature_incomplete', 'high', 'audit',
+               hits, last_seen, first_seen
+        FROM (
+            -- 每个功能取最近一次审计的缺失组件
+            SELECT DISTINCT ON (feature_name)
+                   feature_name, missing_components,
+                   COUNT(*) OVER w AS hits,
+                   MIN(audit_timestamp) OVER w AS first_seen,
+                   MAX(audit_timestamp) OVER w AS last_seen
+            FROM new_rows
+            WHERE completion_percentage < 100
+            WINDOW w AS (PARTITION BY feature_name)
+            ORDER BY feature_name, audit_timestamp DESC, id DESC
+        ) AS incomplete
+        ON CONFLICT (feature_name) WHERE source = 'audit' AND resolved_at IS NULL
+        DO UPDATE
+        SET missing_components = EXCLUDED.missing_components,
+            hit_count = i.hit_count + EXCLUDED.hit_count,
+            last_seen_at = GREATEST(i.last_seen_at, EXCLUDED.last_seen_at);
+
+        UPDATE pm_intervention_required AS i
+        SET resolved_at = c.completed_at
+        FROM (
+            SELECT feature_name, MAX(audit_timestamp) AS completed_at
+            FROM new_rows
+            WHERE completion_percentage >= 100
+            GROUP BY feature_name
+        ) AS c
+        WHERE i.source = 'audit' AND i.resolved_at IS NULL
+          AND i.feature_name = c.feature_name
+          AND i.last_seen_at <= c.completed_at;
+    END IF;
+
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
--- 创建触发器
-CREATE TRIGGER feature_completion_check
-AFTER INSERT OR UPDATE ON pm_supervision_log
-FOR EACH ROW
+-- 创建触发器（带转换表的触发器只能对应一种事件，因此按事件分别创建）
+DROP TRIGGER IF EXISTS feature_completion_check ON pm_supervision_log;
+DROP TRIGGER IF EXISTS feature_completion_check_insert ON pm_supervision_log;
+DROP TRIGGER IF EXISTS feature_completion_check_update ON pm_supervision_log;
+DROP TRIGGER IF EXISTS feature_completion_check_delete ON pm_supervision_log;
+
+CREATE TRIGGER feature_completion_check_insert
+AFTER INSERT ON pm_supervision_log
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_feature_completion();
+
+CREATE TRIGGER feature_completion_check_update
+AFTER UPDATE ON pm_supervision_log
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION check_feature_completion();
+
+CREATE TRIGGER feature_completion_check_delete
+AFTER DELETE ON pm_supervision_log
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
 EXECUTE FUNCTION check_feature_completion();
 
+-- 已有数据时回填每日汇总（汇总表为空时才执行）
+INSERT INTO pm_supervision_daily (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+SELECT COALESCE(audit_timestamp, NOW())::date, COALESCE(status, ''),
+       COUNT(*),
+       COUNT(*) FILTER (WHERE completion_percentage >= 100),
+       COUNT(completion_percentage),
+       COALESCE(SUM(completion_percentage), 0),
+       MAX(audit_timestamp)
+FROM pm_supervision_log
+WHERE NOT EXISTS (SELECT 1 FROM pm_supervision_daily)
+GROUP BY 1, 2;
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+审计任务队列
+有界队列 + 固定数量的审计工作线程，HTTP请求只负责入队并立即返回任务ID
+"""
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """审计队列已满"""
+
+
+class AuditJobQueue:
+    """审计任务队列与工作线程池"""
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 workers: int = 4, max_queue: int = 100,
+                 max_jobs: int = 10000, job_ttl: float = 3600,
+                 on_finish: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            handler: 执行一次审计的函数，参数为请求数据，返回审计结果
+            workers: 工作线程数
+            max_queue: 等待中任务的上限，超出时拒绝入队
+            max_jobs: 保留的任务记录上限（含已完成），超出时删除最早完成的任务
+            job_ttl: 已完成任务的保留秒数
+            on_finish: 任务完成或失败后调用，参数为任务记录（含payload），用于持久化等
+        """
+        self.handler = handler
+        self.on_finish = on_finish
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # 已结束任务的 ID -> 结束时间，按结束顺序排列，清理时只需从头部弹出
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"audit-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload: Dict[str, Any]) -> str:
+        """
+        提交审计任务
+
+        Returns:
+            任务ID
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'payload': payload,
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait(job_id)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise QueueFullError(f"审计队列已满（{self._queue.maxsize}）")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """返回任务状态（不含请求数据），不存在返回None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {k: v for k, v in job.items() if k != 'payload'}
+
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    job['status'] = 'running'
+                    job['started_at'] = time.time()
+            if job is None:
+                self._queue.task_done()
+                continue
+            try:
+                result = self.handler(job['payload'])
+                status, error = 'completed', None
+            except Exception as e:
+                logger.exception(f"审计任务失败: {job_id}")
+                result, status, error = None, 'failed', str(e)
+            with self._lock:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                if job_id in self._jobs:
+                    self._finished[job_id] = job['finished_at']
+            if self.on_finish is not None:
+                try:
+                    self.on_finish(job)
+                except Exception:
+                    logger.exception(f"审计任务完成回调失败: {job_id}")
+            self._queue.task_done()
+
+    def _prune(self):
+        """
+        按结束顺序删除超过保留时间或超出数量上限的已完成任务（调用方需持有锁）
+
+        最早结束的任务总在_finished头部，遇到第一个无需删除的任务即停止，均摊O(1)
+        """
+        cutoff = time.time() - self.job_ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at >= cutoff and len(self._jobs) < self.max_jobs:
+                break
+            self._finished.popitem(last=False)
+            self._jobs.pop(job_id, None)
+
+    def pending(self) -> int:
+        """等待执行的任务数（不加锁，供指标采集）"""
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回队列统计"""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'workers': len(self._threads),
+            'queue_size': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'jobs': counts
+        }
+
+    def join(self):
+        """等待队列中的任务全部处理完"""
+        self._queue.join()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+干预去重
+按内容指纹（问题 + 功能 + 严重程度）在时间窗口内合并重复的干预请求，
+窗口内的重复只累加次数，不再产生新的干预
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def _text(value: Any, default: str) -> str:
+    """任意JSON值转为文本（非字符串转为JSON文本），与存储层写入文本列的规则一致"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def intervention_key(data: Dict[str, Any]) -> Tuple[str, str, str]:
+    """返回规范化的 (问题, 功能, 严重程度)，缺省值与存储层一致"""
+    issue = _text(data.get('issue'), 'Unknown').strip()
+    feature = _text(data.get('feature_name') or data.get('feature'), 'unknown').strip()
+    severity = _text(data.get('severity'), 'medium').strip().lower()
+    return issue, feature, severity
+
+
+def fingerprint(data: Dict[str, Any]) -> str:
+    """干预的内容指纹（问题、功能、严重程度的SHA-256）"""
+    issue, feature, severity = intervention_key(data)
+    raw = '\x1f'.join((issue.lower(), feature.lower(), severity))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class InterventionDeduplicator:
+    """
+    带TTL的干预指纹缓存
+
+    条目按首次出现的时间顺序保存在OrderedDict中，窗口从首次出现算起（固定窗口），
+    因此过期条目总在头部，每次请求的查找、插入和清理都是均摊O(1)
+    """
+
+    def __init__(self, window: float = 300, max_entries: int = 10000):
+        """
+        Args:
+            window: 合并窗口（秒），首次出现后window秒内的相同干预合并为一条
+            max_entries: 缓存的指纹上限，超出时淘汰最早的条目
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, data: Dict[str, Any], now: Optional[float] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        登记一次干预请求
+
+        Args:
+            data: 干预请求数据
+            now: 当前时间戳，默认time.time()
+
+        Returns:
+            (条目副本, 是否为窗口内的首次出现)
+        """
+        now = time.time() if now is None else now
+        key = fingerprint(data)
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['hit_count'] += 1
+                entry['last_seen'] = now
+                return dict(entry), False
+            issue, feature, severity = intervention_key(data)
+            entry = self._entries[key] = {
+                'fingerprint': key,
+                'issue': issue,
+                'feature_name': feature,
+                'severity': severity,
+                'hit_count': 1,
+                'first_seen': now,
+                'last_seen': now
+            }
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return dict(entry), True
+
+    def warm(self, entries: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """
+        用存储中仍在窗口内的干预预热缓存（服务重启后继续合并）
+
+        Args:
+            entries: 含fingerprint、first_seen等字段的条目，需按first_seen升序
+
+        Returns:
+            载入的条目数
+        """
+        now = time.time() if now is None else now
+        loaded = 0
+        with self._lock:
+            for entry in entries:
+                if entry['first_seen'] < now - self.window or entry['fingerprint'] in self._entries:
+                    continue
+                self._entries[entry['fingerprint']] = dict(entry)
+                loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return loaded
+
+    def _expire(self, now: float):
+        """删除头部已过窗口的条目（调用方需持有锁）"""
+        cutoff = now - self.window
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry['first_seen'] >= cutoff:
+                break
+            self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回缓存统计"""
+        with self._lock:
+            return {
+                'window_seconds': self.window,
+                'entries': len(self._entries),
+                'capacity': self.max_entries
+            }
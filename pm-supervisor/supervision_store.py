@@ -0,0 +1,793 @@
+#!/usr/bin/env python3
+"""
+监督数据持久化
+审计记录写入 pm_supervision_log，干预记录写入 pm_intervention_required；
+写入先进入进程内缓冲区，由后台线程按批（多行INSERT）落库，重复干预的次数合并后批量UPDATE。
+配置了PostgreSQL时使用连接池，否则（或连接失败时）回退到本地SQLite
+"""
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psycopg2
+    import psycopg2.errors
+    from psycopg2.extras import execute_values
+    from psycopg2.pool import ThreadedConnectionPool
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+
+AUDIT_COLUMNS = ('feature_name', 'completion_percentage', 'missing_components', 'audit_timestamp', 'status')
+INTERVENTION_COLUMNS = ('feature_name', 'missing_components', 'issue', 'severity', 'fingerprint',
+                        'last_seen_at', 'created_at')
+
+
+class SupervisionStore:
+    """
+    带写缓冲的监督数据存储基类
+
+    record_* 只把记录追加到内存缓冲区；缓冲区达到batch_size或每隔flush_interval秒，
+    后台线程把整批记录一次写入数据库。数据库长时间不可用时缓冲区最多保留max_buffer条，
+    超出时丢弃最早的记录并计入stats['dropped']
+    """
+
+    backend = 'base'
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 1.0, max_buffer: int = 10000):
+        """
+        Args:
+            batch_size: 缓冲记录数达到该值时立即触发写入
+            flush_interval: 定时写入间隔（秒）
+            max_buffer: 审计、干预、重复次数缓冲区各自最多保留的记录数
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._audits: List[Tuple[Any, ...]] = []
+        self._interventions: List[Tuple[Any, ...]] = []
+        # (指纹, 干预创建时间) -> [新增次数, 最近出现时间]，同一干预的重复在缓冲区内合并
+        self._hits: Dict[Tuple[str, datetime], List[Any]] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.stats = {'audits_written': 0, 'interventions_written': 0, 'hits_written': 0,
+                      'flushes': 0, 'flush_errors': 0, 'dropped': 0, 'rejected': 0}
+
+        self._writer = threading.Thread(target=self._run_writer, name='supervision-writer', daemon=True)
+        self._writer.start()
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def _components(value: Any) -> List[str]:
+        if not value:
+            return []
+        if isinstance(value, (str, dict)) or not isinstance(value, (list, tuple, set)):
+            return [SupervisionStore._text(value, '')]
+        return [SupervisionStore._text(v, '') for v in value]
+
+    @staticmethod
+    def _text(value: Any, default: str, max_length: Optional[int] = None) -> str:
+        """把请求中的任意JSON值转为文本列的值（非字符串转为JSON文本），超长时截断"""
+        if value is None or value == '':
+            text = default
+        elif isinstance(value, str):
+            text = value
+        else:
+            text = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+        return text[:max_length] if max_length else text
+
+    @staticmethod
+    def _completion(value: Any) -> Optional[int]:
+        """完成度转为0-100的整数，无法解析或超出范围时为None"""
+        if isinstance(value, bool):
+            return None
+        try:
+            completion = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not 0 <= completion <= 100:
+            return None
+        return int(completion)
+
+    def record_audit(self, data: Dict[str, Any], result: Optional[Dict[str, Any]], status: str,
+                     timestamp: Optional[datetime] = None):
+        """
+        缓冲一条审计记录
+
+        Args:
+            data: 审计请求数据（feature_name/feature、completion_percentage、missing_components）
+            result: 审计结果，失败时为None
+            status: 任务状态（completed / failed）
+            timestamp: 审计时间，默认当前时间
+        """
+        result = result or {}
+        # 请求和结果都没有给出完成度时存NULL，不计入完成度统计
+        completion = data.get('completion_percentage', result.get('completion_percentage'))
+        row = (
+            self._text(data.get('feature_name') or data.get('feature'), 'unknown', 255),
+            self._completion(completion),
+            self._components(data.get('missing_components') or result.get('missing_components')),
+            timestamp or datetime.now(),
+            self._text(status, '', 50)
+        )
+        self._append(self._audits, row)
+
+    def record_intervention(self, data: Dict[str, Any], timestamp: Optional[datetime] = None,
+                            fingerprint: Optional[str] = None):
+        """
+        缓冲一条干预记录
+
+        Args:
+            data: 干预请求数据
+            timestamp: 创建时间，默认当前时间；与fingerprint一起标识这条干预，供record_intervention_hit使用
+            fingerprint: 干预的内容指纹（见intervention_dedup.fingerprint）
+        """
+        timestamp = timestamp or datetime.now()
+        row = (
+            self._text(data.get('feature_name') or data.get('feature'), 'unknown', 255),
+            self._components(data.get('missing_components')),
+            self._text(data.get('issue'), 'Unknown'),
+            self._text(data.get('severity'), 'medium', 20),
+            fingerprint,
+            timestamp,
+            timestamp
+        )
+        self._append(self._interventions, row)
+
+    def record_intervention_hit(self, fingerprint: str, created_at: datetime,
+                                timestamp: Optional[datetime] = None):
+        """
+        记录一次被合并的重复干预：累加该干预的hit_count并更新last_seen_at
+
+        Args:
+            fingerprint: 干预指纹
+            created_at: 被合并到的干预的创建时间（record_intervention的timestamp）
+            timestamp: 本次出现的时间，默认当前时间
+        """
+        timestamp = timestamp or datetime.now()
+        with self._buffer_lock:
+            hit = self._hits.get((fingerprint, created_at))
+            if hit is None:
+                self._hits[(fingerprint, created_at)] = [1, timestamp]
+            else:
+                hit[0] += 1
+                hit[1] = max(hit[1], timestamp)
+            self._trim()
+
+    def _append(self, buffer: List[Tuple[Any, ...]], row: Tuple[Any, ...]):
+        with self._buffer_lock:
+            buffer.append(row)
+            self._trim()
+            pending = len(self._audits) + len(self._interventions) + len(self._hits)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+
+    def _trim(self):
+        """缓冲区超过max_buffer时丢弃最早的记录（调用方需持有_buffer_lock）"""
+        dropped = 0
+        for buffer in (self._audits, self._interventions):
+            excess = len(buffer) - self.max_buffer
+            if excess > 0:
+                del buffer[:excess]
+                dropped += excess
+        excess = len(self._hits) - self.max_buffer
+        for key in list(itertools.islice(self._hits, max(excess, 0))):
+            dropped += self._hits.pop(key)[0]
+        if dropped:
+            self.stats['dropped'] += dropped
+            logger.warning(f"监督数据写缓冲区已满，丢弃 {dropped} 条最早的记录")
+
+    def flush(self):
+        """
+        把缓冲区中的记录全部写入数据库
+
+        整批写入失败时：数据库不可用等临时错误把记录放回缓冲区等待下次重试；
+        数据错误则逐条重写，写不进去的记录记日志后丢弃（计入stats['rejected']），不阻塞其他记录
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                audits, self._audits = self._audits, []
+                interventions, self._interventions = self._interventions, []
+                hits, self._hits = self._hits, {}
+            if not audits and not interventions and not hits:
+                return
+            hit_rows = [(fp, created_at, count, last_seen) for (fp, created_at), (count, last_seen) in hits.items()]
+            try:
+                self._write_batch(audits, interventions, hit_rows)
+            except Exception as e:
+                self.stats['flush_errors'] += 1
+                if not self._is_data_error(e):
+                    logger.error(f"监督数据写入失败，{len(audits) + len(interventions) + len(hits)} 条记录稍后重试: {e}")
+                    self._requeue(audits, interventions, hit_rows)
+                    return
+                logger.warning(f"监督数据批量写入失败，逐条重试: {e}")
+                audits, interventions, hit_rows = self._write_rows(audits, interventions, hit_rows)
+            self.stats['flushes'] += 1
+            self.stats['audits_written'] += len(audits)
+            self.stats['interventions_written'] += len(interventions)
+            self.stats['hits_written'] += sum(count for _, _, count, _ in hit_rows)
+
+    def _write_rows(self, audits, interventions, hit_rows):
+        """
+        逐条写入一批记录，返回实际写入的 (审计, 干预, 次数更新)
+
+        遇到临时错误时停止，剩余记录放回缓冲区
+        """
+        written = ([], [], [])
+        pending = [(0, row) for row in audits] + [(1, row) for row in interventions] + [(2, row) for row in hit_rows]
+        for i, (kind, row) in enumerate(pending):
+            batch = ([], [], [])
+            batch[kind].append(row)
+            try:
+                self._write_batch(*batch)
+            except Exception as e:
+                if not self._is_data_error(e):
+                    logger.error(f"监督数据写入失败，{len(pending) - i} 条记录稍后重试: {e}")
+                    rest = ([], [], [])
+                    for rest_kind, rest_row in pending[i:]:
+                        rest[rest_kind].append(rest_row)
+                    self._requeue(*rest)
+                    break
+                self.stats['rejected'] += 1
+                logger.error(f"丢弃无法写入的监督记录 {row!r}: {e}")
+                continue
+            written[kind].append(row)
+        return written
+
+    def _requeue(self, audits, interventions, hit_rows):
+        """把写入失败的记录放回缓冲区头部（保持先后顺序）"""
+        with self._buffer_lock:
+            self._audits[:0] = audits
+            self._interventions[:0] = interventions
+            for fp, created_at, count, last_seen in hit_rows:
+                hit = self._hits.setdefault((fp, created_at), [0, last_seen])
+                hit[0] += count
+                hit[1] = max(hit[1], last_seen)
+            self._trim()
+
+    def _run_writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def pending(self) -> int:
+        """缓冲区中尚未写入的记录数"""
+        with self._buffer_lock:
+            return len(self._audits) + len(self._interventions) + len(self._hits)
+
+    def close(self):
+        """停止后台线程并写入剩余记录"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join(timeout=self.flush_interval + 5)
+        self.flush()
+        self._close_connection()
+
+    # ---- 查询 ----
+
+    def report(self, days: Optional[int] = None) -> Dict[str, Any]:
+        """
+        汇总监督数据（先写入缓冲区，保证包含最新记录）
+
+        Args:
+            days: 只统计最近days天，None表示全部
+        """
+        self.flush()
+        since = datetime.now() - timedelta(days=days) if days else None
+        (by_status, total, compliant, scored, last_audit,
+         interventions, features, open_interventions) = self._aggregate(since)
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'period_days': days,
+            'total_audits': total,
+            'audits_by_status': by_status,
+            'interventions': interventions,
+            'open_interventions': open_interventions,
+            'features_requiring_intervention': features,
+            # 达标率只按给出了完成度的审计计算
+            'compliance_rate': round(compliant * 100 / scored, 2) if scored else 100,
+            'last_audit': last_audit,
+            'backend': self.backend
+        }
+
+    def recent_interventions(self, since: datetime) -> List[Dict[str, Any]]:
+        """
+        返回since之后创建、带指纹的未解决干预（按创建时间升序），用于预热去重缓存
+
+        Returns:
+            含 fingerprint、issue、feature_name、severity、hit_count、first_seen、last_seen 的字典列表，
+            时间为Unix时间戳
+        """
+        self.flush()
+        entries = []
+        for fp, issue, feature, severity, hit_count, created_at, last_seen_at in self._recent_interventions(since):
+            created_at, last_seen_at = (
+                datetime.fromisoformat(v) if isinstance(v, str) else v for v in (created_at, last_seen_at or created_at)
+            )
+            entries.append({
+                'fingerprint': fp,
+                'issue': issue,
+                'feature_name': feature,
+                'severity': severity,
+                'hit_count': int(hit_count),
+                'first_seen': created_at.timestamp(),
+                'last_seen': last_seen_at.timestamp()
+            })
+        return entries
+
+    # ---- 子类实现 ----
+
+    def _is_data_error(self, error: Exception) -> bool:
+        """写入失败是否由记录内容引起（逐条重试并丢弃坏记录），否则视为数据库临时不可用"""
+        return isinstance(error, (TypeError, ValueError))
+
+    def _write_batch(self, audits: Sequence[Tuple[Any, ...]], interventions: Sequence[Tuple[Any, ...]],
+                     hits: Sequence[Tuple[str, datetime, int, datetime]]):
+        """写入一批记录（同一事务）；hits为 (指纹, 干预创建时间, 新增次数, 最近出现时间)"""
+        raise NotImplementedError
+
+    def _recent_interventions(self, since: datetime) -> List[Tuple[Any, ...]]:
+        """返回 (指纹, 问题, 功能, 严重程度, 次数, 创建时间, 最近出现时间) 行"""
+        raise NotImplementedError
+
+    def _aggregate(self, since: Optional[datetime]):
+        """返回 (按状态计数, 审计总数, 达标审计数, 有完成度的审计数, 最近审计时间, 干预数, 需干预的功能数, 未解决的干预数)"""
+        raise NotImplementedError
+
+    def _close_connection(self):
+        pass
+
+
+class PostgresSupervisionStore(SupervisionStore):
+    """PostgreSQL存储（线程安全连接池，execute_values多行写入）"""
+
+    backend = 'postgres'
+
+    # 旧版本创建的数据库补齐表、列和索引（均可重复执行，与database_supervision.sql一致）
+    MIGRATIONS = """
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS issue TEXT;
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS severity VARCHAR(20);
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS source VARCHAR(20) DEFAULT 'api';
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS hit_count INTEGER NOT NULL DEFAULT 1;
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP DEFAULT NOW();
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS resolved_at TIMESTAMP;
+        ALTER TABLE pm_intervention_required ADD COLUMN IF NOT EXISTS fingerprint CHAR(64);
+        CREATE TABLE IF NOT EXISTS pm_supervision_daily (
+            day DATE NOT NULL,
+            status VARCHAR(50) NOT NULL DEFAULT '',
+            audits INTEGER NOT NULL DEFAULT 0,
+            complete_audits INTEGER NOT NULL DEFAULT 0,
+            scored_audits INTEGER NOT NULL DEFAULT 0,
+            completion_sum BIGINT NOT NULL DEFAULT 0,
+            last_audit_at TIMESTAMP,
+            PRIMARY KEY (day, status)
+        );
+        DO $$
+        BEGIN
+            -- 汇总表新增的列没有历史值，清空后按原始日志重建
+            IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name = 'pm_supervision_daily' AND column_name = 'scored_audits') THEN
+                ALTER TABLE pm_supervision_daily ADD COLUMN scored_audits INTEGER NOT NULL DEFAULT 0;
+                DELETE FROM pm_supervision_daily;
+                INSERT INTO pm_supervision_daily
+                    (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+                SELECT COALESCE(audit_timestamp, NOW())::date, COALESCE(status, ''), COUNT(*),
+                       COUNT(*) FILTER (WHERE completion_percentage >= 100), COUNT(completion_percentage),
+                       COALESCE(SUM(completion_percentage), 0), MAX(audit_timestamp)
+                FROM pm_supervision_log
+                GROUP BY 1, 2;
+            END IF;
+        END
+        $$;
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_feature_name ON pm_supervision_log (feature_name);
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_audit_timestamp ON pm_supervision_log (audit_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_status ON pm_supervision_log (status, audit_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_intervention_feature_name ON pm_intervention_required (feature_name);
+        CREATE INDEX IF NOT EXISTS idx_intervention_created_at ON pm_intervention_required (created_at);
+        CREATE INDEX IF NOT EXISTS idx_intervention_fingerprint ON pm_intervention_required (fingerprint, created_at);
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_intervention_open_audit_feature
+            ON pm_intervention_required (feature_name)
+            WHERE source = 'audit' AND resolved_at IS NULL;
+    """
+
+    def __init__(self, dsn: str, min_connections: int = 1, max_connections: int = 5, **kwargs):
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, dsn)
+        try:
+            self._migrate()
+        except psycopg2.Error as e:
+            # 账户没有ALTER权限等情况下不阻止启动，由DBA执行database_supervision.sql
+            logger.warning(f"监督数据表结构升级失败，请手动执行 database_supervision.sql: {e}")
+        super().__init__(**kwargs)
+
+    def _migrate(self):
+        """执行可重复的表结构升级；每日汇总依赖的语句级触发器不存在时提示重新执行建表脚本"""
+        def migrate(cursor):
+            cursor.execute(self.MIGRATIONS)
+            cursor.execute(
+                "SELECT COUNT(*) FROM pg_trigger "
+                "WHERE tgrelid = 'pm_supervision_log'::regclass AND tgname = 'feature_completion_check_insert'"
+            )
+            return cursor.fetchone()[0] > 0
+        if not self._execute(migrate):
+            logger.warning("pm_supervision_log 上没有 feature_completion_check_insert 触发器，"
+                           "每日汇总和审计干预不会更新，请重新执行 database_supervision.sql")
+
+    def _is_data_error(self, error):
+        return (super()._is_data_error(error)
+                or isinstance(error, (psycopg2.DataError, psycopg2.IntegrityError))
+                or isinstance(error, psycopg2.errors.DatatypeMismatch))
+
+    def _execute(self, callback):
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cursor:
+                    return callback(cursor)
+        finally:
+            self.pool.putconn(conn)
+
+    def _write_batch(self, audits, interventions, hits):
+        def write(cursor):
+            if audits:
+                execute_values(
+                    cursor,
+                    f"INSERT INTO pm_supervision_log ({', '.join(AUDIT_COLUMNS)}) VALUES %s",
+                    audits, page_size=self.batch_size
+                )
+            if interventions:
+                execute_values(
+                    cursor,
+                    f"INSERT INTO pm_intervention_required ({', '.join(INTERVENTION_COLUMNS)}) VALUES %s",
+                    interventions, page_size=self.batch_size
+                )
+            if hits:
+                execute_values(
+                    cursor,
+                    "UPDATE pm_intervention_required AS i "
+                    "SET hit_count = i.hit_count + v.hits, last_seen_at = GREATEST(i.last_seen_at, v.last_seen) "
+                    "FROM (VALUES %s) AS v (fingerprint, created_at, hits, last_seen) "
+                    "WHERE i.fingerprint = v.fingerprint AND i.created_at = v.created_at",
+                    hits, page_size=self.batch_size
+                )
+        self._execute(write)
+
+    def _recent_interventions(self, since):
+        def query(cursor):
+            cursor.execute(
+                "SELECT fingerprint, issue, feature_name, severity, hit_count, created_at, last_seen_at "
+                "FROM pm_intervention_required "
+                "WHERE fingerprint IS NOT NULL AND resolved_at IS NULL AND created_at >= %s "
+                "ORDER BY created_at",
+                (since,)
+            )
+            return cursor.fetchall()
+        return self._execute(query)
+
+    def _aggregate(self, since):
+        # 审计统计读取触发器维护的每日汇总表，不扫描原始日志
+        since = since.date() if since else None
+
+        def query(cursor):
+            cursor.execute(
+                "SELECT status, SUM(audits), SUM(complete_audits), SUM(scored_audits), MAX(last_audit_at) "
+                "FROM pm_supervision_daily WHERE %(since)s::date IS NULL OR day >= %(since)s "
+                "GROUP BY status HAVING SUM(audits) > 0",
+                {'since': since}
+            )
+            audit_rows = cursor.fetchall()
+            cursor.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT feature_name), COUNT(*) FILTER (WHERE resolved_at IS NULL) "
+                "FROM pm_intervention_required WHERE %(since)s::date IS NULL OR created_at >= %(since)s",
+                {'since': since}
+            )
+            return audit_rows, cursor.fetchone()
+        audit_rows, intervention_row = self._execute(query)
+        return _summarize(audit_rows, *intervention_row)
+
+    def _close_connection(self):
+        self.pool.closeall()
+
+
+class SQLiteSupervisionStore(SupervisionStore):
+    """SQLite存储（WAL模式，单连接+锁，executemany批量写入），用于本地运行和测试"""
+
+    backend = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pm_supervision_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feature_name TEXT,
+            completion_percentage INTEGER,
+            missing_components TEXT,
+            audit_timestamp TEXT NOT NULL,
+            status TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_audit_timestamp ON pm_supervision_log (audit_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_status ON pm_supervision_log (status, audit_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_supervision_log_feature_name ON pm_supervision_log (feature_name);
+        CREATE TABLE IF NOT EXISTS pm_intervention_required (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feature_name TEXT,
+            missing_components TEXT,
+            issue TEXT,
+            severity TEXT,
+            source TEXT DEFAULT 'api',
+            hit_count INTEGER NOT NULL DEFAULT 1,
+            last_seen_at TEXT,
+            resolved_at TEXT,
+            fingerprint TEXT,
+            created_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_intervention_created_at ON pm_intervention_required (created_at);
+        CREATE INDEX IF NOT EXISTS idx_intervention_feature_name ON pm_intervention_required (feature_name);
+        CREATE TABLE IF NOT EXISTS pm_supervision_daily (
+            day TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT '',
+            audits INTEGER NOT NULL DEFAULT 0,
+            complete_audits INTEGER NOT NULL DEFAULT 0,
+            scored_audits INTEGER NOT NULL DEFAULT 0,
+            completion_sum INTEGER NOT NULL DEFAULT 0,
+            last_audit_at TEXT,
+            PRIMARY KEY (day, status)
+        );
+    """
+
+    # 列变更后的补列（旧版本创建的数据库）
+    MIGRATIONS = {
+        'pm_intervention_required': {
+            'source': "TEXT DEFAULT 'api'",
+            'hit_count': 'INTEGER NOT NULL DEFAULT 1',
+            'last_seen_at': 'TEXT',
+            'resolved_at': 'TEXT',
+            'fingerprint': 'TEXT'
+        },
+        'pm_supervision_daily': {
+            'scored_audits': 'INTEGER NOT NULL DEFAULT 0'
+        }
+    }
+
+    # 与database_supervision.sql中的触发器行为一致（SQLite只有行级触发器）：
+    # 未完成的功能每个只保留一条未解决的干预并累计次数，完成后关闭；每日汇总增量维护
+    TRIGGERS = """
+        DROP TRIGGER IF EXISTS feature_completion_check;
+        CREATE INDEX IF NOT EXISTS idx_intervention_fingerprint
+            ON pm_intervention_required (fingerprint, created_at);
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_intervention_open_audit_feature
+            ON pm_intervention_required (feature_name)
+            WHERE source = 'audit' AND resolved_at IS NULL;
+        DROP TRIGGER IF EXISTS feature_completion_check_insert;
+        CREATE TRIGGER feature_completion_check_insert
+        AFTER INSERT ON pm_supervision_log
+        WHEN NEW.completion_percentage < 100
+        BEGIN
+            INSERT INTO pm_intervention_required
+                (feature_name, missing_components, issue, severity, source, hit_count, last_seen_at, created_at)
+            VALUES (NEW.feature_name, NEW.missing_components, 'feature_incomplete', 'high', 'audit',
+                    1, NEW.audit_timestamp, NEW.audit_timestamp)
+            ON CONFLICT (feature_name) WHERE source = 'audit' AND resolved_at IS NULL
+            DO UPDATE SET missing_components = excluded.missing_components,
+                          hit_count = hit_count + 1,
+                          last_seen_at = max(last_seen_at, excluded.last_seen_at);
+        END;
+        DROP TRIGGER IF EXISTS feature_completion_resolve;
+        CREATE TRIGGER feature_completion_resolve
+        AFTER INSERT ON pm_supervision_log
+        WHEN NEW.completion_percentage >= 100
+        BEGIN
+            UPDATE pm_intervention_required SET resolved_at = NEW.audit_timestamp
+            WHERE source = 'audit' AND resolved_at IS NULL
+              AND feature_name = NEW.feature_name AND last_seen_at <= NEW.audit_timestamp;
+        END;
+        DROP TRIGGER IF EXISTS supervision_daily_insert;
+        CREATE TRIGGER supervision_daily_insert
+        AFTER INSERT ON pm_supervision_log
+        BEGIN
+            INSERT INTO pm_supervision_daily
+                (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+            VALUES (substr(NEW.audit_timestamp, 1, 10), COALESCE(NEW.status, ''), 1,
+                    COALESCE(NEW.completion_percentage >= 100, 0), NEW.completion_percentage IS NOT NULL,
+                    COALESCE(NEW.completion_percentage, 0), NEW.audit_timestamp)
+            ON CONFLICT (day, status) DO UPDATE SET
+                audits = audits + 1,
+                complete_audits = complete_audits + excluded.complete_audits,
+                scored_audits = scored_audits + excluded.scored_audits,
+                completion_sum = completion_sum + excluded.completion_sum,
+                last_audit_at = max(last_audit_at, excluded.last_audit_at);
+        END;
+        DROP TRIGGER IF EXISTS supervision_daily_delete;
+        CREATE TRIGGER supervision_daily_delete
+        AFTER DELETE ON pm_supervision_log
+        BEGIN
+            UPDATE pm_supervision_daily SET
+                audits = audits - 1,
+                complete_audits = complete_audits - COALESCE(OLD.completion_percentage >= 100, 0),
+                scored_audits = scored_audits - (OLD.completion_percentage IS NOT NULL),
+                completion_sum = completion_sum - COALESCE(OLD.completion_percentage, 0)
+            WHERE day = substr(OLD.audit_timestamp, 1, 10) AND status = COALESCE(OLD.status, '');
+        END;
+        DROP TRIGGER IF EXISTS supervision_daily_update;
+        CREATE TRIGGER supervision_daily_update
+        AFTER UPDATE ON pm_supervision_log
+        BEGIN
+            UPDATE pm_supervision_daily SET
+                audits = audits - 1,
+                complete_audits = complete_audits - COALESCE(OLD.completion_percentage >= 100, 0),
+                scored_audits = scored_audits - (OLD.completion_percentage IS NOT NULL),
+                completion_sum = completion_sum - COALESCE(OLD.completion_percentage, 0)
+            WHERE day = substr(OLD.audit_timestamp, 1, 10) AND status = COALESCE(OLD.status, '');
+            INSERT INTO pm_supervision_daily
+                (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+            VALUES (substr(NEW.audit_timestamp, 1, 10), COALESCE(NEW.status, ''), 1,
+                    COALESCE(NEW.completion_percentage >= 100, 0), NEW.completion_percentage IS NOT NULL,
+                    COALESCE(NEW.completion_percentage, 0), NEW.audit_timestamp)
+            ON CONFLICT (day, status) DO UPDATE SET
+                audits = audits + 1,
+                complete_audits = complete_audits + excluded.complete_audits,
+                scored_audits = scored_audits + excluded.scored_audits,
+                completion_sum = completion_sum + excluded.completion_sum,
+                last_audit_at = max(last_audit_at, excluded.last_audit_at);
+        END;
+    """
+
+    # 汇总表为空而原始日志有数据时回填（旧版本创建的数据库）
+    BACKFILL = """
+        INSERT INTO pm_supervision_daily
+            (day, status, audits, complete_audits, scored_audits, completion_sum, last_audit_at)
+        SELECT substr(audit_timestamp, 1, 10), COALESCE(status, ''), COUNT(*),
+               COALESCE(SUM(completion_percentage >= 100), 0), COUNT(completion_percentage),
+               COALESCE(SUM(completion_percentage), 0),
+               MAX(audit_timestamp)
+        FROM pm_supervision_log
+        WHERE NOT EXISTS (SELECT 1 FROM pm_supervision_daily)
+        GROUP BY 1, 2
+    """
+
+    def __init__(self, db_path: str = "./data/supervision.db", **kwargs):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+        super().__init__(**kwargs)
+
+    def _migrate(self):
+        with self._conn:
+            for table, columns in self.MIGRATIONS.items():
+                existing = {row[1] for row in self._conn.execute(f'PRAGMA table_info({table})')}
+                for column, definition in columns.items():
+                    if column not in existing:
+                        self._conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+                        if table == 'pm_supervision_daily':
+                            # 汇总表新增的列没有历史值，清空后由BACKFILL按原始日志重建
+                            self._conn.execute('DELETE FROM pm_supervision_daily')
+            self._conn.execute(self.BACKFILL)
+        self._conn.executescript(self.TRIGGERS)
+
+    @staticmethod
+    def _sqlite_row(row: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        # 数组存为JSON文本，时间存为ISO字符串（可按字典序比较）
+        return tuple(
+            json.dumps(v, ensure_ascii=False) if isinstance(v, list)
+            else v.isoformat() if isinstance(v, datetime) else v
+            for v in row
+        )
+
+    def _is_data_error(self, error):
+        # 参数绑定失败为ProgrammingError/InterfaceError；锁等待超时、磁盘错误等为OperationalError
+        return (super()._is_data_error(error)
+                or isinstance(error, (sqlite3.ProgrammingError, sqlite3.InterfaceError,
+                                      sqlite3.IntegrityError, sqlite3.DataError)))
+
+    def _write_batch(self, audits, interventions, hits):
+        with self._lock, self._conn:
+            if audits:
+                self._conn.executemany(
+                    f"INSERT INTO pm_supervision_log ({', '.join(AUDIT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(AUDIT_COLUMNS))})",
+                    [self._sqlite_row(row) for row in audits]
+                )
+            if interventions:
+                self._conn.executemany(
+                    f"INSERT INTO pm_intervention_required ({', '.join(INTERVENTION_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(INTERVENTION_COLUMNS))})",
+                    [self._sqlite_row(row) for row in interventions]
+                )
+            if hits:
+                self._conn.executemany(
+                    "UPDATE pm_intervention_required "
+                    "SET hit_count = hit_count + ?, last_seen_at = max(COALESCE(last_seen_at, ''), ?) "
+                    "WHERE fingerprint = ? AND created_at = ?",
+                    [(count, last_seen.isoformat(), fp, created_at.isoformat())
+                     for fp, created_at, count, last_seen in hits]
+                )
+
+    def _recent_interventions(self, since):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT fingerprint, issue, feature_name, severity, hit_count, created_at, last_seen_at "
+                "FROM pm_intervention_required "
+                "WHERE fingerprint IS NOT NULL AND resolved_at IS NULL AND created_at >= ? "
+                "ORDER BY created_at",
+                (since.isoformat(),)
+            ).fetchall()
+
+    def _aggregate(self, since):
+        since = since.date().isoformat() if since else ''
+        with self._lock:
+            audit_rows = self._conn.execute(
+                "SELECT status, SUM(audits), SUM(complete_audits), SUM(scored_audits), MAX(last_audit_at) "
+                "FROM pm_supervision_daily WHERE day >= ? GROUP BY status HAVING SUM(audits) > 0", (since,)
+            ).fetchall()
+            intervention_row = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT feature_name), "
+                "COALESCE(SUM(resolved_at IS NULL), 0) FROM pm_intervention_required "
+                "WHERE created_at >= ?", (since,)
+            ).fetchone()
+        return _summarize(audit_rows, *intervention_row)
+
+    def _close_connection(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _summarize(audit_rows, interventions: int, features: int, open_interventions: int):
+    by_status = {status or 'unknown': int(count) for status, count, _, _, _ in audit_rows}
+    compliant = sum(ok or 0 for _, _, ok, _, _ in audit_rows)
+    scored = sum(n or 0 for _, _, _, n, _ in audit_rows)
+    timestamps = [ts for _, _, _, _, ts in audit_rows if ts is not None]
+    last_audit = max(timestamps) if timestamps else None
+    if isinstance(last_audit, datetime):
+        last_audit = last_audit.isoformat()
+    return (by_status, sum(by_status.values()), int(compliant), int(scored), last_audit,
+            interventions, features, open_interventions)
+
+
+def postgres_dsn_from_env() -> Optional[str]:
+    """从环境变量组装PostgreSQL连接串；SUPERVISION_DB_URL优先，未配置密码时返回None"""
+    if os.getenv('SUPERVISION_DB_URL'):
+        return os.getenv('SUPERVISION_DB_URL')
+    password = os.getenv('DB_PM_PASSWORD')
+    if not password:
+        return None
+    return (f"host={os.getenv('DB_PM_HOST', 'postgres-pm')} port={os.getenv('DB_PM_PORT', '5432')} "
+            f"dbname={os.getenv('DB_PM_NAME', 'pm_supervision')} "
+            f"user={os.getenv('DB_PM_USERNAME', 'pm_supervisor')} password={password}")
+
+
+def open_supervision_store(dsn: Optional[str] = None, sqlite_path: Optional[str] = None,
+                           **kwargs) -> SupervisionStore:
+    """
+    打开监督数据存储：配置了PostgreSQL且psycopg2可用时使用PostgreSQL，否则回退到SQLite
+
+    Args:
+        dsn: PostgreSQL连接串，默认从环境变量读取
+        sqlite_path: SQLite文件路径，默认 SUPERVISION_SQLITE_PATH 或 ./data/supervision.db
+    """
+    dsn = dsn or postgres_dsn_from_env()
+    if dsn and PSYCOPG2_AVAILABLE:
+        try:
+            return PostgresSupervisionStore(dsn, **kwargs)
+        except psycopg2.Error as e:
+            logger.warning(f"PostgreSQL连接失败，回退到SQLite: {e}")
+    elif dsn:
+        logger.warning("未安装psycopg2，回退到SQLite")
+    sqlite_path = sqlite_path or os.getenv('SUPERVISION_SQLITE_PATH', './data/supervision.db')
+    return SQLiteSupervisionStore(sqlite_path, **kwargs)
@@ -3,9 +3,25 @@
 AI PM Supervisor Server
 监督服务主程序
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
+from datetime import datetime, timedelta
+from pathlib import Path
+import atexit
 import os
 import logging
+import sys
+import time
+
+from audit_queue import AuditJobQueue, QueueFullError
+from intervention_dedup import InterventionDeduplicator
+from supervision_store import open_supervision_store
+
+# 指标模块与CLI共用scripts/metrics.py（及其依赖的report_writer.py）：镜像构建时复制到应用目录，从仓库直接运行时从scripts导入
+try:
+    from metrics import REGISTRY
+except ImportError:
+    sys.path.append(str(Path(__file__).resolve().parent.parent / 'scripts'))
+    from metrics import REGISTRY
 
 app = Flask(__name__)
 
@@ -19,6 +35,63 @@ logger = logging.getLogger(__name__)
 # 配置
 STRICT_MODE = os.getenv('STRICT_MODE', 'true').lower() == 'true'
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', '')
+AUDIT_WORKERS = int(os.getenv('AUDIT_WORKERS', '4'))
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '100'))
+AUDIT_RETRY_AFTER = int(os.getenv('AUDIT_RETRY_AFTER', '5'))
+STORE_BATCH_SIZE = int(os.getenv('STORE_BATCH_SIZE', '200'))
+STORE_FLUSH_INTERVAL = float(os.getenv('STORE_FLUSH_INTERVAL', '1.0'))
+STORE_MAX_BUFFER = int(os.getenv('STORE_MAX_BUFFER', '10000'))
+INTERVENTION_WINDOW = float(os.getenv('INTERVENTION_WINDOW', '300'))
+INTERVENTION_CACHE_SIZE = int(os.getenv('INTERVENTION_CACHE_SIZE', '10000'))
+
+# 指标（GET /metrics 输出Prometheus文本格式）
+HTTP_REQUESTS = REGISTRY.counter('supervisor_http_requests_total', 'HTTP请求数', ('method', 'route', 'status'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram('supervisor_http_request_duration_seconds', 'HTTP请求耗时（秒）',
+                                          ('method', 'route'))
+HTTP_IN_FLIGHT = REGISTRY.gauge('supervisor_http_requests_in_flight', '正在处理的HTTP请求数')
+AUDIT_JOBS = REGISTRY.counter('supervisor_audit_jobs_total', '结束的审计任务数', ('status',))
+AUDIT_JOB_SECONDS = REGISTRY.histogram('supervisor_audit_job_duration_seconds', '审计任务执行耗时（秒）')
+AUDIT_QUEUE_WAIT_SECONDS = REGISTRY.histogram('supervisor_audit_queue_wait_seconds', '审计任务排队耗时（秒）')
+AUDIT_REJECTED = REGISTRY.counter('supervisor_audit_rejected_total', '因队列已满被拒绝的审计请求数')
+AUDIT_QUEUE_DEPTH = REGISTRY.gauge('supervisor_audit_queue_depth', '等待执行的审计任务数')
+# severity标签只取已知值，防止任意输入撑大指标
+INTERVENTION_SEVERITIES = ('low', 'medium', 'high', 'critical')
+INTERVENTIONS = REGISTRY.counter('supervisor_interventions_total', '触发的PM干预数', ('severity',))
+INTERVENTIONS_COALESCED = REGISTRY.counter('supervisor_interventions_coalesced_total',
+                                           '窗口内被合并的重复干预请求数', ('severity',))
+STORE_PENDING = REGISTRY.gauge('supervisor_store_pending_records', '写缓冲区中等待写入数据库的记录数')
+STORE_DROPPED = REGISTRY.gauge('supervisor_store_dropped_records', '写缓冲区已满时累计丢弃的记录数')
+STORE_REJECTED = REGISTRY.gauge('supervisor_store_rejected_records', '因内容无法写入数据库而丢弃的记录数')
+
+# 审计和干预记录的持久化存储（PostgreSQL，未配置时回退到SQLite），进程退出前写入剩余缓冲
+store = open_supervision_store(batch_size=STORE_BATCH_SIZE, flush_interval=STORE_FLUSH_INTERVAL,
+                               max_buffer=STORE_MAX_BUFFER)
+atexit.register(store.close)
+STORE_PENDING.set_function(store.pending)
+STORE_DROPPED.set_function(lambda: store.stats['dropped'])
+STORE_REJECTED.set_function(lambda: store.stats['rejected'])
+
+# 干预去重：窗口内相同指纹的请求合并为一条干预；启动时从存储预热，重启后继续合并
+interventions = InterventionDeduplicator(window=INTERVENTION_WINDOW, max_entries=INTERVENTION_CACHE_SIZE)
+interventions.warm(store.recent_interventions(datetime.now() - timedelta(seconds=INTERVENTION_WINDOW)))
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def _record_request_metrics(response):
+    # 按路由模板统计（/audit/<job_id>），避免任务ID造成标签爆炸
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, method=request.method, route=route)
+    return response
+
+@app.teardown_request
+def _finish_request(exc):
+    if 'request_start' in g:
+        HTTP_IN_FLIGHT.dec()
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -26,14 +99,15 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'strict_mode': STRICT_MODE,
-        'service': 'AI PM Supervisor'
+        'service': 'AI PM Supervisor',
+        'audit_queue': audit_queue.get_stats(),
+        'intervention_cache': interventions.get_stats(),
+        'store': dict(store.stats, backend=store.backend, pending=store.pending())
     })
 
-@app.route('/audit', methods=['POST'])
-def audit_code():
-    """代码审计端点"""
-    data = request.json
-    logger.info(f"收到审计请求: {data}")
+def run_audit(data):
+    """执行一次代码审计（在审计工作线程中运行）"""
+    logger.info(f"开始审计: {data}")
     
     # 这里实现具体的审计逻辑
     result = {
@@ -42,35 +116,113 @@ def audit_code():
         'recommendations': []
     }
     
-    return jsonify(result)
+    return result
+
+def record_audit(job):
+    """审计任务结束后记录指标并写入存储（进入写缓冲，批量落库）"""
+    AUDIT_JOBS.inc(status=job['status'])
+    AUDIT_QUEUE_WAIT_SECONDS.observe(job['started_at'] - job['submitted_at'])
+    AUDIT_JOB_SECONDS.observe(job['finished_at'] - job['started_at'])
+    store.record_audit(job['payload'], job['result'], job['status'],
+                       timestamp=datetime.fromtimestamp(job['finished_at']))
+
+# 审计任务队列：请求线程只负责入队，审计在固定数量的工作线程中执行
+audit_queue = AuditJobQueue(run_audit, workers=AUDIT_WORKERS, max_queue=AUDIT_QUEUE_SIZE,
+                            on_finish=record_audit)
+AUDIT_QUEUE_DEPTH.set_function(audit_queue.pending)
+
+def _json_object():
+    """
+    读取请求体中的JSON对象
+
+    Returns:
+        (数据, None)；请求体不是JSON对象时返回 (None, 400响应)
+    """
+    data = request.get_json(silent=True)
+    if data is None and not request.get_data():
+        return {}, None
+    if not isinstance(data, dict):
+        return None, (jsonify({'status': 'invalid', 'error': '请求体必须是JSON对象'}), 400)
+    return data, None
+
+@app.route('/audit', methods=['POST'])
+def audit_code():
+    """代码审计端点：提交审计任务，立即返回任务ID"""
+    data, error = _json_object()
+    if error is not None:
+        return error
+    logger.info(f"收到审计请求: {data}")
+    
+    try:
+        job_id = audit_queue.submit(data)
+    except QueueFullError as e:
+        logger.warning(f"审计请求被拒绝: {e}")
+        AUDIT_REJECTED.inc()
+        response = jsonify({'status': 'rejected', 'error': str(e), 'retry_after': AUDIT_RETRY_AFTER})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(AUDIT_RETRY_AFTER)
+        return response
+    
+    return jsonify({
+        'status': 'queued',
+        'job_id': job_id,
+        'status_url': f"/audit/{job_id}"
+    }), 202
+
+@app.route('/audit/<job_id>', methods=['GET'])
+def get_audit(job_id):
+    """查询审计任务状态和结果"""
+    job = audit_queue.get(job_id)
+    if job is None:
+        return jsonify({'status': 'not_found', 'job_id': job_id}), 404
+    return jsonify(job)
 
 @app.route('/intervention', methods=['POST'])
 def trigger_intervention():
-    """触发PM干预"""
-    data = request.json
-    logger.warning(f"PM干预触发: {data}")
+    """触发PM干预（窗口内的重复请求合并到同一条干预，只累加次数）"""
+    data, error = _json_object()
+    if error is not None:
+        return error
+    entry, created = interventions.register(data)
+    first_seen = datetime.fromtimestamp(entry['first_seen'])
+    severity = entry['severity'] if entry['severity'] in INTERVENTION_SEVERITIES else 'other'
+    
+    if created:
+        logger.warning(f"PM干预触发: {data}")
+        store.record_intervention(data, timestamp=first_seen, fingerprint=entry['fingerprint'])
+        INTERVENTIONS.inc(severity=severity)
+    else:
+        logger.debug(f"PM干预已合并（第{entry['hit_count']}次）: {entry['fingerprint']}")
+        store.record_intervention_hit(entry['fingerprint'], first_seen,
+                                      timestamp=datetime.fromtimestamp(entry['last_seen']))
+        INTERVENTIONS_COALESCED.inc(severity=severity)
     
     intervention = {
-        'status': 'intervention_triggered',
-        'issue': data.get('issue', 'Unknown'),
-        'action': 'immediate_review_required'
+        'status': 'intervention_triggered' if created else 'intervention_coalesced',
+        'issue': entry['issue'],
+        'action': 'immediate_review_required',
+        'fingerprint': entry['fingerprint'],
+        'hit_count': entry['hit_count'],
+        'first_seen': first_seen.isoformat()
     }
     
     return jsonify(intervention)
 
 @app.route('/report', methods=['GET'])
 def get_report():
-    """获取监督报告"""
-    report = {
-        'timestamp': '2025-10-21',
-        'total_audits': 0,
-        'interventions': 0,
-        'compliance_rate': 100
-    }
+    """获取监督报告（?days=N 只统计最近N天）"""
+    days = request.args.get('days', type=int)
+    report = store.report(days=days)
     
     return jsonify(report)
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus指标端点"""
+    return Response(REGISTRY.render(), mimetype=None, content_type=REGISTRY.CONTENT_TYPE)
+
 if __name__ == '__main__':
+    # 本地调试用Flask开发服务器；生产环境通过gunicorn启动（见Dockerfile）
     logger.info("🧠 AI PM Supervisor 启动中...")
     logger.info(f"严格模式: {STRICT_MODE}")
     app.run(host='0.0.0.0', port=8080, debug=False)
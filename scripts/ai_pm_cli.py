@@ -11,14 +11,15 @@ from pathlib import Path
 # 添加脚本目录到路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from competitor_collector import CompetitorCollector
-from competitor_analyzer import CompetitorAnalyzer
+# 各子命令只在执行时导入自己需要的模块：list/report不会加载requests、openai、numpy，
+# 启动耗时由 scripts/benchmark_startup.py 检查
 
 
 def cmd_discover(args):
     """发现竞品命令"""
     print("🔍 竞品发现功能")
-    collector = CompetitorCollector(data_dir=args.data_dir)
+    from competitor_collector import CompetitorCollector
+    collector = CompetitorCollector(data_dir=args.data_dir, storage=args.storage, db_path=args.db_path)
     
     competitors = collector.discover_competitors(
         product_description=args.description,
@@ -33,14 +34,31 @@ def cmd_discover(args):
 def cmd_collect(args):
     """采集竞品信息命令"""
     print("📊 竞品信息采集")
-    collector = CompetitorCollector(data_dir=args.data_dir)
+    from competitor_collector import CompetitorCollector
+    collector = CompetitorCollector(
+        data_dir=args.data_dir,
+        storage=args.storage,
+        db_path=args.db_path,
+        pool_size=args.pool_size,
+        max_retries=args.max_retries,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_ttl=args.cache_ttl * 3600,
+        rate_limit_state=args.rate_limit_state
+    )
     
     if args.config:
         # 从配置文件读取
         import json
         with open(args.config, 'r', encoding='utf-8') as f:
             config = json.load(f)
-        competitors = collector.collect_batch(config)
+        competitors = collector.collect_batch(
+            config,
+            concurrency=args.concurrency,
+            backend=args.backend,
+            graphql_batch_size=args.graphql_batch_size,
+            incremental=args.incremental,
+            fresh_hours=args.fresh_hours
+        )
     else:
         # 单个竞品采集
         competitor = collector.collect_competitor_info(
@@ -57,9 +75,20 @@ def cmd_collect(args):
 def cmd_analyze(args):
     """分析竞品命令"""
     print("🧠 竞品智能分析")
+    from competitor_analyzer import CompetitorAnalyzer, StubLLMClient
     analyzer = CompetitorAnalyzer(
         data_dir=args.data_dir,
-        output_dir=args.output_dir
+        output_dir=args.output_dir,
+        storage=args.storage,
+        db_path=args.db_path,
+        llm_cache_path=None if args.no_llm_cache else args.llm_cache,
+        llm_cache_mode='refresh' if args.refresh_llm_cache else 'use',
+        llm_client=StubLLMClient() if args.llm_stub else None,
+        llm_concurrency=args.llm_concurrency,
+        llm_timeout=args.llm_timeout,
+        llm_batch_tokens=args.llm_batch_tokens,
+        match_threshold=args.match_threshold,
+        top_k=args.top_k
     )
     
     # 定义我们的产品
@@ -75,17 +104,18 @@ def cmd_analyze(args):
     ]
     
     # 执行分析
-    report = analyzer.analyze_all_competitors(our_product_description, our_features)
+    report = analyzer.analyze_all_competitors(
+        our_product_description,
+        our_features,
+        incremental=args.incremental
+    )
     
     # 保存报告
     analyzer.save_report(report, filename=args.output)
     
     # 生成Markdown报告
     if args.markdown:
-        md_report = analyzer.generate_markdown_report(report)
-        md_path = Path(args.output_dir) / args.output.replace('.json', '.md')
-        with open(md_path, 'w', encoding='utf-8') as f:
-            f.write(md_report)
+        md_path = analyzer.save_markdown_report(report, filename=Path(args.output).with_suffix('.md').name)
         print(f"📄 Markdown报告: {md_path}")
 
 
@@ -93,25 +123,37 @@ def cmd_report(args):
     """查看分析报告命令"""
     print("📄 查看分析报告")
     
-    import json
+    from itertools import islice
+    from report_writer import filter_suggestions, load_report_index, read_report, read_suggestions
     report_path = Path(args.output_dir) / args.report
     
     if not report_path.exists():
         print(f"❌ 报告文件不存在: {report_path}")
         return
     
-    with open(report_path, 'r', encoding='utf-8') as f:
-        report = json.load(f)
+    filters = {'competitor': args.competitor, 'min_priority': args.min_priority, 'effort': args.effort}
+    index = load_report_index(report_path)
+    if index is not None:
+        # 索引可用：汇总来自索引，只按偏移读取要显示的建议
+        summary = index['summary']
+        entries = list(islice(filter_suggestions(index['suggestions'], **filters), args.suggestions))
+        suggestions = read_suggestions(report_path, entries)
+    else:
+        # 没有索引（旧报告）或索引已过期，读取整个报告
+        summary = read_report(report_path)
+        suggestions = list(islice(filter_suggestions(summary['suggestions'], **filters), args.suggestions))
     
-    print(f"\n分析时间: {report['analysis_date']}")
-    print(f"竞品数量: {report['competitors_analyzed']}")
-    print(f"功能差距: {report['total_gaps']}")
-    print(f"迭代建议: {report['total_suggestions']}")
-    print(f"高优先级: {report['high_priority_suggestions']}")
+    print(f"\n分析时间: {summary['analysis_date']}")
+    print(f"竞品数量: {summary['competitors_analyzed']}")
+    print(f"功能差距: {summary['total_gaps']}")
+    print(f"迭代建议: {summary['total_suggestions']}")
+    print(f"高优先级: {summary['high_priority_suggestions']}")
     
     if args.suggestions:
         print(f"\n🎯 高优先级建议 (前{args.suggestions}条):")
-        for i, sugg in enumerate(report['suggestions'][:args.suggestions], 1):
+        if not suggestions and any(v is not None for v in filters.values()):
+            print("   (没有符合条件的建议)")
+        for i, sugg in enumerate(suggestions, 1):
             print(f"\n{i}. {sugg['title']}")
             print(f"   来源: {sugg['source_competitor']}")
             print(f"   优先级: {sugg['priority']}/5")
@@ -122,22 +164,43 @@ def cmd_report(args):
 def cmd_list(args):
     """列出已采集的竞品"""
     print("📋 已采集的竞品")
-    collector = CompetitorCollector(data_dir=args.data_dir)
+    # 只读取本地存储，不需要加载采集器（及其HTTP客户端）
+    from competitor_store import open_store
+    store = open_store(args.storage, args.data_dir, args.db_path)
     
-    competitors = collector.list_competitors()
+    competitors = store.ids()
     
     if not competitors:
         print("   (暂无数据)")
         return
     
     print(f"\n共 {len(competitors)} 个竞品:")
-    for i, comp_id in enumerate(competitors, 1):
-        competitor = collector.load_competitor(comp_id)
-        if competitor:
-            print(f"  {i}. {competitor.name}")
-            print(f"     ID: {competitor.id}")
-            print(f"     网站: {competitor.website}")
-            print(f"     功能数: {len(competitor.features)}")
+    for i, competitor in enumerate(store.scan(fields=('name', 'website', 'features')), 1):
+        print(f"  {i}. {competitor['name']}")
+        print(f"     ID: {competitor['id']}")
+        print(f"     网站: {competitor['website']}")
+        print(f"     功能数: {len(competitor.get('features') or [])}")
+    store.close()
+
+
+def cmd_migrate(args):
+    """把JSON目录中的竞品数据迁移到SQLite"""
+    print("🚚 迁移竞品数据到SQLite")
+    from competitor_store import migrate_json_to_sqlite
+    
+    db_path = args.db_path or str(Path(args.data_dir) / 'competitors.db')
+    count = migrate_json_to_sqlite(args.data_dir, db_path)
+    print(f"\n✅ 已迁移 {count} 个竞品到: {db_path}")
+    print("   之后可使用 --storage sqlite 读写该数据库")
+
+
+def _write_metrics(path: str):
+    """把本次运行的指标写成textfile，命令执行失败时同样写出"""
+    from metrics import REGISTRY
+    try:
+        print(f"📈 指标已写入: {REGISTRY.write_textfile(path)}")
+    except OSError as e:
+        print(f"⚠️  写入指标失败: {e}")
 
 
 def main():
@@ -156,6 +219,9 @@ def main():
   # 批量采集
   %(prog)s collect --config competitors.json
   
+  # 并发批量采集
+  %(prog)s collect --config competitors.json --concurrency 8
+  
   # 分析竞品
   %(prog)s analyze --markdown
   
@@ -164,6 +230,10 @@ def main():
   
   # 列出已采集的竞品
   %(prog)s list
+  
+  # 迁移到SQLite存储，之后使用 --storage sqlite
+  %(prog)s migrate
+  %(prog)s --storage sqlite list
 """
     )
     
@@ -171,6 +241,12 @@ def main():
                        help='竞品数据目录 (默认: ./data/competitors)')
     parser.add_argument('--output-dir', default='./data/analysis',
                        help='分析输出目录 (默认: ./data/analysis)')
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default='json',
+                       help='竞品存储后端 (默认: json)')
+    parser.add_argument('--db-path',
+                       help='SQLite数据库文件 (默认: <data-dir>/competitors.db)')
+    parser.add_argument('--metrics-file',
+                       help='退出时把指标写成Prometheus textfile（collect/analyze）')
     
     subparsers = parser.add_subparsers(dest='command', help='子命令')
     
@@ -185,25 +261,75 @@ def main():
     collect_parser.add_argument('--website', help='竞品网站')
     collect_parser.add_argument('--github', help='GitHub仓库URL')
     collect_parser.add_argument('--config', help='批量采集配置文件（JSON）')
+    collect_parser.add_argument('--concurrency', type=int, default=1,
+                               help='批量采集的最大并发数 (默认: 1，即顺序采集)')
+    collect_parser.add_argument('--backend', choices=['rest', 'graphql'], default='rest',
+                               help='GitHub数据来源：rest或graphql批量查询 (默认: rest)')
+    collect_parser.add_argument('--graphql-batch-size', type=int, default=50,
+                               help='graphql模式下每次请求包含的仓库数 (默认: 50)')
+    collect_parser.add_argument('--incremental', action='store_true',
+                               help='增量采集：跳过新鲜期内的竞品，内容未变化时不重写文件')
+    collect_parser.add_argument('--fresh-hours', type=float, default=24,
+                               help='增量采集的新鲜期，单位小时 (默认: 24)')
+    collect_parser.add_argument('--pool-size', type=int, default=10,
+                               help='每个主机的HTTP连接池大小 (默认: 10)')
+    collect_parser.add_argument('--max-retries', type=int, default=3,
+                               help='5xx或连接重置时的最大重试次数 (默认: 3)')
+    collect_parser.add_argument('--cache-dir', default='./data/cache/github',
+                               help='GitHub条件请求缓存目录 (默认: ./data/cache/github)')
+    collect_parser.add_argument('--cache-ttl', type=float, default=168,
+                               help='缓存条目闲置淘汰时间，单位小时 (默认: 168)')
+    collect_parser.add_argument('--no-cache', action='store_true',
+                               help='禁用GitHub条件请求缓存')
+    collect_parser.add_argument('--rate-limit-state', default='./data/cache/github_rate_limit.json',
+                               help='GitHub额度状态文件，供多次调用共享 (默认: ./data/cache/github_rate_limit.json)')
     
     # analyze命令
     analyze_parser = subparsers.add_parser('analyze', help='分析竞品')
     analyze_parser.add_argument('--our-description', help='我们产品的描述')
     analyze_parser.add_argument('--output', default='analysis_report.json',
-                               help='输出文件名 (默认: analysis_report.json)')
+                               help='输出文件名，扩展名为.ndjson时按行写出 (默认: analysis_report.json)')
     analyze_parser.add_argument('--markdown', action='store_true',
                                help='同时生成Markdown报告')
+    analyze_parser.add_argument('--incremental', action='store_true',
+                               help='增量分析：数据未变化的竞品复用上次的分析结果')
+    analyze_parser.add_argument('--llm-cache', default='./data/cache/llm_cache.db',
+                               help='LLM响应缓存文件 (默认: ./data/cache/llm_cache.db)')
+    analyze_parser.add_argument('--no-llm-cache', action='store_true',
+                               help='不使用LLM响应缓存')
+    analyze_parser.add_argument('--refresh-llm-cache', action='store_true',
+                               help='忽略已缓存的回复，重新请求LLM并更新缓存')
+    analyze_parser.add_argument('--llm-concurrency', type=int, default=1,
+                               help='功能提取的最大并发LLM请求数 (默认: 1)')
+    analyze_parser.add_argument('--llm-timeout', type=float, default=60,
+                               help='单次LLM请求超时秒数 (默认: 60)')
+    analyze_parser.add_argument('--llm-batch-tokens', type=int, default=0,
+                               help='批量提取：把多个竞品打包到一个提示中，每个提示的估算token上限 (默认: 0，不批量)')
+    analyze_parser.add_argument('--match-threshold', type=float, default=0.5,
+                               help='功能名称相似度阈值，不低于该值视为已有功能 (默认: 0.5)')
+    analyze_parser.add_argument('--top-k', type=int, default=20,
+                               help='报告中保留的建议条数 (默认: 20)')
+    analyze_parser.add_argument('--llm-stub', action='store_true',
+                               help='使用本地桩LLM客户端（离线调试，不访问网络）')
     
     # report命令
     report_parser = subparsers.add_parser('report', help='查看分析报告')
     report_parser.add_argument('--report', default='analysis_report.json',
-                              help='报告文件名 (默认: analysis_report.json)')
+                              help='报告文件名，支持JSON和NDJSON (默认: analysis_report.json)')
     report_parser.add_argument('--suggestions', type=int, default=5,
                               help='显示建议数量 (默认: 5)')
+    report_parser.add_argument('--competitor', help='只显示来自该竞品的建议')
+    report_parser.add_argument('--min-priority', type=int, choices=range(1, 6), metavar='{1-5}',
+                              help='只显示优先级不低于该值的建议')
+    report_parser.add_argument('--effort', choices=['low', 'medium', 'high'],
+                              help='只显示该实现难度的建议')
     
     # list命令
     list_parser = subparsers.add_parser('list', help='列出已采集的竞品')
     
+    # migrate命令
+    migrate_parser = subparsers.add_parser('migrate', help='把JSON目录中的竞品数据迁移到SQLite')
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -216,7 +342,8 @@ def main():
         'collect': cmd_collect,
         'analyze': cmd_analyze,
         'report': cmd_report,
-        'list': cmd_list
+        'list': cmd_list,
+        'migrate': cmd_migrate
     }
     
     try:
@@ -226,6 +353,9 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if args.metrics_file:
+            _write_metrics(args.metrics_file)
 
 
 if __name__ == '__main__':
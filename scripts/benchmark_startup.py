@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ai_pm_cli 启动耗时基准
+用 python -X importtime 在临时目录中逐个运行子命令，统计导入耗时，
+并检查轻量子命令没有加载 requests / openai / numpy 等重量级模块
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+CLI_PATH = Path(__file__).parent / "ai_pm_cli.py"
+
+# 子命令 -> (参数模板, 不允许导入的顶层模块)；{tmp}替换为临时目录，运行时不访问网络
+COMMANDS: Dict[str, Tuple[List[str], Tuple[str, ...]]] = {
+    'list': (['--data-dir', '{tmp}/data', 'list'], ('requests', 'openai', 'numpy')),
+    'report': (['--output-dir', '{tmp}/out', 'report'], ('requests', 'openai', 'numpy')),
+    'migrate': (['--data-dir', '{tmp}/data', '--db-path', '{tmp}/competitors.db', 'migrate'],
+                ('requests', 'openai', 'numpy')),
+    'discover': (['--data-dir', '{tmp}/data', 'discover', '--description', 'ai code review'],
+                 ('openai', 'numpy')),
+    'collect': (['--data-dir', '{tmp}/data', 'collect', '--config', '{tmp}/empty.json', '--no-cache',
+                 '--rate-limit-state', '{tmp}/rate_limit.json'], ('openai', 'numpy')),
+    'analyze': (['--data-dir', '{tmp}/data', '--output-dir', '{tmp}/out', 'analyze',
+                 '--llm-stub', '--no-llm-cache'], ('requests', 'openai')),
+}
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        模块名 -> (自身耗时us, 累计耗时us)
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        modules[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def measure(command: str, tmp: Path, runs: int = 3) -> Dict[str, object]:
+    """运行子命令runs次，取总导入耗时的最小值"""
+    template, forbidden = COMMANDS[command]
+    argv = [arg.replace('{tmp}', str(tmp)) for arg in template]
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', str(CLI_PATH), *argv],
+            capture_output=True, text=True, cwd=str(tmp)
+        )
+        modules = parse_importtime(result.stderr)
+        total_us = sum(self_us for self_us, _ in modules.values())
+        if best is None or total_us < best['import_ms'] * 1000:
+            loaded = {name.split('.')[0] for name in modules}
+            slowest = sorted(
+                ((name, cumulative) for name, (_, cumulative) in modules.items() if '.' not in name),
+                key=lambda item: -item[1]
+            )[:5]
+            best = {
+                'command': command,
+                'returncode': result.returncode,
+                'import_ms': round(total_us / 1000, 1),
+                'modules': len(modules),
+                'forbidden_loaded': sorted(loaded & set(forbidden)),
+                'slowest': [(name, round(us / 1000, 1)) for name, us in slowest]
+            }
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ai_pm_cli 各子命令的导入耗时基准')
+    parser.add_argument('commands', nargs='*', metavar='command',
+                        help=f"要测量的子命令: {', '.join(COMMANDS)} (默认: 全部)")
+    parser.add_argument('--runs', type=int, default=3, help='每个子命令运行次数，取最小值 (默认: 3)')
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='轻量子命令(list/report/migrate)导入耗时上限，超出则失败')
+    parser.add_argument('--json', action='store_true', help='以JSON输出结果')
+    args = parser.parse_args()
+    unknown = [c for c in args.commands if c not in COMMANDS]
+    if unknown:
+        parser.error(f"未知子命令: {', '.join(unknown)}")
+
+    commands = args.commands or list(COMMANDS)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        (tmp / 'data').mkdir()
+        (tmp / 'empty.json').write_text('[]', encoding='utf-8')
+        for command in commands:
+            results.append(measure(command, tmp, args.runs))
+
+    failures = []
+    for result in results:
+        if result['returncode'] != 0:
+            failures.append(f"{result['command']}: 退出码 {result['returncode']}")
+        if result['forbidden_loaded']:
+            failures.append(f"{result['command']}: 导入了 {', '.join(result['forbidden_loaded'])}")
+        if (args.max_ms is not None and result['command'] in ('list', 'report', 'migrate')
+                and result['import_ms'] > args.max_ms):
+            failures.append(f"{result['command']}: 导入耗时 {result['import_ms']}ms 超过 {args.max_ms}ms")
+
+    if args.json:
+        print(json.dumps({'results': results, 'failures': failures}, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'子命令':<10}{'导入耗时(ms)':>14}{'模块数':>8}  最慢的顶层模块")
+        for result in results:
+            slowest = ', '.join(f"{name} {ms}ms" for name, ms in result['slowest'][:3])
+            print(f"{result['command']:<10}{result['import_ms']:>14}{result['modules']:>8}  {slowest}")
+        for failure in failures:
+            print(f"❌ {failure}")
+        if not failures:
+            print("✅ 启动检查通过")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+紧凑数据模型工具
+字符串驻留、模板列表共享，以及按列存储大批量dataclass记录的容器
+"""
+
+import dataclasses
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+
+# 模板列表（如所需资源、风险）的共享池：内容相同的列表在所有实例间只保留一个元组
+_SHARED_TUPLES: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def intern_str(value: Any) -> Any:
+    """驻留字符串，非字符串原样返回"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_tuple(values: Sequence[Any]) -> Tuple[Any, ...]:
+    """把列表转为元素已驻留的元组（不进入共享池，适合每条记录都不同的列表）"""
+    return tuple(intern_str(v) for v in values)
+
+
+def shared_tuple(values: Sequence[Any]) -> Tuple[Any, ...]:
+    """把模板列表转为共享元组，内容相同的列表返回同一个对象"""
+    key = intern_tuple(values)
+    with _SHARED_LOCK:
+        return _SHARED_TUPLES.setdefault(key, key)
+
+
+class ColumnarRecords:
+    """
+    按列存储同一dataclass类型的一批记录
+
+    每个字段一列，字符串驻留、列表转为去重后的元组（嵌套的列表和字典逐层处理），重复的模板值只存一份；
+    按下标或迭代访问时再重建为dataclass实例
+    """
+
+    def __init__(self, record_type: type, records: Iterable[Any] = ()):
+        self.record_type = record_type
+        self.fields = [f.name for f in dataclasses.fields(record_type)]
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self.fields}
+        self._pool: Dict[Tuple[Any, ...], Tuple[Any, ...]] = {}
+        self._length = 0
+        self.extend(records)
+
+    def _compact(self, value: Any) -> Any:
+        """递归压缩字段值：列表转为元组并去重，字典的键和值逐个压缩"""
+        if isinstance(value, dict):
+            return {intern_str(k): self._compact(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            key = tuple(self._compact(v) for v in value)
+            try:
+                return self._pool.setdefault(key, key)
+            except TypeError:
+                # 含字典等不可哈希的元素（如功能列表），不进入去重池
+                return key
+        return intern_str(value)
+
+    @classmethod
+    def _expand(cls, value: Any) -> Any:
+        """_compact的逆过程：元组还原为列表，字典复制一份，避免调用方修改共享的值"""
+        if isinstance(value, tuple):
+            return [cls._expand(v) for v in value]
+        if isinstance(value, dict):
+            return {k: cls._expand(v) for k, v in value.items()}
+        return value
+
+    def append(self, record: Any = None, **values: Any):
+        """追加一条记录（传入dataclass实例或字段值）"""
+        for name in self.fields:
+            value = getattr(record, name) if record is not None else values.get(name)
+            self._columns[name].append(self._compact(value))
+        self._length += 1
+
+    def extend(self, records: Iterable[Any]):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """第index条记录的字段字典（与dataclasses.asdict的结构一致）"""
+        return {name: self._expand(column[index]) for name, column in self._columns.items()}
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self.record_type(**self.row(index))
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(self._length):
+            yield self.record_type(**self.row(index))
+
+    def column(self, name: str) -> List[Any]:
+        """返回某个字段的整列（只读使用）"""
+        return self._columns[name]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """导出为asdict兼容的字典列表"""
+        return [self.row(index) for index in range(self._length)]
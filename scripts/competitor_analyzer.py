@@ -6,22 +6,59 @@
 
 import os
 import json
-from typing import List, Dict, Any, Optional
+import hashlib
+import importlib.util
+import itertools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple, ClassVar, Iterable
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
 import sys
 
-# 尝试导入OpenAI客户端
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    print("⚠️  OpenAI库未安装，请运行: pip install openai")
+from competitor_store import open_store
+from feature_matcher import FeatureMatchIndex
+from feature_matrix import FeatureCatalog, SEVERITY_NAMES
+from suggestion_ranker import SuggestionRanker
+from llm_cache import LLMResponseCache
+from metrics import REGISTRY
+from report_writer import atomic_open, write_chunks, write_report
+from compact_models import ColumnarRecords, intern_str, intern_tuple, shared_tuple
 
+# OpenAI库只检查是否安装，首次调用LLM时才导入并创建客户端
+OPENAI_AVAILABLE = importlib.util.find_spec('openai') is not None
 
-@dataclass
+LLM_REQUESTS = REGISTRY.counter('llm_requests_total', 'LLM调用次数（按结果）', ('outcome',))
+LLM_REQUEST_SECONDS = REGISTRY.histogram('llm_request_duration_seconds', 'LLM请求耗时（秒）')
+COMPETITORS_ANALYZED = REGISTRY.counter('competitors_analyzed_total', '分析的竞品数', ('mode',))
+SUGGESTIONS_GENERATED = REGISTRY.counter('suggestions_generated_total', '生成的迭代建议数')
+
+
+class StubLLMClient:
+    """
+    本地桩LLM客户端，接口与OpenAI客户端的chat.completions.create一致
+    
+    用于离线运行和测试，不访问网络；calls记录收到的请求
+    """
+    
+    def __init__(self, response: str = "[]"):
+        self.response = response
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = self
+        self.completions = self
+    
+    def create(self, **kwargs):
+        from types import SimpleNamespace
+        self.calls.append(kwargs)
+        message = SimpleNamespace(content=self.response)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@dataclass(slots=True)
 class FeatureGap:
     """功能差距"""
     feature_name: str
@@ -30,9 +67,19 @@ class FeatureGap:
     competitor_implementation: str
     gap_severity: str  # critical, high, medium, low
     user_impact: str
+    matched_feature: Optional[str] = None  # 我们产品中最相近的功能
+    match_score: float = 0.0
+    
+    def __post_init__(self):
+        # 严重程度、实现说明等取值重复度高，驻留后大批量差距共享同一字符串
+        self.feature_name = intern_str(self.feature_name)
+        self.competitor_implementation = intern_str(self.competitor_implementation)
+        self.gap_severity = intern_str(self.gap_severity)
+        self.user_impact = intern_str(self.user_impact)
+        self.matched_feature = intern_str(self.matched_feature)
 
 
-@dataclass
+@dataclass(slots=True)
 class IterationSuggestion:
     """迭代建议"""
     id: str
@@ -43,59 +90,142 @@ class IterationSuggestion:
     priority: int  # 1-5, 5最高
     impact: str  # high, medium, low
     effort: str  # high, medium, low
-    implementation_steps: List[str]
+    implementation_steps: Sequence[str]
     estimated_time: str
-    required_resources: List[str]
-    risks: List[str]
+    required_resources: Sequence[str]
+    risks: Sequence[str]
     user_benefit: str
     business_value: str
     competitive_advantage: str
     status: str = "pending"
     created_at: str = None
     
+    # 取值集合很小、适合驻留的字段
+    INTERNED_FIELDS: ClassVar[Tuple[str, ...]] = (
+        'source_competitor', 'source_feature', 'impact', 'effort', 'estimated_time',
+        'business_value', 'status', 'created_at'
+    )
+    
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now().isoformat()
+        # 模板字段驻留/共享：资源和风险列表所有建议共用一个元组，步骤中的固定文本共用同一字符串
+        for name in self.INTERNED_FIELDS:
+            setattr(self, name, intern_str(getattr(self, name)))
+        self.implementation_steps = intern_tuple(self.implementation_steps)
+        self.required_resources = shared_tuple(self.required_resources)
+        self.risks = shared_tuple(self.risks)
+
+# 建议模板中的固定内容
+SUGGESTION_STEPS = (
+    "2. 设计我们的实现方案",
+    "3. 开发核心功能",
+    "4. 编写测试用例",
+    "5. 文档编写和用户指南"
+)
+SUGGESTION_RESOURCES = ("开发工程师1名", "测试工程师1名")
+SUGGESTION_RISKS = (
+    "技术实现复杂度可能超出预期",
+    "需要额外的第三方服务支持"
+)
 
 
 class CompetitorAnalyzer:
     """竞品分析器"""
     
-    def __init__(self, data_dir: str = "./data/competitors", output_dir: str = "./data/analysis"):
+    # 分析流程用到的竞品字段，流式加载时不读取user_reviews等大字段
+    ANALYSIS_FIELDS = ('name', 'website', 'description', 'features', 'tech_stack')
+    
+    SYSTEM_PROMPT = "你是一个专业的产品经理和技术分析师，擅长分析竞品功能并提供产品迭代建议。"
+    TEMPERATURE = 0.7
+    MAX_TOKENS = 4000
+    
+    def __init__(self, data_dir: str = "./data/competitors", output_dir: str = "./data/analysis",
+                 storage: str = 'json', db_path: Optional[str] = None,
+                 llm_cache_path: Optional[str] = None, llm_cache_mode: str = 'use',
+                 llm_client: Any = None, llm_concurrency: int = 1,
+                 llm_max_retries: int = 3, llm_timeout: float = 60,
+                 llm_batch_tokens: int = 0, match_threshold: float = 0.5,
+                 top_k: int = 20):
+        """
+        Args:
+            data_dir: 竞品数据目录
+            output_dir: 分析输出目录
+            storage: 竞品存储后端（json或sqlite）
+            db_path: SQLite数据库文件
+            llm_cache_path: LLM响应缓存文件，为None时不缓存
+            llm_cache_mode: use（读写缓存）、refresh（不读缓存但写入新结果）或bypass（不使用缓存）
+            llm_client: 自定义的OpenAI兼容客户端（如StubLLMClient），提供时不再创建OpenAI客户端
+            llm_concurrency: 功能提取阶段同时在途的LLM请求数上限
+            llm_max_retries: 被限流或超时后的最大重试次数
+            llm_timeout: 单次LLM请求超时（秒）
+            llm_batch_tokens: 大于0时启用批量提取，每个提示中竞品描述部分的估算token上限
+            match_threshold: 功能名称相似度不低于该值时视为我们已有该功能
+            top_k: 报告中保留的建议条数
+        """
         self.data_dir = Path(data_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.store = open_store(storage, data_dir, db_path)
+        
+        self.llm_concurrency = llm_concurrency
+        self.llm_max_retries = llm_max_retries
+        self.llm_timeout = llm_timeout
+        self.llm_batch_tokens = llm_batch_tokens
+        self.match_threshold = match_threshold
+        self.top_k = top_k
         
-        # 初始化LLM客户端
+        self.llm_cache = None
+        self.llm_cache_mode = llm_cache_mode
+        if llm_cache_path and llm_cache_mode != 'bypass':
+            self.llm_cache = LLMResponseCache(llm_cache_path)
+        
+        # LLM客户端：传入的客户端直接使用，OpenAI客户端在首次调用时创建
+        self._client = llm_client
+        self._client_lock = threading.Lock()
         self.llm_available = False
-        if OPENAI_AVAILABLE and os.environ.get('OPENAI_API_KEY'):
-            try:
-                self.client = OpenAI()  # API key从环境变量自动读取
-                self.llm_available = True
-                print("✅ LLM客户端初始化成功")
-            except Exception as e:
-                print(f"⚠️  LLM客户端初始化失败: {e}")
+        if llm_client is not None:
+            self.llm_available = True
+        elif not OPENAI_AVAILABLE:
+            print("⚠️  OpenAI库未安装，请运行: pip install openai")
+        elif os.environ.get('OPENAI_API_KEY'):
+            self.llm_available = True
         else:
             print("⚠️  LLM不可用（缺少OpenAI API Key或库未安装）")
     
+    @property
+    def client(self):
+        """LLM客户端，首次访问时导入openai并创建；创建失败时标记LLM不可用并返回None"""
+        if self._client is None and self.llm_available:
+            with self._client_lock:
+                if self._client is None and self.llm_available:
+                    try:
+                        from openai import OpenAI
+                        # API key从环境变量自动读取；重试由analyze_with_llm按llm_max_retries控制，
+                        # 关闭SDK自带的重试，避免两层重试叠加
+                        self._client = OpenAI(max_retries=0, timeout=self.llm_timeout)
+                        print("✅ LLM客户端初始化成功")
+                    except Exception as e:
+                        self.llm_available = False
+                        print(f"⚠️  LLM客户端初始化失败: {e}")
+        return self._client
+    
     def load_competitor_data(self, competitor_id: str) -> Optional[Dict[str, Any]]:
         """加载竞品数据"""
-        file_path = self.data_dir / f"{competitor_id}.json"
-        if not file_path.exists():
-            return None
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self.store.get(competitor_id)
     
     def load_all_competitors(self) -> List[Dict[str, Any]]:
         """加载所有竞品数据"""
-        competitors = []
-        for file_path in self.data_dir.glob('*.json'):
-            if file_path.name == 'summary.json':
-                continue
-            with open(file_path, 'r', encoding='utf-8') as f:
-                competitors.append(json.load(f))
-        return competitors
+        return list(self.iter_competitors())
+    
+    def iter_competitors(self, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        逐个读取竞品数据，内存中同一时间只保留一条记录
+        
+        Args:
+            fields: 只读取这些字段（如ANALYSIS_FIELDS），为None时读取完整记录
+        """
+        return self.store.scan(fields=fields)
     
     def analyze_with_llm(self, prompt: str, model: str = "gpt-4.1-mini") -> str:
         """
@@ -111,26 +241,66 @@ class CompetitorAnalyzer:
         if not self.llm_available:
             return "LLM不可用，无法执行智能分析"
         
-        try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个专业的产品经理和技术分析师，擅长分析竞品功能并提供产品迭代建议。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"⚠️  LLM分析失败: {e}")
-            return f"分析失败: {e}"
+        cache_key = None
+        if self.llm_cache:
+            cache_key = self.llm_cache.make_key(model, self.SYSTEM_PROMPT, prompt,
+                                                self.TEMPERATURE, self.MAX_TOKENS)
+            if self.llm_cache_mode == 'use':
+                cached = self.llm_cache.get(cache_key)
+                if cached is not None:
+                    LLM_REQUESTS.inc(outcome='cache_hit')
+                    return cached
+        
+        # 缓存命中时不需要客户端，未命中才创建
+        client = self.client
+        if client is None:
+            return "LLM不可用，无法执行智能分析"
+        
+        for attempt in range(self.llm_max_retries + 1):
+            try:
+                with LLM_REQUEST_SECONDS.time():
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": self.SYSTEM_PROMPT
+                            },
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ],
+                        temperature=self.TEMPERATURE,
+                        max_tokens=self.MAX_TOKENS,
+                        timeout=self.llm_timeout
+                    )
+                content = response.choices[0].message.content
+                LLM_REQUESTS.inc(outcome='success')
+                break
+            except Exception as e:
+                if self._is_transient_llm_error(e) and attempt < self.llm_max_retries:
+                    LLM_REQUESTS.inc(outcome='retry')
+                    # 指数退避加随机抖动，避免并发请求同时重试
+                    delay = min(2 ** attempt, 30) * (0.5 + random.random())
+                    print(f"⚠️  LLM请求被限流或超时，{delay:.1f} 秒后重试: {e}")
+                    time.sleep(delay)
+                    continue
+                LLM_REQUESTS.inc(outcome='error')
+                print(f"⚠️  LLM分析失败: {e}")
+                return f"分析失败: {e}"
+        
+        # 只缓存成功的回复
+        if cache_key and content:
+            self.llm_cache.put(cache_key, content, model=model)
+        return content
+    
+    @staticmethod
+    def _is_transient_llm_error(error: Exception) -> bool:
+        """判断是否为值得重试的限流（429）或超时错误"""
+        if getattr(error, 'status_code', None) == 429:
+            return True
+        return type(error).__name__ in ('RateLimitError', 'APITimeoutError') or isinstance(error, TimeoutError)
     
     def extract_features_from_competitor(self, competitor: Dict[str, Any]) -> List[Dict[str, str]]:
         """
@@ -155,7 +325,7 @@ class CompetitorAnalyzer:
 
 产品名称: {competitor['name']}
 产品描述: {competitor['description']}
-技术栈: {', '.join(competitor.get('tech_stack', []))}
+技术栈: {', '.join(competitor.get('tech_stack') or [])}
 
 请以JSON数组格式返回功能列表，每个功能包含：
 - name: 功能名称
@@ -171,7 +341,6 @@ class CompetitorAnalyzer:
             response = self.analyze_with_llm(prompt)
             try:
                 # 尝试解析JSON
-                import re
                 json_match = re.search(r'\[.*\]', response, re.DOTALL)
                 if json_match:
                     features = json.loads(json_match.group())
@@ -183,9 +352,161 @@ class CompetitorAnalyzer:
         # 默认返回空列表
         return []
     
+    # 批量提取时每个提示最多包含的竞品数（受回复的max_tokens限制）
+    MAX_BATCH_ENTRIES = 20
+    
+    BATCH_PROMPT_HEADER = """
+分析以下多个产品的描述，分别提取每个产品的核心功能特性。
+
+请返回一个JSON对象，键为产品编号（如"c1"），值为该产品的功能数组，每个功能包含：
+- name: 功能名称
+- description: 功能描述
+- category: 功能分类（core/advanced/integration）
+
+示例格式：
+{"c1": [{"name": "AI代码审查", "description": "使用AI自动审查代码质量", "category": "core"}], "c2": []}
+
+产品列表：
+"""
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """粗略估算token数（中文约每字1个token，英文约每2-4个字符1个token，取偏保守的值）"""
+        return len(text) // 2 + 1
+    
+    @staticmethod
+    def _batch_entry(key: str, competitor: Dict[str, Any]) -> str:
+        return (f"[{key}] 产品名称: {competitor['name']}\n"
+                f"产品描述: {competitor['description']}\n"
+                f"技术栈: {', '.join(competitor.get('tech_stack') or [])}\n")
+    
+    def _pack_batches(self, competitors: List[Dict[str, Any]]) -> List[List[int]]:
+        """按token预算把竞品分组，返回每组的下标列表"""
+        budget = self.llm_batch_tokens - self._estimate_tokens(self.BATCH_PROMPT_HEADER)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for i, competitor in enumerate(competitors):
+            cost = self._estimate_tokens(self._batch_entry(f"c{len(current) + 1}", competitor))
+            if current and (used + cost > budget or len(current) >= self.MAX_BATCH_ENTRIES):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _extract_batch(self, competitors: List[Dict[str, Any]]) -> List[Optional[List[Dict[str, str]]]]:
+        """
+        用一个提示提取多个竞品的功能
+        
+        Returns:
+            与输入顺序一致的功能列表，某个竞品的回复无法解析时对应位置为None
+        """
+        prompt = self.BATCH_PROMPT_HEADER + "\n".join(
+            self._batch_entry(f"c{i}", competitor) for i, competitor in enumerate(competitors, 1)
+        )
+        response = self.analyze_with_llm(prompt)
+        
+        # 回复内容可能为None（如被内容过滤），此时所有竞品都按解析失败处理
+        parsed: Any = {}
+        json_match = re.search(r'\{.*\}', response, re.DOTALL) if isinstance(response, str) else None
+        if json_match:
+            try:
+                parsed = json.loads(json_match.group())
+            except ValueError:
+                parsed = {}
+        if not isinstance(parsed, dict):
+            parsed = {}
+        
+        results: List[Optional[List[Dict[str, str]]]] = []
+        for i in range(1, len(competitors) + 1):
+            features = parsed.get(f"c{i}")
+            valid = isinstance(features, list) and all(
+                isinstance(f, dict) and f.get('name') for f in features
+            )
+            results.append(features if valid else None)
+        return results
+    
+    def extract_features_batched(self, competitors: List[Dict[str, Any]],
+                                 executor: Optional[ThreadPoolExecutor] = None) -> List[List[Dict[str, str]]]:
+        """
+        批量提取一组竞品的功能：多个竞品的描述打包到一个提示中，
+        只有回复中解析失败的竞品才单独重新请求
+        
+        Args:
+            competitors: 竞品数据列表
+            executor: 用于并发发送各批次请求的线程池，为None时顺序发送
+            
+        Returns:
+            与输入顺序一致的功能列表
+        """
+        results: List[Optional[List[Dict[str, str]]]] = [None] * len(competitors)
+        pending = []
+        for i, competitor in enumerate(competitors):
+            if competitor.get('features'):
+                results[i] = competitor['features']
+            elif self.llm_available and competitor.get('description'):
+                pending.append(i)
+            else:
+                results[i] = []
+        
+        if pending:
+            run = executor.map if executor else map
+            batches = self._pack_batches([competitors[i] for i in pending])
+            print(f"   🔍 批量提取 {len(pending)} 个竞品的功能特性，共 {len(batches)} 个请求...")
+            batch_inputs = [[competitors[pending[j]] for j in batch] for batch in batches]
+            for batch, features_list in zip(batches, run(self._extract_batch, batch_inputs)):
+                for j, features in zip(batch, features_list):
+                    results[pending[j]] = features
+            
+            failed = [i for i in pending if results[i] is None]
+            if failed:
+                print(f"      ⚠️  {len(failed)} 个竞品的批量结果解析失败，单独重新提取")
+                for i, features in zip(failed, run(self.extract_features_from_competitor,
+                                                   [competitors[i] for i in failed])):
+                    results[i] = features
+        
+        return [features or [] for features in results]
+    
+    def iter_with_features(self, competitors: Iterator[Dict[str, Any]]) -> Iterator[tuple]:
+        """
+        为竞品提取功能，按输入顺序产出 (竞品, 功能列表)
+        
+        llm_concurrency大于1或启用批量提取时按窗口读取竞品再提取，整个窗口完成后
+        再交给后续的差距对比，内存中最多保留一个窗口的竞品
+        """
+        batched = self.llm_batch_tokens > 0 and self.llm_available
+        if self.llm_concurrency <= 1 and not batched:
+            for competitor in competitors:
+                yield competitor, self.extract_features_from_competitor(competitor)
+            return
+        
+        window_size = max(self.llm_concurrency, 1) * (self.MAX_BATCH_ENTRIES if batched else 4)
+        with ThreadPoolExecutor(max_workers=max(self.llm_concurrency, 1)) as executor:
+            def extract(window):
+                if batched:
+                    return self.extract_features_batched(window, executor)
+                return executor.map(self.extract_features_from_competitor, window)
+            
+            window = []
+            for competitor in competitors:
+                window.append(competitor)
+                if len(window) >= window_size:
+                    yield from zip(window, extract(window))
+                    window = []
+            if window:
+                yield from zip(window, extract(window))
+    
+    def build_match_index(self, our_features: List[Dict[str, str]]) -> FeatureMatchIndex:
+        """为我们的功能构建近似匹配索引"""
+        return FeatureMatchIndex(our_features, threshold=self.match_threshold)
+    
     def compare_features(self, our_features: List[Dict[str, str]], 
                         competitor_features: List[Dict[str, str]],
-                        competitor_name: str) -> List[FeatureGap]:
+                        competitor_name: str,
+                        match_index: Optional[FeatureMatchIndex] = None) -> List[FeatureGap]:
         """
         对比功能差距
         
@@ -193,18 +514,22 @@ class CompetitorAnalyzer:
             our_features: 我们的功能列表
             competitor_features: 竞品功能列表
             competitor_name: 竞品名称
+            match_index: 预先构建的功能匹配索引，为None时临时构建
             
         Returns:
             功能差距列表
         """
         print(f"   📊 对比与 {competitor_name} 的功能差距...")
         
+        if match_index is None:
+            match_index = self.build_match_index(our_features)
+        
         gaps = []
-        our_feature_names = {f['name'].lower() for f in our_features}
         
         for comp_feature in competitor_features:
             feature_name = comp_feature['name']
-            exists = feature_name.lower() in our_feature_names
+            match = match_index.best_match(feature_name)
+            exists = match is not None
             
             # 简单的严重程度判断（实际应该用LLM分析）
             if not exists:
@@ -218,14 +543,16 @@ class CompetitorAnalyzer:
                 exists_in_our_product=exists,
                 competitor_implementation=f"{competitor_name}的实现",
                 gap_severity=severity,
-                user_impact='需要分析'
+                user_impact='需要分析',
+                matched_feature=match[0]['name'] if match else None,
+                match_score=match[1] if match else 0.0
             )
             gaps.append(gap)
         
         print(f"      ✓ 发现 {len([g for g in gaps if not g.exists_in_our_product])} 个缺失功能")
         return gaps
     
-    def generate_suggestions(self, gaps: List[FeatureGap], 
+    def generate_suggestions(self, gaps: Iterable[FeatureGap], 
                            competitor_name: str,
                            our_product_context: str = "") -> List[IterationSuggestion]:
         """
@@ -259,76 +586,185 @@ class CompetitorAnalyzer:
                 priority=priority,
                 impact='high' if gap.gap_severity in ['critical', 'high'] else 'medium',
                 effort='medium',  # 默认中等难度
-                implementation_steps=[
-                    f"1. 研究{competitor_name}的{gap.feature_name}实现方式",
-                    "2. 设计我们的实现方案",
-                    "3. 开发核心功能",
-                    "4. 编写测试用例",
-                    "5. 文档编写和用户指南"
-                ],
+                implementation_steps=(f"1. 研究{competitor_name}的{gap.feature_name}实现方式",) + SUGGESTION_STEPS,
                 estimated_time="2-4周",
-                required_resources=["开发工程师1名", "测试工程师1名"],
-                risks=[
-                    "技术实现复杂度可能超出预期",
-                    "需要额外的第三方服务支持"
-                ],
+                required_resources=SUGGESTION_RESOURCES,
+                risks=SUGGESTION_RISKS,
                 user_benefit=f"用户可以使用{gap.feature_name}功能，提升产品体验",
                 business_value="增强产品竞争力，吸引更多用户",
                 competitive_advantage=f"缩小与{competitor_name}的功能差距"
             )
             suggestions.append(suggestion)
         
+        SUGGESTIONS_GENERATED.inc(len(suggestions))
         print(f"      ✓ 生成 {len(suggestions)} 条建议")
         return suggestions
     
+    @staticmethod
+    def _hash(data: Any) -> str:
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _load_analysis_state(self, state_path: Path, our_hash: str) -> Dict[str, Dict[str, Any]]:
+        """读取上次分析的各竞品状态；我们的功能或匹配参数变化时全部作废"""
+        if not state_path.exists():
+            return {}
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get('our_hash') != our_hash:
+            print("   ♻️  我们的功能列表已变化，重新分析所有竞品")
+            return {}
+        return state.get('competitors', {})
+    
+    def _save_analysis_state(self, state_path: Path, our_hash: str,
+                             competitors: Dict[str, Dict[str, Any]],
+                             suggestions: ColumnarRecords):
+        """原子写入分析状态（各竞品的suggestions为suggestions中的下标范围）"""
+        competitors = {
+            competitor_id: dict(entry, suggestions=[suggestions.row(i) for i in entry['suggestions']])
+            for competitor_id, entry in competitors.items()
+        }
+        tmp_path = state_path.with_suffix(state_path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'our_hash': our_hash, 'competitors': competitors}, f, ensure_ascii=False)
+        os.replace(tmp_path, state_path)
+    
     def analyze_all_competitors(self, our_product_description: str,
-                                our_features: List[Dict[str, str]]) -> Dict[str, Any]:
+                                our_features: List[Dict[str, str]],
+                                incremental: bool = False,
+                                state_file: str = "analysis_state.json") -> Dict[str, Any]:
         """
         分析所有竞品并生成综合报告
         
         Args:
             our_product_description: 我们产品的描述
             our_features: 我们的功能列表
+            incremental: 增量分析，数据未变化的竞品复用上次的功能、差距和建议
+            state_file: 增量分析状态文件名（位于输出目录）
             
         Returns:
             分析报告
         """
         print(f"\n🚀 开始分析所有竞品...\n")
         
-        competitors = self.load_all_competitors()
-        print(f"📊 加载了 {len(competitors)} 个竞品数据\n")
-        
-        all_gaps = []
-        all_suggestions = []
+        # 建议流式进入Top-K堆，不保留全部建议
+        ranker = SuggestionRanker(k=self.top_k)
         competitor_summaries = []
         
-        for competitor in competitors:
-            print(f"📌 分析竞品: {competitor['name']}")
-            
-            # 提取竞品功能
-            comp_features = self.extract_features_from_competitor(competitor)
+        # 增量分析：按 竞品记录哈希 + 我们的功能哈希 判断是否需要重新分析
+        state_path = self.output_dir / state_file
+        our_hash = self._hash([our_features, self.match_threshold])
+        previous_state = self._load_analysis_state(state_path, our_hash) if incremental else {}
+        competitor_hashes: List[str] = []
+        reused: Dict[int, Dict[str, Any]] = {}
+        
+        def track_changes(records):
+            for record in records:
+                digest = self._hash(record)
+                cached = previous_state.get(record['id'])
+                # 上次提取失败或没有提取到功能的竞品不复用，重新提取
+                if cached and cached['hash'] == digest and cached.get('features'):
+                    # 直接带上上次提取的功能，跳过LLM提取
+                    reused[len(competitor_hashes)] = cached
+                    record = dict(record, features=cached['features'])
+                competitor_hashes.append(digest)
+                yield record
+        
+        # 我们的功能匹配索引只构建一次，所有竞品共用
+        match_index = self.build_match_index(our_features)
+        catalog = FeatureCatalog(match_index)
+        
+        # 提取竞品功能（可并发），结果按竞品顺序登记到功能目录
+        competitors = track_changes(self.iter_competitors(fields=self.ANALYSIS_FIELDS))
+        competitor_features = []
+        for competitor, comp_features in self.iter_with_features(competitors):
+            catalog.add_competitor(competitor, comp_features)
+            if incremental:
+                competitor_features.append(comp_features)
+        
+        competitors_analyzed = len(catalog.competitors)
+        print(f"📊 共加载 {competitors_analyzed} 个竞品数据，{len(catalog.features)} 个不同功能\n")
+        if incremental:
+            print(f"♻️  增量分析: {len(reused)} 个竞品未变化，复用上次结果；"
+                  f"{competitors_analyzed - len(reused)} 个竞品重新分析\n")
+        COMPETITORS_ANALYZED.inc(len(reused), mode='reused')
+        COMPETITORS_ANALYZED.inc(competitors_analyzed - len(reused), mode='analyzed')
+        new_state: Dict[str, Dict[str, Any]] = {}
+        # 各竞品的建议按列集中存放，new_state中只记录下标范围，保存时再展开
+        state_suggestions = ColumnarRecords(IterationSuggestion)
+        
+        # 差距统计按整个矩阵计算
+        catalog.build()
+        gaps_per_competitor = catalog.gaps_per_competitor()
+        coverage = catalog.coverage()
+        
+        for row, competitor in enumerate(catalog.competitors):
+            if row in reused:
+                suggestions = [IterationSuggestion(**s) for s in reused[row]['suggestions']]
+                for suggestion in suggestions:
+                    ranker.add(suggestion, catalog.competitors_lacking(suggestion.source_feature))
+                start = len(state_suggestions)
+                state_suggestions.extend(suggestions)
+                competitor_summaries.append({
+                    'name': competitor['name'],
+                    'website': competitor['website'],
+                    'features_count': competitor['features_count'],
+                    'gaps_count': int(gaps_per_competitor[row]),
+                    'coverage': round(float(coverage[row]), 4),
+                    'suggestions_count': len(suggestions)
+                })
+                new_state[competitor['id']] = dict(reused[row], suggestions=range(start, len(state_suggestions)))
+                continue
             
-            # 对比功能差距
-            gaps = self.compare_features(our_features, comp_features, competitor['name'])
-            all_gaps.extend(gaps)
+            print(f"📌 分析竞品: {competitor['name']}")
+            print(f"   📊 缺失功能 {gaps_per_competitor[row]} 个，功能覆盖率 {coverage[row]:.0%}")
             
-            # 生成迭代建议
+            # 只为缺失的功能构建差距对象（slots实例，用完即释放）并生成迭代建议
+            implementation = f"{competitor['name']}的实现"
+            gaps = []
+            for col, feature, level in catalog.missing_cells(row):
+                match = catalog.match(col)
+                gaps.append(FeatureGap(
+                    feature_name=feature['name'],
+                    description=feature.get('description', ''),
+                    exists_in_our_product=False,
+                    competitor_implementation=implementation,
+                    gap_severity=SEVERITY_NAMES[level],
+                    user_impact='需要分析',
+                    matched_feature=match[0] if match else None,
+                    match_score=match[1] if match else 0.0
+                ))
             suggestions = self.generate_suggestions(gaps, competitor['name'], our_product_description)
-            all_suggestions.extend(suggestions)
+            for suggestion in suggestions:
+                ranker.add(suggestion, catalog.competitors_lacking(suggestion.source_feature))
             
             # 竞品摘要
-            summary = {
+            competitor_summaries.append({
                 'name': competitor['name'],
                 'website': competitor['website'],
-                'features_count': len(comp_features),
-                'gaps_count': len([g for g in gaps if not g.exists_in_our_product]),
+                'features_count': competitor['features_count'],
+                'gaps_count': int(gaps_per_competitor[row]),
+                'coverage': round(float(coverage[row]), 4),
                 'suggestions_count': len(suggestions)
-            }
-            competitor_summaries.append(summary)
+            })
+            # 提取失败或为空的结果不写入状态，下次运行时重新提取
+            if incremental and competitor_features[row]:
+                start = len(state_suggestions)
+                state_suggestions.extend(suggestions)
+                new_state[competitor['id']] = {
+                    'hash': competitor_hashes[row],
+                    'features': competitor_features[row],
+                    'suggestions': range(start, len(state_suggestions))
+                }
             print()
         
-        # 按优先级排序建议
-        all_suggestions.sort(key=lambda x: x.priority, reverse=True)
+        if incremental:
+            self._save_analysis_state(state_path, our_hash, new_state, state_suggestions)
+        
+        total_gaps = int(gaps_per_competitor.sum())
         
         # 生成报告
         report = {
@@ -337,33 +773,85 @@ class CompetitorAnalyzer:
                 'description': our_product_description,
                 'features_count': len(our_features)
             },
-            'competitors_analyzed': len(competitors),
+            'competitors_analyzed': competitors_analyzed,
             'competitor_summaries': competitor_summaries,
-            'total_gaps': len([g for g in all_gaps if not g.exists_in_our_product]),
-            'total_suggestions': len(all_suggestions),
-            'high_priority_suggestions': len([s for s in all_suggestions if s.priority >= 4]),
-            'suggestions': [asdict(s) for s in all_suggestions[:20]]  # 只保留前20个
+            'total_gaps': total_gaps,
+            'total_suggestions': ranker.total,
+            'high_priority_suggestions': ranker.high_priority,
+            # 按综合得分保留前top_k条，同一来源功能的建议相邻
+            'suggestions': [dict(asdict(s), score=score) for s, score in ranker.top()],
+            'top_missing_features': catalog.top_missing_features(),
+            'feature_matrix': catalog.to_dict()
         }
+        if self.llm_cache:
+            report['llm_cache'] = self.llm_cache.get_stats()
         
         print(f"✅ 分析完成!")
-        print(f"   - 分析竞品: {len(competitors)} 个")
+        print(f"   - 分析竞品: {competitors_analyzed} 个")
         print(f"   - 发现差距: {report['total_gaps']} 个")
         print(f"   - 生成建议: {report['total_suggestions']} 条")
         print(f"   - 高优先级: {report['high_priority_suggestions']} 条")
+        if self.llm_cache:
+            stats = report['llm_cache']
+            print(f"   - LLM缓存: 命中 {stats['hits']}, 未命中 {stats['misses']}, "
+                  f"命中率 {stats['hit_rate']:.0%}")
         
         return report
     
     def save_report(self, report: Dict[str, Any], filename: str = "analysis_report.json"):
-        """保存分析报告"""
-        file_path = self.output_dir / filename
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        """
+        保存分析报告（扩展名为.ndjson/.jsonl时按行写出），先写临时文件再原子替换，
+        同时写出供report命令快速查询的索引文件
+        
+        Returns:
+            报告文件路径
+        """
+        file_path = write_report(report, self.output_dir / filename)
         print(f"\n💾 报告已保存到: {file_path}")
         return file_path
     
-    def generate_markdown_report(self, report: Dict[str, Any]) -> str:
-        """生成Markdown格式的分析报告"""
-        md = f"""# 竞品分析报告
+    def save_markdown_report(self, report: Dict[str, Any], filename: str = "analysis_report.md"):
+        """流式写出Markdown报告，返回文件路径"""
+        file_path = self.output_dir / filename
+        with atomic_open(file_path) as f:
+            write_chunks(self.iter_markdown_report(report), f)
+        return file_path
+    
+    def _iter_feature_matrix(self, matrix: Optional[Dict[str, Any]],
+                             max_features: int = 30, max_competitors: int = 10) -> Iterator[str]:
+        """逐行渲染功能对比矩阵表格（按拥有该功能的竞品数取前max_features个功能）"""
+        if not matrix or not matrix['features']:
+            return
+        
+        competitors = matrix['competitors'][:max_competitors]
+        rows = [set(cols) for cols in matrix['presence'][:max_competitors]]
+        counts = [0] * len(matrix['features'])
+        for cols in matrix['presence']:
+            for col in cols:
+                counts[col] += 1
+        order = sorted(range(len(counts)), key=lambda col: -counts[col])[:max_features]
+        
+        yield "## 功能对比矩阵\n\n"
+        yield "| 功能 | 我们 | " + " | ".join(competitors) + " |\n"
+        yield "|------|------|" + "|".join(["------"] * len(competitors)) + "|\n"
+        for col in order:
+            cells = ["✓" if col in row else "✗" for row in rows]
+            ours = "✓" if matrix['ours'][col] else "✗"
+            name = matrix['features'][col].replace('|', '\\|')
+            yield f"| {name} | {ours} | " + " | ".join(cells) + " |\n"
+        if len(matrix['features']) > max_features or len(matrix['competitors']) > max_competitors:
+            yield (f"\n*仅显示 {len(order)}/{len(matrix['features'])} 个功能、"
+                   f"{len(competitors)}/{len(matrix['competitors'])} 个竞品，完整矩阵见JSON报告的 feature_matrix 字段*\n")
+        yield "\n"
+    
+    def _render_feature_matrix(self, matrix: Optional[Dict[str, Any]],
+                               max_features: int = 30, max_competitors: int = 10) -> str:
+        """渲染功能对比矩阵表格"""
+        return ''.join(self._iter_feature_matrix(matrix, max_features, max_competitors))
+    
+    def iter_markdown_report(self, report: Dict[str, Any]) -> Iterator[str]:
+        """按章节逐段生成Markdown报告"""
+        yield f"""# 竞品分析报告
 
 **分析时间**: {report['analysis_date']}
 
@@ -381,7 +869,7 @@ class CompetitorAnalyzer:
 
 """
         for comp in report['competitor_summaries']:
-            md += f"""### {comp['name']}
+            yield f"""### {comp['name']}
 
 - **官网**: {comp['website']}
 - **功能数**: {comp['features_count']} 个
@@ -390,14 +878,16 @@ class CompetitorAnalyzer:
 
 """
         
-        md += """## 迭代建议
+        yield from self._iter_feature_matrix(report.get('feature_matrix'))
+        
+        yield """## 迭代建议
 
 ### 高优先级建议
 
 """
-        high_priority = [s for s in report['suggestions'] if s['priority'] >= 4]
-        for i, sugg in enumerate(high_priority[:10], 1):
-            md += f"""#### {i}. {sugg['title']}
+        high_priority = (s for s in report['suggestions'] if s['priority'] >= 4)
+        for i, sugg in enumerate(itertools.islice(high_priority, 10), 1):
+            yield f"""#### {i}. {sugg['title']}
 
 **来源**: {sugg['source_competitor']} - {sugg['source_feature']}  
 **优先级**: {sugg['priority']}/5 | **影响**: {sugg['impact']} | **难度**: {sugg['effort']}
@@ -409,9 +899,9 @@ class CompetitorAnalyzer:
 **实施步骤**:
 """
             for step in sugg['implementation_steps']:
-                md += f"{step}\n"
+                yield f"{step}\n"
             
-            md += f"""
+            yield f"""
 **预估时间**: {sugg['estimated_time']}
 
 **所需资源**: {', '.join(sugg['required_resources'])}
@@ -422,12 +912,15 @@ class CompetitorAnalyzer:
 
 """
         
-        md += """## 总结
+        yield """## 总结
 
 通过本次竞品分析，我们识别了关键的功能差距和改进机会。建议优先实施高优先级建议，以快速缩小与竞品的差距，提升产品竞争力。
 
 """
-        return md
+    
+    def generate_markdown_report(self, report: Dict[str, Any]) -> str:
+        """生成Markdown格式的分析报告（整份字符串，大报告请用save_markdown_report流式写出）"""
+        return ''.join(self.iter_markdown_report(report))
 
 
 def main():
@@ -450,10 +943,7 @@ def main():
     analyzer.save_report(report)
     
     # 生成Markdown报告
-    md_report = analyzer.generate_markdown_report(report)
-    md_path = analyzer.output_dir / "analysis_report.md"
-    with open(md_path, 'w', encoding='utf-8') as f:
-        f.write(md_report)
+    md_path = analyzer.save_markdown_report(report)
     print(f"📄 Markdown报告已保存到: {md_path}")
 
 
@@ -6,14 +6,24 @@
 
 import os
 import json
-import requests
-from typing import List, Dict, Any, Optional
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from compact_models import intern_str
+from competitor_store import open_store
+from github_client import GitHubClient
+from http_cache import HTTPResponseCache
+from metrics import REGISTRY
+from rate_limiter import GitHubRateLimiter
 
-@dataclass
+COMPETITORS_COLLECTED = REGISTRY.counter('competitors_collected_total', '批量采集的竞品数', ('result',))
+
+
+@dataclass(slots=True)
 class Competitor:
     """竞品数据模型"""
     id: str
@@ -34,6 +44,9 @@ class Competitor:
             self.features = []
         if self.tech_stack is None:
             self.tech_stack = []
+        # 分类和技术栈（语言、topic）在竞品间大量重复，驻留后共享同一字符串
+        self.category = intern_str(self.category)
+        self.tech_stack = [intern_str(t) for t in self.tech_stack]
         if self.pricing is None:
             self.pricing = {}
         if self.user_reviews is None:
@@ -47,11 +60,35 @@ class Competitor:
 class CompetitorCollector:
     """竞品信息采集器"""
     
-    def __init__(self, data_dir: str = "./data/competitors"):
+    def __init__(self, data_dir: str = "./data/competitors", pool_size: int = 10, max_retries: int = 3,
+                 cache_dir: Optional[str] = None, cache_ttl: float = 7 * 24 * 3600,
+                 cache_max_bytes: int = 50 * 1024 * 1024,
+                 rate_limit_state: Optional[str] = None, storage: str = 'json',
+                 db_path: Optional[str] = None):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.store = open_store(storage, data_dir, db_path)
         self.github_token = os.environ.get('GITHUB_TOKEN', '')
         
+        # 条件请求缓存：未变化的仓库返回304，不消耗主速率限制
+        self.http_cache = None
+        if cache_dir:
+            self.http_cache = HTTPResponseCache(cache_dir, ttl=cache_ttl, max_size_bytes=cache_max_bytes)
+        
+        # 根据X-RateLimit-*响应头调度请求，额度耗尽时等待重置而不是直接失败
+        self.rate_limiter = None
+        if rate_limit_state:
+            self.rate_limiter = GitHubRateLimiter(rate_limit_state, token=self.github_token)
+        
+        # 所有GitHub请求共用一个连接池，批量采集时复用少量keep-alive连接
+        self.http = GitHubClient(
+            token=self.github_token,
+            pool_maxsize=pool_size,
+            max_retries=max_retries,
+            cache=self.http_cache,
+            rate_limiter=self.rate_limiter
+        )
+        
     def discover_competitors(self, product_description: str, keywords: List[str]) -> List[str]:
         """
         自动发现竞品
@@ -87,6 +124,14 @@ class CompetitorCollector:
         print(f"   发现 {len(competitors)} 个潜在竞品")
         return competitors
     
+    @staticmethod
+    def _parse_repo_url(repo_url: str) -> Optional[Tuple[str, str]]:
+        """解析仓库URL，返回(所有者, 仓库名)"""
+        parts = repo_url.replace('https://github.com/', '').replace('.git', '').split('/')
+        if len(parts) < 2:
+            return None
+        return parts[0], parts[1]
+    
     def collect_github_info(self, repo_url: str) -> Dict[str, Any]:
         """
         采集GitHub仓库信息
@@ -100,20 +145,15 @@ class CompetitorCollector:
         print(f"   📦 采集GitHub信息: {repo_url}")
         
         # 解析仓库所有者和名称
-        parts = repo_url.replace('https://github.com/', '').replace('.git', '').split('/')
-        if len(parts) < 2:
+        parsed = self._parse_repo_url(repo_url)
+        if not parsed:
             return {}
         
-        owner, repo = parts[0], parts[1]
+        owner, repo = parsed
         
         try:
-            headers = {}
-            if self.github_token:
-                headers['Authorization'] = f'token {self.github_token}'
-            
             # 获取仓库基本信息
-            api_url = f'https://api.github.com/repos/{owner}/{repo}'
-            response = requests.get(api_url, headers=headers, timeout=10)
+            response = self.http.get(f'/repos/{owner}/{repo}')
             
             if response.status_code == 200:
                 repo_data = response.json()
@@ -132,11 +172,9 @@ class CompetitorCollector:
                 }
                 
                 # 获取README
-                readme_url = f'https://api.github.com/repos/{owner}/{repo}/readme'
-                readme_response = requests.get(readme_url, headers=headers, timeout=10)
-                if readme_response.status_code == 200:
-                    readme_data = readme_response.json()
-                    info['readme_url'] = readme_data.get('html_url', '')
+                readme_url = self._fetch_readme_url(owner, repo)
+                if readme_url is not None:
+                    info['readme_url'] = readme_url
                 
                 print(f"      ✓ Stars: {info['stars']}, Language: {info['language']}")
                 return info
@@ -148,7 +186,132 @@ class CompetitorCollector:
             print(f"      ✗ 采集GitHub信息失败: {e}")
             return {}
     
-    def collect_competitor_info(self, name: str, website: str = None, github_repo: str = None) -> Competitor:
+    def _fetch_readme_url(self, owner: str, repo: str) -> Optional[str]:
+        """通过REST readme接口查找仓库的README（任意文件名、docs/和.github/目录），没有时返回None"""
+        response = self.http.get(f'/repos/{owner}/{repo}/readme')
+        if response.status_code != 200:
+            return None
+        return response.json().get('html_url', '')
+    
+    # GraphQL批量查询时依次尝试的根目录README文件名，都不存在时再调用REST readme接口
+    README_NAMES = ('README.md', 'readme.md', 'Readme.md', 'README.rst', 'README.txt', 'README')
+    
+    # GraphQL批量查询中每个仓库请求的字段，对应REST接口的repo和readme两次调用
+    GRAPHQL_REPO_FIELDS = """
+        stargazerCount
+        forkCount
+        watchers { totalCount }
+        issues(states: OPEN) { totalCount }
+        pullRequests(states: OPEN) { totalCount }
+        description
+        primaryLanguage { name }
+        repositoryTopics(first: 20) { nodes { topic { name } } }
+        createdAt
+        updatedAt
+        homepageUrl
+        url
+        defaultBranchRef { name }
+    """
+    GRAPHQL_README_FIELDS = " ".join(
+        f'readme{i}: object(expression: "HEAD:{name}") {{ __typename }}' for i, name in enumerate(README_NAMES)
+    )
+    
+    @classmethod
+    def _graphql_to_info(cls, repo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """把GraphQL仓库节点映射为与collect_github_info相同的字典"""
+        info = {
+            'stars': repo_data.get('stargazerCount', 0),
+            'forks': repo_data.get('forkCount', 0),
+            'watchers': (repo_data.get('watchers') or {}).get('totalCount', 0),
+            # REST的open_issues_count包含未关闭的PR
+            'open_issues': ((repo_data.get('issues') or {}).get('totalCount', 0)
+                            + (repo_data.get('pullRequests') or {}).get('totalCount', 0)),
+            'description': repo_data.get('description') or '',
+            'language': (repo_data.get('primaryLanguage') or {}).get('name', ''),
+            'topics': [n['topic']['name'] for n in (repo_data.get('repositoryTopics') or {}).get('nodes', [])],
+            'created_at': repo_data.get('createdAt', ''),
+            'updated_at': repo_data.get('updatedAt', ''),
+            'homepage': repo_data.get('homepageUrl') or '',
+        }
+        branch = (repo_data.get('defaultBranchRef') or {}).get('name')
+        for i, name in enumerate(cls.README_NAMES):
+            if repo_data.get(f"readme{i}") and branch:
+                info['readme_url'] = f"{repo_data.get('url', '')}/blob/{branch}/{name}"
+                break
+        return info
+    
+    def _fetch_graphql_chunk(self, repos: List[Tuple[str, str, str]]) -> Dict[str, Dict[str, Any]]:
+        """用一次GraphQL请求查询一组仓库，返回 仓库URL -> 仓库信息"""
+        params = []
+        selections = []
+        variables = {}
+        for i, (_, owner, name) in enumerate(repos):
+            params.append(f"$o{i}: String!, $n{i}: String!")
+            selections.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ {self.GRAPHQL_REPO_FIELDS} {self.GRAPHQL_README_FIELDS} }}")
+            variables[f"o{i}"] = owner
+            variables[f"n{i}"] = name
+        query = f"query({', '.join(params)}) {{ {' '.join(selections)} }}"
+        
+        try:
+            result = self.http.graphql(query, variables)
+        except Exception as e:
+            print(f"      ✗ GraphQL批量查询失败: {e}")
+            return {}
+        
+        # 单个仓库不存在时对应节点为null并附带errors，不影响同批次其他仓库
+        data = result.get('data') or {}
+        infos = {}
+        for i, (repo_url, owner, name) in enumerate(repos):
+            repo_data = data.get(f"r{i}")
+            if not repo_data:
+                infos[repo_url] = {}
+                continue
+            info = self._graphql_to_info(repo_data)
+            # 根目录没有常见文件名的README（如docs/README.md）时由REST接口查找
+            if 'readme_url' not in info and repo_data.get('defaultBranchRef'):
+                try:
+                    readme_url = self._fetch_readme_url(owner, name)
+                except Exception as e:
+                    print(f"      ✗ 获取 {owner}/{name} 的README失败: {e}")
+                    readme_url = None
+                if readme_url is not None:
+                    info['readme_url'] = readme_url
+            infos[repo_url] = info
+        return infos
+    
+    def collect_github_info_bulk(self, repo_urls: List[str], batch_size: int = 50,
+                                 concurrency: int = 1) -> Dict[str, Dict[str, Any]]:
+        """
+        通过GitHub GraphQL批量采集仓库信息
+        
+        Args:
+            repo_urls: GitHub仓库URL列表
+            batch_size: 每次GraphQL请求包含的仓库数
+            concurrency: 最大并发请求数
+            
+        Returns:
+            仓库URL -> 仓库信息字典（与collect_github_info格式相同，失败为空字典）
+        """
+        repos = []
+        for repo_url in dict.fromkeys(repo_urls):
+            parsed = self._parse_repo_url(repo_url)
+            if parsed:
+                repos.append((repo_url, parsed[0], parsed[1]))
+        chunks = [repos[i:i + batch_size] for i in range(0, len(repos), batch_size)]
+        print(f"   📦 GraphQL批量采集 {len(repos)} 个仓库，共 {len(chunks)} 次请求")
+        
+        infos: Dict[str, Dict[str, Any]] = {}
+        if concurrency > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for chunk_infos in executor.map(self._fetch_graphql_chunk, chunks):
+                    infos.update(chunk_infos)
+        else:
+            for chunk in chunks:
+                infos.update(self._fetch_graphql_chunk(chunk))
+        return infos
+    
+    def collect_competitor_info(self, name: str, website: str = None, github_repo: str = None,
+                                github_info: Optional[Dict[str, Any]] = None) -> Competitor:
         """
         采集单个竞品的完整信息
         
@@ -156,28 +319,34 @@ class CompetitorCollector:
             name: 竞品名称
             website: 官网URL
             github_repo: GitHub仓库URL
+            github_info: 已批量采集的仓库信息，提供时不再单独请求GitHub
             
         Returns:
             Competitor对象
         """
         print(f"\n📊 采集竞品信息: {name}")
         
+        # 采集GitHub信息
+        description, tech_stack = '', []
+        if github_repo:
+            if github_info is None:
+                github_info = self.collect_github_info(github_repo)
+            if github_info:
+                description = github_info.get('description', '')
+                tech_stack = [github_info.get('language', '')] + github_info.get('topics', [])
+                tech_stack = [t for t in tech_stack if t]  # 移除空值
+        
+        # 技术栈在构造时传入，由__post_init__驻留字符串
         competitor = Competitor(
-            id=name.lower().replace(' ', '-'),
+            id=self._competitor_id(name),
             name=name,
             category='direct',  # 默认为直接竞品
             website=website or f"https://{name.lower().replace(' ', '')}.com",
-            github_repo=github_repo
+            description=description,
+            github_repo=github_repo,
+            tech_stack=tech_stack
         )
         
-        # 采集GitHub信息
-        if github_repo:
-            github_info = self.collect_github_info(github_repo)
-            if github_info:
-                competitor.description = github_info.get('description', '')
-                competitor.tech_stack = [github_info.get('language', '')] + github_info.get('topics', [])
-                competitor.tech_stack = [t for t in competitor.tech_stack if t]  # 移除空值
-        
         # 这里可以添加更多采集逻辑：
         # - 爬取官网获取功能列表
         # - 采集用户评论
@@ -195,53 +364,148 @@ class CompetitorCollector:
         return competitor
     
     def save_competitor(self, competitor: Competitor):
-        """保存竞品信息到文件"""
-        file_path = self.data_dir / f"{competitor.id}.json"
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(asdict(competitor), f, indent=2, ensure_ascii=False)
-        print(f"   💾 已保存到: {file_path}")
+        """保存竞品信息到存储后端"""
+        location = self.store.save(asdict(competitor))
+        print(f"   💾 已保存到: {location}")
     
     def load_competitor(self, competitor_id: str) -> Optional[Competitor]:
-        """从文件加载竞品信息"""
-        file_path = self.data_dir / f"{competitor_id}.json"
-        if not file_path.exists():
+        """从存储后端加载竞品信息"""
+        data = self.store.get(competitor_id)
+        if data is None:
             return None
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         return Competitor(**data)
     
     def list_competitors(self) -> List[str]:
         """列出所有已采集的竞品"""
-        return [f.stem for f in self.data_dir.glob('*.json')]
+        return self.store.ids()
+    
+    @staticmethod
+    def _competitor_id(name: str) -> str:
+        """由竞品名称生成ID"""
+        return name.lower().replace(' ', '-')
+    
+    # 计算内容哈希时忽略的时间戳字段
+    VOLATILE_FIELDS = ('discovered_at', 'last_updated')
+    
+    @classmethod
+    def content_hash(cls, competitor: Competitor) -> str:
+        """计算竞品采集内容的哈希（不含时间戳），用于判断数据是否变化"""
+        data = {k: v for k, v in asdict(competitor).items() if k not in cls.VOLATILE_FIELDS}
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def is_fresh(competitor: Competitor, fresh_hours: float) -> bool:
+        """判断竞品数据是否仍在新鲜期内"""
+        try:
+            last_updated = datetime.fromisoformat(competitor.last_updated)
+        except (TypeError, ValueError):
+            return False
+        return datetime.now() - last_updated < timedelta(hours=fresh_hours)
     
-    def collect_batch(self, competitors_config: List[Dict[str, str]]) -> List[Competitor]:
+    def _load_existing(self, name: str) -> Optional[Competitor]:
+        """加载已保存的竞品记录，文件损坏时视为不存在"""
+        try:
+            return self.load_competitor(self._competitor_id(name))
+        except (OSError, ValueError, TypeError):
+            return None
+    
+    def _collect_one(self, config: Dict[str, str],
+                     github_infos: Optional[Dict[str, Dict[str, Any]]] = None,
+                     skip_unchanged: bool = False) -> Optional[Competitor]:
+        """采集并保存单个竞品，失败时返回None而不影响批次中的其他竞品"""
+        try:
+            github_repo = config.get('github_repo')
+            competitor = self.collect_competitor_info(
+                name=config['name'],
+                website=config.get('website'),
+                github_repo=github_repo,
+                github_info=github_infos.get(github_repo) if github_infos is not None and github_repo else None
+            )
+            
+            existing = self._load_existing(config['name'])
+            if existing:
+                # 保留首次发现时间；增量模式下内容未变化时不重写整条记录，
+                # 只刷新last_updated，否则记录超出新鲜期后每次都会重新采集
+                competitor.discovered_at = existing.discovered_at
+                if skip_unchanged and self.content_hash(existing) == self.content_hash(competitor):
+                    existing.last_updated = competitor.last_updated
+                    self.store.touch(existing.id, existing.last_updated)
+                    print(f"   ⏭️  内容未变化，只刷新更新时间: {competitor.id}")
+                    return existing
+            
+            self.save_competitor(competitor)
+            return competitor
+        except Exception as e:
+            print(f"   ✗ 采集 {config.get('name')} 失败: {e}")
+            return None
+    
+    def collect_batch(self, competitors_config: List[Dict[str, str]],
+                      concurrency: int = 1, backend: str = 'rest',
+                      graphql_batch_size: int = 50, incremental: bool = False,
+                      fresh_hours: float = 24) -> List[Competitor]:
         """
         批量采集竞品信息
         
         Args:
             competitors_config: 竞品配置列表，每项包含name, website, github_repo
+            concurrency: 最大并发采集数，1表示顺序采集
+            backend: GitHub数据来源，rest（每个仓库两次REST调用）或graphql（批量查询）
+            graphql_batch_size: graphql模式下每次请求包含的仓库数
+            incremental: 增量模式，跳过last_updated在新鲜期内的竞品
+            fresh_hours: 增量模式的新鲜期（小时）
             
         Returns:
-            Competitor对象列表
+            Competitor对象列表（保持配置中的原始顺序）
         """
         print(f"\n🚀 开始批量采集 {len(competitors_config)} 个竞品的信息...\n")
         
-        competitors = []
-        for config in competitors_config:
-            try:
-                competitor = self.collect_competitor_info(
-                    name=config['name'],
-                    website=config.get('website'),
-                    github_repo=config.get('github_repo')
-                )
-                self.save_competitor(competitor)
-                competitors.append(competitor)
-            except Exception as e:
-                print(f"   ✗ 采集 {config['name']} 失败: {e}")
+        # 增量模式下新鲜的竞品直接使用已有记录，不发起任何请求
+        fresh: Dict[int, Competitor] = {}
+        if incremental:
+            for i, config in enumerate(competitors_config):
+                existing = self._load_existing(config['name'])
+                if existing and self.is_fresh(existing, fresh_hours):
+                    fresh[i] = existing
+            print(f"   ♻️  增量模式: {len(fresh)} 个竞品在 {fresh_hours:g} 小时新鲜期内，跳过采集")
+        pending = [config for i, config in enumerate(competitors_config) if i not in fresh]
+        
+        github_infos = None
+        if backend == 'graphql' and pending:
+            if self.github_token:
+                repo_urls = [c['github_repo'] for c in pending if c.get('github_repo')]
+                github_infos = self.collect_github_info_bulk(repo_urls, graphql_batch_size, concurrency)
+            else:
+                print("   ⚠️  GraphQL接口需要GITHUB_TOKEN，改用REST接口采集")
+        
+        def collect(config):
+            return self._collect_one(config, github_infos, skip_unchanged=incremental)
+        
+        if concurrency > 1 and len(pending) > 1:
+            print(f"   ⚡ 并发采集，最大并发数: {concurrency}")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                # executor.map按提交顺序返回结果，同时最多concurrency个请求在途
+                collected = iter(executor.map(collect, pending))
+                results = [fresh[i] if i in fresh else next(collected) for i in range(len(competitors_config))]
+        else:
+            collected = (collect(config) for config in pending)
+            results = [fresh[i] if i in fresh else next(collected) for i in range(len(competitors_config))]
+        
+        competitors = [c for c in results if c is not None]
+        COMPETITORS_COLLECTED.inc(len(fresh), result='fresh')
+        COMPETITORS_COLLECTED.inc(len(competitors) - len(fresh), result='collected')
+        COMPETITORS_COLLECTED.inc(len(results) - len(competitors), result='failed')
         
         print(f"\n✅ 批量采集完成，成功采集 {len(competitors)} 个竞品")
+        if self.http_cache:
+            stats = self.http_cache.get_stats()
+            print(f"   🗄️  HTTP缓存: 命中(304) {stats['hits']}/{stats['revalidations']} 次重新验证, "
+                  f"未命中 {stats['misses']}, 淘汰 {stats['evictions']}")
+        if self.rate_limiter and self.rate_limiter.get_stats()['requests']:
+            stats = self.rate_limiter.get_stats()
+            print(f"   ⏱️  GitHub额度: 剩余 {stats['remaining']}/{stats['limit']}, "
+                  f"等待 {stats['waits']} 次 ({stats['wait_seconds']:.0f} 秒), 被限流 {stats['rate_limited']} 次")
         return competitors
     
     def generate_summary(self) -> Dict[str, Any]:
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+竞品数据存储后端
+支持每个竞品一个JSON文件的目录布局，以及单文件的SQLite索引存储
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+
+def project(record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """只保留记录中的指定字段（始终包含id），fields为None时原样返回"""
+    if fields is None:
+        return record
+    return {k: record.get(k) for k in dict.fromkeys(['id', *fields])}
+
+
+class JSONCompetitorStore:
+    """目录存储：每个竞品一个格式化的JSON文件"""
+
+    # 与竞品记录放在同一目录下、但不是竞品数据的文件
+    RESERVED_FILES = {'summary.json'}
+
+    def __init__(self, data_dir: str = "./data/competitors"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def _files(self) -> Iterator[Path]:
+        for file_path in self.data_dir.glob('*.json'):
+            if file_path.name not in self.RESERVED_FILES:
+                yield file_path
+
+    def save(self, record: Dict[str, Any]) -> str:
+        """保存单条竞品记录，返回保存位置"""
+        file_path = self.data_dir / f"{record['id']}.json"
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+        return str(file_path)
+
+    def touch(self, competitor_id: str, last_updated: str) -> bool:
+        """只更新竞品的last_updated（内容未变化时刷新新鲜期），记录不存在时返回False"""
+        record = self.get(competitor_id)
+        if record is None:
+            return False
+        record['last_updated'] = last_updated
+        self.save(record)
+        return True
+
+    def save_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """批量保存竞品记录，返回保存条数"""
+        count = 0
+        for record in records:
+            self.save(record)
+            count += 1
+        return count
+
+    def get(self, competitor_id: str) -> Optional[Dict[str, Any]]:
+        """按ID读取竞品记录"""
+        file_path = self.data_dir / f"{competitor_id}.json"
+        if not file_path.exists() or file_path.name in self.RESERVED_FILES:
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def ids(self) -> List[str]:
+        """列出所有竞品ID"""
+        return [f.stem for f in self._files()]
+
+    def scan(self, category: Optional[str] = None, updated_since: Optional[str] = None,
+             fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        按条件逐条遍历竞品记录
+        
+        Args:
+            category: 只返回该分类的竞品
+            updated_since: 只返回last_updated不早于该时间的竞品
+            fields: 只保留这些字段（始终包含id），为None时返回完整记录
+        """
+        for file_path in self._files():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            if category and record.get('category') != category:
+                continue
+            if updated_since and (record.get('last_updated') or '') < updated_since:
+                continue
+            yield project(record, fields)
+
+    def close(self):
+        pass
+
+
+class SQLiteCompetitorStore:
+    """单文件SQLite存储（WAL模式，按id/category/last_updated建索引）"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS competitors (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT,
+            last_updated TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_competitors_category ON competitors (category);
+        CREATE INDEX IF NOT EXISTS idx_competitors_last_updated ON competitors (last_updated);
+    """
+
+    UPSERT = """
+        INSERT INTO competitors (id, name, category, last_updated, data)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            category = excluded.category,
+            last_updated = excluded.last_updated,
+            data = excluded.data
+    """
+
+    def __init__(self, db_path: str = "./data/competitors/competitors.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # sqlite3连接不能跨线程共享，并发采集时每个线程使用自己的连接；
+        # 所有连接登记在_conns中，close时统一关闭（_generation变化后各线程重新连接）
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._generation = 0
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.generation != self._generation:
+            # 只在创建它的线程中使用，check_same_thread=False是为了close能在其他线程关闭它
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._conns_lock:
+                self._conns.append(conn)
+                self._local.generation = self._generation
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> tuple:
+        return (
+            record['id'],
+            record.get('name', ''),
+            record.get('category'),
+            record.get('last_updated'),
+            json.dumps(record, ensure_ascii=False)
+        )
+
+    def save(self, record: Dict[str, Any]) -> str:
+        """保存单条竞品记录，返回保存位置"""
+        conn = self._connect()
+        with conn:
+            conn.execute(self.UPSERT, self._row(record))
+        return f"{self.db_path}#{record['id']}"
+
+    def touch(self, competitor_id: str, last_updated: str) -> bool:
+        """只更新竞品的last_updated（内容未变化时刷新新鲜期），记录不存在时返回False"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE competitors SET last_updated = ?, data = json_set(data, '$.last_updated', ?) "
+                "WHERE id = ?",
+                (last_updated, last_updated, competitor_id)
+            )
+        return cursor.rowcount > 0
+
+    def save_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """在一个事务中批量upsert竞品记录，返回保存条数"""
+        rows = [self._row(record) for record in records]
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.UPSERT, rows)
+        return len(rows)
+
+    def get(self, competitor_id: str) -> Optional[Dict[str, Any]]:
+        """按ID读取竞品记录"""
+        row = self._connect().execute(
+            'SELECT data FROM competitors WHERE id = ?', (competitor_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def ids(self) -> List[str]:
+        """列出所有竞品ID"""
+        return [row[0] for row in self._connect().execute('SELECT id FROM competitors ORDER BY id')]
+
+    def scan(self, category: Optional[str] = None, updated_since: Optional[str] = None,
+             fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+        """按条件逐条遍历竞品记录（条件走索引，字段投影在SQLite内完成）"""
+        params: List[Any] = []
+        if fields is None:
+            sql = 'SELECT data FROM competitors'
+        else:
+            # json_extract的数组/对象结果带JSON子类型，json_object会原样嵌入
+            pairs = []
+            for field in dict.fromkeys(['id', *fields]):
+                pairs.append('?, json_extract(data, ?)')
+                params.extend([field, f'$."{field}"'])
+            sql = f"SELECT json_object({', '.join(pairs)}) FROM competitors"
+        conditions = []
+        if category:
+            conditions.append('category = ?')
+            params.append(category)
+        if updated_since:
+            conditions.append('last_updated >= ?')
+            params.append(updated_since)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        for row in self._connect().execute(sql + ' ORDER BY id', params):
+            yield json.loads(row[0])
+
+    def close(self):
+        """关闭所有线程打开的连接"""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+            self._generation += 1
+        for conn in conns:
+            conn.close()
+        self._local.conn = None
+
+
+def open_store(storage: str = 'json', data_dir: str = "./data/competitors",
+               db_path: Optional[str] = None):
+    """
+    按名称创建存储后端
+
+    Args:
+        storage: json或sqlite
+        data_dir: JSON目录
+        db_path: SQLite数据库文件，默认为 data_dir/competitors.db
+    """
+    if storage == 'json':
+        return JSONCompetitorStore(data_dir)
+    if storage == 'sqlite':
+        return SQLiteCompetitorStore(db_path or str(Path(data_dir) / 'competitors.db'))
+    raise ValueError(f"未知的存储后端: {storage}")
+
+
+def migrate_json_to_sqlite(data_dir: str, db_path: Optional[str] = None, batch_size: int = 500) -> int:
+    """
+    把JSON目录中的竞品记录一次性迁移到SQLite
+
+    Returns:
+        迁移的记录数
+    """
+    source = JSONCompetitorStore(data_dir)
+    target = open_store('sqlite', data_dir, db_path)
+    total = 0
+    batch = []
+    for record in source.scan():
+        batch.append(record)
+        if len(batch) >= batch_size:
+            total += target.save_many(batch)
+            batch = []
+    if batch:
+        total += target.save_many(batch)
+    target.close()
+    return total
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+技术债务扫描器
+并行扫描代码仓库，每个文件只读取一次、一遍检测：空函数体、吞掉的异常、缺少错误处理的I/O调用、
+TODO/FIXME注释；扫描结束后根据测试文件的文件名和导入关系找出没有测试的模块。
+Python文件不构建AST，而是屏蔽字符串和注释后按缩进跟踪代码块，几万个文件也能在数秒内扫完
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+# 检测结果类型 -> 技术债务分类
+FINDING_CATEGORIES = {
+    'empty_body': 'incomplete_features',
+    'todo': 'incomplete_features',
+    'swallowed_exception': 'error_handling_gaps',
+    'missing_error_handling': 'error_handling_gaps',
+    'untested_module': 'missing_tests',
+}
+
+PYTHON_SUFFIXES = ('.py',)
+SCRIPT_SUFFIXES = ('.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs', '.java', '.go', '.kt', '.swift', '.cs', '.php')
+SOURCE_SUFFIXES = PYTHON_SUFFIXES + SCRIPT_SUFFIXES
+
+SKIP_DIRS = {
+    'node_modules', '__pycache__', 'venv', 'env', 'dist', 'build', 'target', 'vendor', 'coverage',
+}
+TEST_DIRS = {'test', 'tests', '__tests__', 'spec', 'specs'}
+# 不要求单独测试的入口/配置模块
+UNTESTED_IGNORE = {'__init__', '__main__', 'setup', 'conftest', 'manage', 'index', 'main'}
+
+MAX_FILE_BYTES = 1024 * 1024
+# 文件数少于该值时在当前进程内串行扫描，省去进程池的启动开销
+PARALLEL_THRESHOLD = 200
+
+TODO_RE = re.compile(r'(?:#|//|/\*|\*|<!--)\s*(TODO|FIXME|XXX|HACK)\b[:\s]*(.*)')
+
+# 花括号语言：空catch块与空函数体
+EMPTY_CATCH_RE = re.compile(r'\bcatch\s*(?:\([^)]*\))?\s*\{\s*\}')
+EMPTY_FUNCTION_RE = re.compile(r'\bfunction\b\s*\*?\s*(\w*)\s*\([^)]*\)\s*\{\s*\}')
+SCRIPT_IMPORT_RE = re.compile(r'''(?:from\s+|require\(\s*|import\s+)['"]([^'"]+)['"]''')
+
+# Python：注释与字符串（含三引号），扫描前屏蔽；字符串前缀（r、b、f等）保留在代码中
+PYTHON_TOKEN_RE = re.compile(
+    r'(?P<comment>#[^\n]*)'
+    r'''|(?P<string>\'\'\'[\s\S]*?\'\'\'|"""[\s\S]*?"""|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*")'''
+)
+BRACKET_RE = re.compile(r'[()\[\]{}]')
+DEF_RE = re.compile(r'(?:async\s+)?def\s+(\w+)')
+IMPORT_RE = re.compile(r'(?:from\s+([\w.]+)\s+)?import\s+(.+)')
+# 可能抛出异常、应当有错误处理的调用
+RISKY_CALL_RE = re.compile(
+    r'(?<![\w.])(?:(?:requests|subprocess)\.\w+|json\.loads?|urllib\.request\.urlopen|urlopen'
+    r'|socket\.create_connection)\s*\('
+)
+# 只有这些语句的函数体/except体视为空（""为屏蔽后的文档字符串）
+TRIVIAL_STATEMENTS = {
+    'def': {'pass', '...', '""', 'r""', 'u""'},
+    'except': {'pass', '...', '""', 'r""', 'u""', 'continue'},
+    'try': set(),
+}
+STUB_DECORATORS = {'abstractmethod', 'abstractproperty', 'overload'}
+
+# 单个文件的扫描结果：(相对路径, 检测结果[(类型, 行号, 说明)], 是否为测试文件, 测试文件导入的模块名)
+FileResult = Tuple[str, List[Tuple[str, int, str]], bool, Tuple[str, ...]]
+
+
+def is_test_file(rel_path: str) -> bool:
+    """按目录名和文件名判断是否为测试文件"""
+    parts = rel_path.replace('\\', '/').split('/')
+    name = parts[-1]
+    stem = name.split('.')[0]
+    return (
+        any(part in TEST_DIRS for part in parts[:-1])
+        or stem.startswith('test_') or stem.endswith('_test') or stem == 'tests'
+        or '.test.' in name or '.spec.' in name
+    )
+
+
+def module_stem(rel_path: str) -> str:
+    """模块名（去掉目录和所有后缀）"""
+    return rel_path.replace('\\', '/').rsplit('/', 1)[-1].split('.')[0]
+
+
+def tested_stem(rel_path: str) -> str:
+    """测试文件对应的被测模块名：test_foo.py / foo_test.go / foo.test.ts -> foo"""
+    stem = module_stem(rel_path)
+    if stem.startswith('test_'):
+        return stem[len('test_'):]
+    if stem.endswith('_test'):
+        return stem[:-len('_test')]
+    return stem
+
+
+def iter_source_files(root: Path) -> Iterator[str]:
+    """递归列出源码文件（相对root的路径），跳过隐藏目录以及依赖、缓存和构建目录"""
+    stack = [str(root)]
+    root_len = len(str(root).rstrip(os.sep)) + 1
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif entry.name.endswith(SOURCE_SUFFIXES) and entry.is_file(follow_symlinks=False):
+                    yield entry.path[root_len:]
+
+
+def _line_number(text: str, offset: int) -> int:
+    return text.count('\n', 0, offset) + 1
+
+
+def _todo(match: 're.Match') -> str:
+    return f"{match.group(1)}: {match.group(2).strip()}".rstrip(': ')
+
+
+def _mask_python(text: str, findings: List[Tuple[str, int, str]]) -> str:
+    """
+    删除注释（顺便收集TODO注释）、把字符串替换为 ""，其余代码不变
+
+    多行字符串中的换行替换为续行符，行号保持不变，也不会被当成新的语句
+    """
+    def replace(match):
+        comment = match.group('comment')
+        if comment is not None:
+            todo = TODO_RE.match(comment)
+            if todo:
+                findings.append(('todo', _line_number(text, match.start()), _todo(todo)))
+            return ''
+        return '""' + '\\\n' * match.group('string').count('\n')
+    return PYTHON_TOKEN_RE.sub(replace, text)
+
+
+def _logical_lines(masked: str) -> Iterator[Tuple[int, int, str]]:
+    """按括号和续行符合并物理行，逐个返回 (起始行号, 缩进, 代码)，跳过空行"""
+    parts: List[str] = []
+    depth = start = indent = 0
+    for lineno, line in enumerate(masked.split('\n'), 1):
+        stripped = line.strip()
+        if not parts:
+            if not stripped or stripped == '\\':
+                continue
+            # 最常见的情况：没有括号和续行符的单行语句
+            if not BRACKET_RE.search(stripped) and stripped[-1] != '\\':
+                yield lineno, len(line) - len(line.lstrip()), stripped
+                continue
+            start, indent = lineno, len(line) - len(line.lstrip())
+        continued = stripped.endswith('\\')
+        if continued:
+            stripped = stripped[:-1].rstrip()
+        if stripped:
+            parts.append(stripped)
+            if BRACKET_RE.search(stripped):
+                depth += stripped.count('(') + stripped.count('[') + stripped.count('{')
+                depth -= stripped.count(')') + stripped.count(']') + stripped.count('}')
+        if depth <= 0 and not continued:
+            yield start, indent, ' '.join(parts)
+            parts, depth = [], 0
+    if parts:
+        yield start, indent, ' '.join(parts)
+
+
+def _header_body(code: str) -> str:
+    """def/except语句头中第一个顶层冒号之后的内容（单行写法的语句体）"""
+    depth = 0
+    for i, c in enumerate(code):
+        if c in '([{':
+            depth += 1
+        elif c in ')]}':
+            depth -= 1
+        elif c == ':' and depth == 0:
+            return code[i + 1:].strip()
+    return ''
+
+
+def _scan_python(text: str, is_test: bool) -> Tuple[List[Tuple[str, int, str]], Set[str]]:
+    """
+    一遍扫描Python源码：按缩进维护 def / try / except 代码块栈，
+    块结束时判断函数体或except体是否只有 pass、...、文档字符串
+
+    Returns:
+        (检测结果, 导入的模块名)
+    """
+    findings: List[Tuple[str, int, str]] = []
+    imports: Set[str] = set()
+    masked = _mask_python(text, findings)
+    # 整个文件没有这类调用时跳过逐行匹配
+    check_calls = not is_test and RISKY_CALL_RE.search(masked) is not None
+    # 代码块: [类型, 缩进, 行号, 名称, 语句体是否只有占位语句, 是否已报告缺少错误处理, 装饰器]
+    stack: List[list] = []
+    decorators: Set[str] = set()
+
+    def close(block):
+        kind, _, lineno, name, trivial, _, block_decorators = block
+        if not trivial or is_test:
+            return
+        if kind == 'def' and not block_decorators & STUB_DECORATORS:
+            findings.append(('empty_body', lineno, f"函数 {name} 没有实现"))
+        elif kind == 'except':
+            findings.append(('swallowed_exception', lineno, f"捕获 {name} 后未做任何处理"))
+
+    for lineno, indent, code in _logical_lines(masked):
+        while stack and stack[-1][1] >= indent:
+            close(stack.pop())
+        if stack and code not in TRIVIAL_STATEMENTS[stack[-1][0]]:
+            stack[-1][4] = False
+
+        if code[0] == '@':
+            decorators.add(code[1:].split('(')[0].rsplit('.', 1)[-1].strip())
+            continue
+        block = None
+        if code.startswith(('def ', 'async ')):
+            match = DEF_RE.match(code)
+            if match:
+                block = ['def', indent, lineno, match.group(1), True, False, decorators]
+        elif code.startswith('try') and code[3:].lstrip().startswith(':'):
+            block = ['try', indent, lineno, '', True, False, None]
+        elif code.startswith('except') and code[6:7] in ('', ' ', ':', '*', '('):
+            caught = code[len('except'):].lstrip('* ').split(':')[0].split(' as ')[0].strip()
+            block = ['except', indent, lineno, caught or '所有异常', True, False, None]
+        elif code.startswith('with ') and 'suppress(' in code:
+            block = ['try', indent, lineno, '', True, False, None]
+        elif is_test and code.startswith(('import ', 'from ')):
+            match = IMPORT_RE.match(code)
+            if match:
+                imports.update(part for part in (match.group(1) or '').split('.') if part)
+                for name in match.group(2).strip('() ').split(','):
+                    imports.update(part for part in name.split(' as ')[0].strip().split('.') if part)
+        decorators = set()
+
+        if check_calls and '(' in code:
+            call = RISKY_CALL_RE.search(code)
+            # 最内层函数中、不在该函数内任何try之内的调用，每个函数只报告一次
+            for position in range(len(stack) - 1, -1, -1) if call else ():
+                kind = stack[position][0]
+                if kind == 'try':
+                    break
+                if kind == 'def':
+                    function = stack[position]
+                    if not function[5]:
+                        function[5] = True
+                        findings.append(('missing_error_handling', lineno,
+                                         f"函数 {function[3]} 调用 {call.group(0).rstrip('( ')} 未做错误处理"))
+                    break
+
+        if block is not None:
+            body = _header_body(code)
+            if body:
+                # 单行写法：def f(): pass / except ValueError: pass
+                block[4] = body in TRIVIAL_STATEMENTS[block[0]]
+                close(block)
+            else:
+                stack.append(block)
+
+    while stack:
+        close(stack.pop())
+    return findings, imports
+
+
+def scan_text(rel_path: str, text: str) -> FileResult:
+    """
+    检测一个文件的内容
+
+    Args:
+        rel_path: 相对仓库根目录的路径（决定语言和是否为测试文件）
+        text: 文件内容
+
+    Returns:
+        (相对路径, 检测结果, 是否为测试文件, 测试文件导入的模块名)
+    """
+    is_test = is_test_file(rel_path)
+    if rel_path.endswith(PYTHON_SUFFIXES):
+        findings, imports = _scan_python(text, is_test)
+    else:
+        findings, imports = [], set()
+        for lineno, line in enumerate(text.splitlines(), 1):
+            if 'TODO' in line or 'FIXME' in line or 'XXX' in line or 'HACK' in line:
+                match = TODO_RE.search(line)
+                if match:
+                    findings.append(('todo', lineno, _todo(match)))
+        if is_test:
+            imports = {module_stem(path) for path in SCRIPT_IMPORT_RE.findall(text)}
+        else:
+            for match in EMPTY_CATCH_RE.finditer(text):
+                findings.append(('swallowed_exception', _line_number(text, match.start()), "空的catch块"))
+            for match in EMPTY_FUNCTION_RE.finditer(text):
+                name = match.group(1) or '匿名函数'
+                findings.append(('empty_body', _line_number(text, match.start()), f"函数 {name} 没有实现"))
+
+    findings.sort(key=lambda finding: finding[1])
+    return rel_path, findings, is_test, tuple(sorted(imports)) if is_test else ()
+
+
+def scan_file(args: Tuple[str, str]) -> Optional[FileResult]:
+    """读取并检测一个文件（进程池任务）；参数为 (仓库根目录, 相对路径)，无法读取时返回None"""
+    root, rel_path = args
+    path = os.path.join(root, rel_path)
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return None
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError:
+        return None
+    return scan_text(rel_path, text)
+
+
+def find_untested_modules(results: Sequence[FileResult]) -> List[str]:
+    """
+    找出没有测试的模块：没有同名测试文件（test_foo.py、foo.test.ts等），也没有被任何测试文件导入
+
+    Returns:
+        未测试模块的相对路径（按路径排序）
+    """
+    tested: Set[str] = set()
+    for rel_path, _, is_test, imports in results:
+        if is_test:
+            tested.add(tested_stem(rel_path))
+            tested.update(imports)
+    return sorted(
+        rel_path for rel_path, _, is_test, _ in results
+        if not is_test and module_stem(rel_path) not in tested and module_stem(rel_path) not in UNTESTED_IGNORE
+    )
+
+
+def scan_repository(root, workers: Optional[int] = None) -> Dict[str, object]:
+    """
+    并行扫描代码仓库
+
+    Args:
+        root: 仓库根目录
+        workers: 进程数，默认CPU核数；文件数少于PARALLEL_THRESHOLD或workers为1时在当前进程扫描
+
+    Returns:
+        {'root', 'files', 'findings': [{'file', 'line', 'kind', 'category', 'message'}]}
+    """
+    root = Path(root).resolve()
+    tasks = [(str(root), rel_path) for rel_path in sorted(iter_source_files(root))]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) < PARALLEL_THRESHOLD:
+        results = [scan_file(task) for task in tasks]
+    else:
+        # 按块分发，减少进程间通信次数
+        chunksize = max(1, min(256, len(tasks) // (workers * 8)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(scan_file, tasks, chunksize=chunksize))
+    results = [result for result in results if result is not None]
+
+    findings = [
+        {'file': rel_path, 'line': line, 'kind': kind, 'category': FINDING_CATEGORIES[kind], 'message': message}
+        for rel_path, file_findings, _, _ in results
+        for kind, line, message in file_findings
+    ]
+    findings.extend(
+        {'file': rel_path, 'line': 1, 'kind': 'untested_module', 'category': FINDING_CATEGORIES['untested_module'],
+         'message': f"模块 {module_stem(rel_path)} 没有对应的测试"}
+        for rel_path in find_untested_modules(results)
+    )
+    return {'root': str(root), 'files': len(results), 'findings': findings}
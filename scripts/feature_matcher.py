@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+功能匹配索引
+对我们的功能列表预先建立规范化名称、字符n-gram TF-IDF倒排索引，
+用于判断竞品功能在我们产品中是否已有近似实现
+"""
+
+import math
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class FeatureMatchIndex:
+    """我们产品功能的近似匹配索引，每次分析构建一次，供所有竞品复用"""
+
+    # 查询结果缓存上限（不同竞品经常出现同名功能）
+    MEMO_SIZE = 10000
+
+    def __init__(self, features: List[Dict[str, Any]], threshold: float = 0.5,
+                 ngram_sizes: Sequence[int] = (2, 3)):
+        """
+        Args:
+            features: 我们的功能列表（需包含name）
+            threshold: 相似度不低于该值视为已有功能
+            ngram_sizes: 字符n-gram长度
+        """
+        self.features = features
+        self.threshold = threshold
+        self.ngram_sizes = tuple(ngram_sizes)
+
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        self._memo: Dict[str, List[Tuple[int, float]]] = {}
+
+        normalized = [self.normalize(f['name']) for f in features]
+        grams_list = [self._ngrams(name) for name in normalized]
+
+        # 文档频率与IDF
+        df: Dict[str, int] = defaultdict(int)
+        for grams in grams_list:
+            for gram in set(grams):
+                df[gram] += 1
+        total = len(features)
+        self._idf = {gram: math.log((total + 1) / (count + 1)) + 1 for gram, count in df.items()}
+        self._unknown_idf = math.log(total + 1) + 1
+
+        for i, (name, grams) in enumerate(zip(normalized, grams_list)):
+            self._exact.setdefault(name, i)
+            for gram, weight in self._vector(grams).items():
+                self._postings[gram].append((i, weight))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """全角转半角、转小写并去掉空白和标点，如 "AI 代码审查" -> "ai代码审查\""""
+        text = unicodedata.normalize('NFKC', text or '').lower()
+        return ''.join(ch for ch in text if ch.isalnum())
+
+    def _ngrams(self, normalized: str) -> List[str]:
+        padded = f"^{normalized}$"
+        grams = []
+        for n in self.ngram_sizes:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return grams or [padded]
+
+    def _vector(self, grams: List[str]) -> Dict[str, float]:
+        """TF-IDF向量（L2归一化）"""
+        tf: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            tf[gram] += 1
+        vector = {gram: count * self._idf.get(gram, self._unknown_idf) for gram, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {gram: w / norm for gram, w in vector.items()}
+
+    def _scores(self, name: str) -> List[Tuple[int, float]]:
+        """计算与各候选功能的相似度，按分数降序"""
+        normalized = self.normalize(name)
+        if normalized in self._memo:
+            return self._memo[normalized]
+
+        scores: Dict[int, float] = defaultdict(float)
+        if normalized in self._exact:
+            scores[self._exact[normalized]] = 1.0
+        else:
+            # 只遍历与查询共享n-gram的功能的倒排列表
+            for gram, weight in self._vector(self._ngrams(normalized)).items():
+                for i, feature_weight in self._postings.get(gram, ()):
+                    scores[i] += weight * feature_weight
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if len(self._memo) < self.MEMO_SIZE:
+            self._memo[normalized] = ranked
+        return ranked
+
+    def query(self, name: str, top_k: int = 1) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询最相近的我们的功能
+
+        Returns:
+            (功能, 相似度) 列表，按相似度降序
+        """
+        return [(self.features[i], round(score, 4)) for i, score in self._scores(name)[:top_k]]
+
+    def best_match(self, name: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """返回相似度不低于阈值的最佳匹配，没有则返回None"""
+        matches = self.query(name, top_k=1)
+        if matches and matches[0][1] >= self.threshold:
+            return matches[0]
+        return None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+竞品 × 功能 对比矩阵
+去重后的功能目录加上稀疏（CSR形式）的竞品功能矩阵：每个竞品只保存拥有的功能列下标及其自己的功能字典，
+差距严重程度、各竞品差距数、覆盖率等统计用np.bincount按下标计算，内存随功能单元格数线性增长
+"""
+
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from feature_matcher import FeatureMatchIndex
+
+
+# 严重程度编码，数值越大越严重；NONE表示竞品没有该功能
+SEVERITY_NONE, SEVERITY_LOW, SEVERITY_MEDIUM, SEVERITY_HIGH = 0, 1, 2, 3
+SEVERITY_NAMES = {SEVERITY_LOW: 'low', SEVERITY_MEDIUM: 'medium', SEVERITY_HIGH: 'high'}
+
+
+class FeatureCatalog:
+    """竞品功能目录与对比矩阵"""
+
+    def __init__(self, match_index: FeatureMatchIndex):
+        self.match_index = match_index
+        self.features: List[Dict[str, Any]] = []
+        self.competitors: List[Dict[str, Any]] = []
+
+        self._feature_ids: Dict[str, int] = {}
+        # 每列对应的我们的功能匹配结果 (功能名, 相似度)，没有匹配为None
+        self._matches: List[Optional[Tuple[str, float]]] = []
+        # CSR：第row个竞品拥有的功能列下标为 indices[indptr[row]:indptr[row + 1]]（升序），
+        # core为对应单元格的功能在该竞品中是否为core；_cells为该竞品自己的功能字典（名称、描述以竞品为准）
+        self._indptr = array('q', [0])
+        self._indices = array('i')
+        self._core = array('b')
+        self._cells: List[Dict[str, Any]] = []
+
+        self.indptr: Optional[np.ndarray] = None
+        self.indices: Optional[np.ndarray] = None
+        self.core: Optional[np.ndarray] = None
+        self.ours: Optional[np.ndarray] = None
+        self._missing: Optional[np.ndarray] = None
+        self._lacking: Optional[np.ndarray] = None
+
+    def _feature_id(self, feature: Dict[str, Any]) -> int:
+        """按规范化名称去重，返回功能列下标"""
+        key = FeatureMatchIndex.normalize(feature['name'])
+        feature_id = self._feature_ids.get(key)
+        if feature_id is None:
+            feature_id = len(self.features)
+            self._feature_ids[key] = feature_id
+            self.features.append(feature)
+            match = self.match_index.best_match(feature['name'])
+            self._matches.append((match[0]['name'], match[1]) if match else None)
+        return feature_id
+
+    def add_competitor(self, competitor: Dict[str, Any], features: List[Dict[str, Any]]) -> int:
+        """登记一个竞品及其功能，返回行下标"""
+        # 同一竞品内重名的功能合并为一个单元格，优先保留core的那个
+        cells: Dict[int, Dict[str, Any]] = {}
+        for feature in features:
+            feature_id = self._feature_id(feature)
+            if feature_id not in cells or (feature.get('category') == 'core'
+                                           and cells[feature_id].get('category') != 'core'):
+                cells[feature_id] = feature
+        self.competitors.append({
+            'id': competitor.get('id'),
+            'name': competitor['name'],
+            'website': competitor.get('website'),
+            'features_count': len(features)
+        })
+        for feature_id in sorted(cells):
+            self._indices.append(feature_id)
+            self._core.append(cells[feature_id].get('category') == 'core')
+            self._cells.append(cells[feature_id])
+        self._indptr.append(len(self._indices))
+        return len(self.competitors) - 1
+
+    def build(self):
+        """把登记的数据转换为NumPy数组，并计算各单元格是否为我们缺失的功能"""
+        self.indptr = np.frombuffer(self._indptr, dtype=np.int64).copy()
+        self.indices = np.frombuffer(self._indices, dtype=np.int32).copy()
+        self.core = np.frombuffer(self._core, dtype=np.int8).astype(bool)
+        self.ours = np.fromiter((m is not None for m in self._matches), dtype=bool, count=len(self.features))
+        self._missing = ~self.ours[self.indices]
+        self._lacking = None
+        return self
+
+    def _row_ids(self) -> np.ndarray:
+        """每个单元格所属的竞品行号"""
+        return np.repeat(np.arange(len(self.competitors)), np.diff(self.indptr))
+
+    def gaps_per_competitor(self) -> np.ndarray:
+        """各竞品的缺失功能数"""
+        return np.bincount(self._row_ids()[self._missing], minlength=len(self.competitors))
+
+    def competitors_per_missing_feature(self) -> np.ndarray:
+        """每个功能：拥有它而我们缺失的竞品数（我们已有的功能为0）"""
+        return np.bincount(self.indices[self._missing], minlength=len(self.features))
+
+    def coverage(self) -> np.ndarray:
+        """各竞品的功能中我们已覆盖的比例"""
+        totals = np.diff(self.indptr)
+        covered = np.bincount(self._row_ids()[~self._missing], minlength=len(self.competitors))
+        return np.divide(covered, totals, out=np.ones(len(totals)), where=totals > 0)
+
+    def missing_cells(self, row: int) -> List[Tuple[int, Dict[str, Any], int]]:
+        """
+        某个竞品的缺失功能
+
+        Returns:
+            (列下标, 该竞品自己的功能字典, 严重程度编码) 列表，严重程度与compare_features的规则一致
+        """
+        start, end = int(self.indptr[row]), int(self.indptr[row + 1])
+        missing = self._missing[start:end]
+        offsets = np.flatnonzero(missing)
+        cols = self.indices[start:end][missing]
+        levels = np.full(len(cols), SEVERITY_MEDIUM, dtype=np.int8)
+        levels[self.core[start:end][missing]] = SEVERITY_HIGH
+        return [(col, self._cells[start + offset], level)
+                for col, offset, level in zip(cols.tolist(), offsets.tolist(), levels.tolist())]
+
+    def competitors_lacking(self, name: str) -> int:
+        """拥有该功能而我们缺失的竞品数"""
+        col = self._feature_ids.get(FeatureMatchIndex.normalize(name))
+        if col is None:
+            return 0
+        if self._lacking is None:
+            self._lacking = self.competitors_per_missing_feature()
+        return int(self._lacking[col])
+
+    def match(self, col: int) -> Optional[Tuple[str, float]]:
+        """某列功能在我们产品中的最佳匹配 (功能名, 相似度)，没有匹配为None"""
+        return self._matches[col]
+
+    def top_missing_features(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """被最多竞品拥有、而我们缺失的功能"""
+        counts = self.competitors_per_missing_feature()
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [
+            {'name': self.features[col]['name'], 'competitors_count': int(counts[col])}
+            for col in order if counts[col] > 0
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """导出对比矩阵（稀疏形式：每个竞品列出其拥有的功能下标）"""
+        return {
+            'features': [f['name'] for f in self.features],
+            'ours': self.ours.tolist(),
+            'competitors': [c['name'] for c in self.competitors],
+            'presence': [self.indices[start:end].tolist()
+                         for start, end in zip(self.indptr[:-1], self.indptr[1:])]
+        }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+GitHub API HTTP客户端
+为竞品采集提供共享的连接池、keep-alive和失败重试
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from typing import Any, Dict, Optional
+
+from http_cache import HTTPResponseCache
+from metrics import REGISTRY
+from rate_limiter import GitHubRateLimiter
+
+GITHUB_REQUESTS = REGISTRY.counter('github_requests_total', 'GitHub API请求数', ('method', 'status'))
+GITHUB_REQUEST_SECONDS = REGISTRY.histogram('github_request_duration_seconds', 'GitHub API请求耗时（秒）', ('method',))
+GITHUB_RATE_LIMIT_WAITS = REGISTRY.counter('github_rate_limit_waits_total', '被限流后等待额度重置的次数')
+
+
+class GitHubClient:
+    """GitHub API客户端（连接池 + keep-alive + 重试退避）"""
+
+    API_BASE = 'https://api.github.com'
+
+    # 服务端临时错误，值得退避后重试
+    RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+    def __init__(self, token: str = '', pool_connections: int = 4, pool_maxsize: int = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.5, timeout: float = 10,
+                 cache: Optional[HTTPResponseCache] = None,
+                 rate_limiter: Optional[GitHubRateLimiter] = None, rate_limit_retries: int = 3):
+        """
+        Args:
+            token: GitHub访问令牌
+            pool_connections: 连接池缓存的主机数
+            pool_maxsize: 每个主机的最大连接数（超出时请求排队等待空闲连接）
+            max_retries: 5xx和连接重置时的最大重试次数
+            backoff_factor: 指数退避系数，第n次重试前等待 backoff_factor * 2^(n-1) 秒
+            timeout: 单次请求超时（秒）
+            cache: 条件请求缓存，为None时不缓存
+            rate_limiter: 速率限制调度器，为None时不做限速
+            rate_limit_retries: 被限流（403/429）后等待重置再重试的次数
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.rate_limit_retries = rate_limit_retries
+        self.session = requests.Session()
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        if token:
+            self.session.headers['Authorization'] = f'token {token}'
+
+    def _url(self, path: str) -> str:
+        """补全API地址，允许传入相对路径或完整URL"""
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f"{self.API_BASE}/{path.lstrip('/')}"
+
+    def get(self, path: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> requests.Response:
+        """
+        发送GET请求（复用连接池中的连接）
+        
+        启用缓存时会带上If-None-Match/If-Modified-Since，服务端返回304时
+        以缓存的响应体构造200响应返回，调用方无需区分
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        url = self._url(path)
+        if self.cache is None:
+            return self._send('GET', url, headers=headers, **kwargs)
+
+        request_headers = dict(headers or {})
+        entry = self.cache.lookup(url)
+        if entry:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self._send('GET', url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.record_not_modified()
+            return self._response_from_cache(entry, response)
+        if response.status_code == 200:
+            self.cache.store(url, response.status_code, response.headers, response.content)
+        return response
+
+    def post(self, path: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+             **kwargs: Any) -> requests.Response:
+        """发送POST请求（复用连接池中的连接，不走缓存）"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self._send('POST', self._url(path), json=json, headers=headers, **kwargs)
+
+    def graphql(self, query: str, variables: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        执行GraphQL查询
+        
+        Returns:
+            响应JSON（包含data和可能的errors）
+        """
+        response = self.post('/graphql', json={'query': query, 'variables': variables or {}})
+        response.raise_for_status()
+        return response.json()
+
+    def _send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """发送请求；启用速率限制时先获取许可，被限流则等待重置后重新排队"""
+        if self.rate_limiter is None:
+            return self._request(method, url, **kwargs)
+
+        for attempt in range(self.rate_limit_retries + 1):
+            self.rate_limiter.acquire()
+            response = self._request(method, url, **kwargs)
+            self.rate_limiter.update(response.headers)
+            if not self.rate_limiter.is_rate_limited(response) or attempt == self.rate_limit_retries:
+                break
+            GITHUB_RATE_LIMIT_WAITS.inc()
+            self.rate_limiter.wait_for_reset(response)
+        return response
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """发出单个请求并记录请求数和耗时指标"""
+        with GITHUB_REQUEST_SECONDS.time(method=method):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                GITHUB_REQUESTS.inc(method=method, status='error')
+                raise
+        GITHUB_REQUESTS.inc(method=method, status=response.status_code)
+        return response
+
+    @staticmethod
+    def _response_from_cache(entry: Dict[str, Any], not_modified: requests.Response) -> requests.Response:
+        """用缓存条目构造响应，头部以304响应中的最新值（如速率限制）为准"""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response._content = entry['body']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.headers.update(not_modified.headers)
+        response.url = entry['url']
+        response.encoding = 'utf-8'
+        response.request = not_modified.request
+        response.from_cache = True
+        return response
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+HTTP条件请求缓存
+按URL在磁盘上缓存响应体及其ETag/Last-Modified，配合If-None-Match/If-Modified-Since使用
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class HTTPResponseCache:
+    """基于磁盘的HTTP响应缓存（TTL + 按大小LRU淘汰）"""
+
+    def __init__(self, cache_dir: str = "./data/cache/github", ttl: float = 7 * 24 * 3600,
+                 max_size_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: 缓存目录
+            ttl: 条目闲置超过该秒数后淘汰
+            max_size_bytes: 缓存总大小上限，超出时淘汰最久未使用的条目
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size_bytes = max_size_bytes
+
+        self._lock = threading.Lock()
+        # key -> [文件大小, 最近使用时间]
+        self._index: Dict[str, list] = {}
+        self._total_size = 0
+        # revalidations: 找到条目并发出条件请求的次数；hits: 其中服务端返回304、直接使用缓存内容的次数
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0, 'stores': 0, 'evictions': 0}
+
+        for file_path in self.cache_dir.glob('*.json'):
+            st = file_path.stat()
+            self._index[file_path.stem] = [st.st_size, st.st_mtime]
+            self._total_size += st.st_size
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _remove(self, key: str):
+        """删除条目（调用方需持有锁）"""
+        size, _ = self._index.pop(key, (0, 0))
+        self._total_size -= size
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _touch(self, key: str):
+        """刷新最近使用时间（调用方需持有锁）"""
+        now = time.time()
+        self._index[key][1] = now
+        try:
+            os.utime(self._path(key), (now, now))
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存条目，找到时计为一次重新验证（是否命中取决于服务端是否返回304）
+
+        Returns:
+            包含etag、last_modified、status、headers、body的字典；未命中或已过期返回None
+        """
+        key = self._key(url)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                self.stats['misses'] += 1
+                return None
+            if time.time() - meta[1] > self.ttl:
+                self._remove(key)
+                self.stats['evictions'] += 1
+                self.stats['misses'] += 1
+                return None
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                self._remove(key)
+                self.stats['misses'] += 1
+                return None
+            self._touch(key)
+            self.stats['revalidations'] += 1
+
+        entry['body'] = base64.b64decode(entry['body'])
+        return entry
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        """保存带校验器（ETag或Last-Modified）的响应，没有校验器的响应不缓存"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        entry = {
+            'url': url,
+            'status': status,
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': dict(headers),
+            'body': base64.b64encode(body).decode('ascii'),
+            'stored_at': time.time()
+        }
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        if len(data) > self.max_size_bytes:
+            return
+
+        key = self._key(url)
+        with self._lock:
+            self._remove(key)
+            tmp_path = self._path(key).with_suffix('.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._index[key] = [len(data), time.time()]
+            self._total_size += len(data)
+            self.stats['stores'] += 1
+            self._evict_to_fit()
+
+    def record_not_modified(self):
+        """记录一次304响应，即一次缓存命中"""
+        with self._lock:
+            self.stats['hits'] += 1
+
+    def _evict_to_fit(self):
+        """按最近使用时间淘汰条目直到总大小不超过上限（调用方需持有锁）"""
+        if self._total_size <= self.max_size_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._total_size <= self.max_size_bytes:
+                break
+            self._remove(key)
+            self.stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回命中统计（hit_rate为重新验证中返回304的比例）"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['hit_rate'] = round(stats['hits'] / stats['revalidations'], 4) if stats['revalidations'] else 0.0
+            stats['entries'] = len(self._index)
+            stats['size_bytes'] = self._total_size
+        return stats
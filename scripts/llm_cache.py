@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存
+按(模型, 系统提示, 用户提示, temperature, max_tokens)的内容哈希在磁盘上缓存LLM回复
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class LLMResponseCache:
+    """基于SQLite的LLM响应缓存（TTL + 按大小LRU淘汰）"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_responses (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_responses_accessed_at ON llm_responses (accessed_at);
+        CREATE INDEX IF NOT EXISTS idx_llm_responses_created_at ON llm_responses (created_at);
+    """
+
+    def __init__(self, cache_path: str = "./data/cache/llm_cache.db", ttl: float = 30 * 24 * 3600,
+                 max_size_bytes: int = 100 * 1024 * 1024):
+        """
+        Args:
+            cache_path: 缓存数据库文件
+            ttl: 条目创建后超过该秒数即失效
+            max_size_bytes: 缓存总大小上限，超出时淘汰最久未使用的条目
+        """
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size_bytes = max_size_bytes
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(self.SCHEMA)
+        self._total_size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM llm_responses').fetchone()[0]
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str,
+                 temperature: float, max_tokens: int) -> str:
+        """计算请求参数的内容哈希"""
+        payload = json.dumps([model, system_prompt, user_prompt, temperature, max_tokens],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存的回复，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, created_at FROM llm_responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            if now - row[1] > self.ttl:
+                self._delete(key)
+                self.stats['evictions'] += 1
+                self.stats['misses'] += 1
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE llm_responses SET accessed_at = ? WHERE key = ?', (now, key))
+            self.stats['hits'] += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = ''):
+        """写入回复并在超出大小上限时淘汰最久未使用的条目"""
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._delete(key)
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, model, response, size, now, now)
+                )
+            self._total_size += size
+            self.stats['stores'] += 1
+            self._evict()
+
+    def _delete(self, key: str):
+        """删除单个条目（调用方需持有锁）"""
+        with self._conn:
+            row = self._conn.execute('SELECT size FROM llm_responses WHERE key = ?', (key,)).fetchone()
+            if row:
+                self._conn.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                self._total_size -= row[0]
+
+    def _evict(self):
+        """删除过期条目，再按LRU删到总大小不超过上限（调用方需持有锁）"""
+        with self._conn:
+            cutoff = time.time() - self.ttl
+            expired_size, expired = self._conn.execute(
+                'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM llm_responses WHERE created_at < ?', (cutoff,)
+            ).fetchone()
+            if expired:
+                self._conn.execute('DELETE FROM llm_responses WHERE created_at < ?', (cutoff,))
+                self._total_size -= expired_size
+                self.stats['evictions'] += expired
+
+            if self._total_size <= self.max_size_bytes:
+                return
+            victims = []
+            for key, size in self._conn.execute(
+                    'SELECT key, size FROM llm_responses ORDER BY accessed_at'):
+                if self._total_size <= self.max_size_bytes:
+                    break
+                victims.append((key,))
+                self._total_size -= size
+            self._conn.executemany('DELETE FROM llm_responses WHERE key = ?', victims)
+            self.stats['evictions'] += len(victims)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回命中统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+GitHub API速率限制调度器
+根据X-RateLimit-*响应头跟踪剩余额度，用令牌桶平滑请求，额度耗尽时等待重置
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Mapping, Optional
+
+
+class GitHubRateLimiter:
+    """基于令牌桶的GitHub速率限制调度器，额度状态持久化到文件供多次CLI调用共享"""
+
+    def __init__(self, state_file: str = "./data/cache/github_rate_limit.json", token: str = '',
+                 burst: int = 10, reserve: int = 0, pace_below: float = 0.2, max_wait: float = 3700,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            state_file: 额度状态文件
+            token: GitHub访问令牌（仅用于区分不同令牌的额度，不写入文件）
+            burst: 令牌桶容量，即允许的瞬时突发请求数
+            reserve: 保留额度，剩余额度不高于该值时暂停到重置时间
+            pace_below: 剩余额度低于总额度的该比例时开始按 剩余额度/距重置时间 的速率限速
+            max_wait: 单次等待的最长秒数
+            sleep: 等待函数
+        """
+        self.state_file = Path(state_file)
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.token_id = hashlib.sha256(token.encode('utf-8')).hexdigest()[:12] if token else 'anonymous'
+        self.burst = burst
+        self.reserve = reserve
+        self.pace_below = pace_below
+        self.max_wait = max_wait
+        self._sleep = sleep
+
+        self._lock = threading.Lock()
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: float = 0
+        self._tokens = float(burst)
+        self._last_refill = time.time()
+        self.stats = {'requests': 0, 'waits': 0, 'wait_seconds': 0.0, 'rate_limited': 0}
+
+        self._load_state()
+
+    def _load_state(self):
+        """读取上一次调用留下的额度状态"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('token_id') != self.token_id or time.time() >= state.get('reset', 0):
+            return
+        self.limit = state.get('limit')
+        self.remaining = state.get('remaining')
+        self.reset = state.get('reset', 0)
+
+    def _save_state(self):
+        """原子写入额度状态（调用方需持有锁）"""
+        state = {
+            'token_id': self.token_id,
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'reset': self.reset,
+            'updated_at': time.time()
+        }
+        tmp_path = self.state_file.with_name(f"{self.state_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_file)
+        except OSError:
+            pass
+
+    def _refill(self, now: float):
+        """按剩余额度/距重置时间的速率补充令牌（调用方需持有锁）"""
+        elapsed = max(now - self._last_refill, 0)
+        self._last_refill = now
+        if self.remaining is None or (self.limit and self.remaining > self.limit * self.pace_below):
+            # 额度未知或充足时不限速
+            self._tokens = float(self.burst)
+            return
+        rate = max(self.remaining, 0) / max(self.reset - now, 1)
+        self._tokens = min(self._tokens + elapsed * rate, float(self.burst))
+
+    def acquire(self):
+        """获取一次请求许可，额度不足时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.time()
+                if self.remaining is not None and now >= self.reset:
+                    # 已过重置时间，额度恢复
+                    self.remaining = None
+                self._refill(now)
+
+                if self.remaining is not None and self.remaining <= self.reserve:
+                    wait = self.reset - now + 1
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    self.stats['requests'] += 1
+                    return
+                else:
+                    rate = max(self.remaining, 1) / max(self.reset - now, 1)
+                    wait = (1 - self._tokens) / rate
+
+            self._wait(wait)
+
+    def _wait(self, seconds: float):
+        seconds = min(max(seconds, 0), self.max_wait)
+        with self._lock:
+            self.stats['waits'] += 1
+            self.stats['wait_seconds'] += seconds
+        if seconds >= 5:
+            resume_at = time.strftime('%H:%M:%S', time.localtime(time.time() + seconds))
+            print(f"      ⏳ GitHub API额度不足，暂停 {seconds:.0f} 秒（{resume_at} 恢复）")
+        self._sleep(seconds)
+
+    def update(self, headers: Mapping[str, str]):
+        """根据响应头更新剩余额度"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        with self._lock:
+            try:
+                self.remaining = int(remaining)
+                self.limit = int(headers.get('X-RateLimit-Limit', self.limit or 0)) or None
+                self.reset = float(headers.get('X-RateLimit-Reset', self.reset))
+            except ValueError:
+                return
+            self._save_state()
+
+    @staticmethod
+    def is_rate_limited(response: Any) -> bool:
+        """判断响应是否因主/次级速率限制被拒绝"""
+        if response.status_code not in (403, 429):
+            return False
+        return (response.headers.get('X-RateLimit-Remaining') == '0'
+                or 'Retry-After' in response.headers)
+
+    def wait_for_reset(self, response: Any):
+        """被限流后等待到Retry-After或额度重置时间"""
+        with self._lock:
+            self.stats['rate_limited'] += 1
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                self._wait(float(retry_after))
+                return
+            except ValueError:
+                pass
+        self._wait(self.reset - time.time() + 1 if self.reset else 60)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """返回调度统计及当前额度"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['remaining'] = self.remaining
+            stats['limit'] = self.limit
+            stats['reset'] = self.reset
+        return stats
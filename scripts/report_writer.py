@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+分析报告流式写出
+JSON / NDJSON / Markdown 报告逐段写入文件句柄，先写临时文件再原子重命名，
+读取方不会看到写了一半的报告
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+
+# 报告中按条目流式写出的列表字段，NDJSON中每个条目一行（字段名 -> 记录类型）
+REPORT_SECTIONS = {
+    'competitor_summaries': 'competitor',
+    'suggestions': 'suggestion',
+    'top_missing_features': 'missing_feature'
+}
+# NDJSON中独占一行的大字段
+REPORT_OBJECTS = ('feature_matrix', 'llm_cache')
+# 索引中的汇总字段，以及每条建议记录的可过滤字段
+INDEX_SUMMARY_FIELDS = ('analysis_date', 'competitors_analyzed', 'total_gaps',
+                        'total_suggestions', 'high_priority_suggestions')
+INDEX_SUGGESTION_FIELDS = ('source_competitor', 'source_feature', 'priority', 'impact', 'effort')
+INDEX_VERSION = 1
+
+
+def report_format(path) -> str:
+    """按扩展名判断报告格式：json / ndjson / markdown"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if suffix in ('.md', '.markdown'):
+        return 'markdown'
+    return 'json'
+
+
+def _read_umask() -> int:
+    """读取进程umask：只能通过设置来读取，读取期间其他线程新建的文件会受影响，因此只在导入时读取一次"""
+    umask = os.umask(0o077)
+    os.umask(umask)
+    return umask
+
+
+# 新建文件的默认权限（mkstemp创建的临时文件固定为0600，重命名前改为该权限）
+_FILE_MODE = 0o666 & ~_read_umask()
+
+
+@contextmanager
+def atomic_open(path, encoding: str = 'utf-8') -> Iterator[TextIO]:
+    """
+    以写模式打开同目录下的临时文件，正常退出时落盘并重命名为目标文件；
+    出现异常则删除临时文件，目标文件保持原样
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class _OffsetWriter:
+    """包装文本文件句柄，记录已写出的UTF-8字节数"""
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.offset = 0
+
+    def write(self, text: str):
+        self.f.write(text)
+        self.offset += len(text.encode('utf-8'))
+
+
+def _index_entry(suggestion: Dict[str, Any], offset: int, length: int) -> Dict[str, Any]:
+    entry = {field: suggestion.get(field) for field in INDEX_SUGGESTION_FIELDS}
+    entry['offset'] = offset
+    entry['length'] = length
+    return entry
+
+
+def write_json_report(report: Dict[str, Any], f: TextIO, indent: int = 2,
+                      index: Optional[List[Dict[str, Any]]] = None):
+    """
+    逐段写出JSON报告：顶层字段和其中的对象（如feature_matrix）逐字段写出，
+    其中的列表逐条编码，不在内存中拼出整个字段的文本
+
+    输出与 json.dump(report, f, indent=indent, ensure_ascii=False) 一致
+
+    Args:
+        index: 传入列表时，追加每条建议在文件中的字节偏移和长度
+    """
+    f = _OffsetWriter(f)
+    pad = ' ' * indent
+
+    def write_value(value: Any, depth: int, key: Optional[str] = None):
+        if isinstance(value, dict) and value and depth < 2:
+            f.write('{')
+            for i, (name, item) in enumerate(value.items()):
+                f.write(f"{',' if i else ''}\n{pad * (depth + 1)}{json.dumps(name, ensure_ascii=False)}: ")
+                write_value(item, depth + 1, name if depth == 0 else None)
+            f.write(f"\n{pad * depth}}}")
+        elif isinstance(value, (list, tuple)) and value and depth < 3:
+            f.write('[')
+            for i, item in enumerate(value):
+                f.write(f"{',' if i else ''}\n{pad * (depth + 1)}")
+                start = f.offset
+                write_value(item, depth + 1)
+                if index is not None and key == 'suggestions':
+                    index.append(_index_entry(item, start, f.offset - start))
+            f.write(f"\n{pad * depth}]")
+        else:
+            # JSON字符串中的换行会被转义，输出里的换行都是缩进换行，可以直接整体加缩进
+            text = json.dumps(value, indent=indent, ensure_ascii=False)
+            f.write(text.replace('\n', '\n' + pad * depth))
+
+    write_value(report, 0)
+
+
+def iter_ndjson_records(report: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    把报告拆成NDJSON记录：第一行为header（各汇总字段），
+    之后每个竞品摘要、建议、缺失功能各占一行，大对象各占一行
+    """
+    header = {'type': 'header'}
+    header.update({k: v for k, v in report.items()
+                   if k not in REPORT_SECTIONS and k not in REPORT_OBJECTS})
+    yield header
+    for key, record_type in REPORT_SECTIONS.items():
+        for item in report.get(key) or ():
+            yield dict(item, type=record_type)
+    for key in REPORT_OBJECTS:
+        if report.get(key) is not None:
+            yield {'type': key, 'data': report[key]}
+
+
+def write_ndjson_report(report: Dict[str, Any], f: TextIO,
+                        index: Optional[List[Dict[str, Any]]] = None):
+    """逐行写出NDJSON报告，index的含义同write_json_report"""
+    f = _OffsetWriter(f)
+    for record in iter_ndjson_records(report):
+        start = f.offset
+        f.write(json.dumps(record, ensure_ascii=False))
+        if index is not None and record['type'] == 'suggestion':
+            index.append(_index_entry(record, start, f.offset - start))
+        f.write('\n')
+
+
+def write_chunks(chunks: Iterable[str], f: TextIO):
+    """把生成器产出的文本段依次写入文件（Markdown报告）"""
+    for chunk in chunks:
+        f.write(chunk)
+
+
+def read_report(path) -> Dict[str, Any]:
+    """读取JSON或NDJSON报告，NDJSON按记录类型还原为与JSON报告相同的结构"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if report_format(path) != 'ndjson':
+            return json.load(f)
+
+        report: Dict[str, Any] = {key: [] for key in REPORT_SECTIONS}
+        sections = {record_type: key for key, record_type in REPORT_SECTIONS.items()}
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record_type = record.pop('type', None)
+            if record_type == 'header':
+                report.update(record)
+            elif record_type in sections:
+                report[sections[record_type]].append(record)
+            elif record_type in REPORT_OBJECTS:
+                report[record_type] = record.get('data')
+        return report
+
+
+def index_path(path) -> Path:
+    """报告的索引文件路径（报告同目录下的 <报告文件名>.idx）"""
+    path = Path(path)
+    return path.with_name(path.name + '.idx')
+
+
+def write_report(report: Dict[str, Any], path) -> Path:
+    """
+    原子写出JSON或NDJSON报告（按扩展名），随后写出索引文件
+
+    索引包含汇总字段和每条建议的字节偏移，记录报告文件的大小和修改时间，
+    报告被替换后旧索引会被识别为过期
+    """
+    path = Path(path)
+    suggestions_index: List[Dict[str, Any]] = []
+    with atomic_open(path) as f:
+        if report_format(path) == 'ndjson':
+            write_ndjson_report(report, f, index=suggestions_index)
+        else:
+            write_json_report(report, f, index=suggestions_index)
+
+    stat = path.stat()
+    with atomic_open(index_path(path)) as f:
+        json.dump({
+            'version': INDEX_VERSION,
+            'report': path.name,
+            'format': report_format(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'summary': {field: report.get(field) for field in INDEX_SUMMARY_FIELDS},
+            'suggestions': suggestions_index
+        }, f, ensure_ascii=False)
+    return path
+
+
+def load_report_index(path) -> Optional[Dict[str, Any]]:
+    """读取报告索引；索引不存在、损坏或与报告文件不一致时返回None"""
+    path = Path(path)
+    try:
+        with open(index_path(path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        stat = path.stat()
+    except (OSError, ValueError):
+        return None
+    if (index.get('version') != INDEX_VERSION or index.get('size') != stat.st_size
+            or index.get('mtime_ns') != stat.st_mtime_ns):
+        return None
+    return index
+
+
+def filter_suggestions(entries: Iterable[Dict[str, Any]], competitor: Optional[str] = None,
+                       min_priority: Optional[int] = None,
+                       effort: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """按来源竞品（不区分大小写）、最低优先级、难度过滤建议（索引条目或完整建议均可）"""
+    competitor = competitor.lower() if competitor else None
+    for entry in entries:
+        if competitor and (entry.get('source_competitor') or '').lower() != competitor:
+            continue
+        if min_priority is not None and (entry.get('priority') or 0) < min_priority:
+            continue
+        if effort and entry.get('effort') != effort:
+            continue
+        yield entry
+
+
+def read_suggestions(path, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """按索引条目的字节偏移只读取对应的建议"""
+    suggestions = []
+    with open(path, 'rb') as f:
+        for entry in entries:
+            f.seek(entry['offset'])
+            suggestion = json.loads(f.read(entry['length']).decode('utf-8'))
+            suggestion.pop('type', None)
+            suggestions.append(suggestion)
+    return suggestions
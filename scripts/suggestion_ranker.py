@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+迭代建议Top-K排序
+流式接收建议，只在堆中保留得分最高的K条，总数和高优先级数精确计数
+"""
+
+import heapq
+import itertools
+import math
+from typing import Any, Dict, List, Tuple
+
+
+class SuggestionRanker:
+    """基于最小堆的Top-K建议排序器，内存占用O(K)"""
+
+    IMPACT_SCORES = {'high': 3, 'medium': 2, 'low': 1}
+    # 难度越低越值得优先做
+    EASE_SCORES = {'low': 3, 'medium': 2, 'high': 1}
+
+    PRIORITY_WEIGHT = 100
+    IMPACT_WEIGHT = 10
+    EASE_WEIGHT = 5
+    # 缺失该功能的竞品数按log2计分，约1000个竞品共有的功能相当于提升一个优先级
+    SHARED_WEIGHT = 10
+
+    def __init__(self, k: int = 20, high_priority_threshold: int = 4):
+        """
+        Args:
+            k: 保留的建议条数
+            high_priority_threshold: 优先级不低于该值计为高优先级
+        """
+        self.k = k
+        self.high_priority_threshold = high_priority_threshold
+        self.total = 0
+        self.high_priority = 0
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._seq = itertools.count()
+
+    def score(self, suggestion: Any, shared_competitors: int = 1) -> float:
+        """综合得分：优先级 > 影响 > 难度，再加上共有该功能的竞品数"""
+        return (suggestion.priority * self.PRIORITY_WEIGHT
+                + self.IMPACT_SCORES.get(suggestion.impact, 0) * self.IMPACT_WEIGHT
+                + self.EASE_SCORES.get(suggestion.effort, 0) * self.EASE_WEIGHT
+                + math.log2(1 + max(shared_competitors, 0)) * self.SHARED_WEIGHT)
+
+    def add(self, suggestion: Any, shared_competitors: int = 1):
+        """加入一条建议；堆满时只有得分更高的建议会替换堆顶"""
+        self.total += 1
+        if suggestion.priority >= self.high_priority_threshold:
+            self.high_priority += 1
+        if self.k <= 0:
+            return
+
+        # 得分相同时先加入的建议排在前面（-序号越大越优先保留）
+        entry = (self.score(suggestion, shared_competitors), -next(self._seq), suggestion)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def top(self) -> List[Tuple[Any, float]]:
+        """
+        返回保留的建议及得分
+
+        同一来源功能的建议排在一起，功能组按组内最高得分排序
+        """
+        groups: Dict[str, float] = {}
+        for score, _, suggestion in self._heap:
+            key = suggestion.source_feature.lower()
+            groups[key] = max(groups.get(key, score), score)
+        ranked = sorted(
+            self._heap,
+            key=lambda e: (-groups[e[2].source_feature.lower()], e[2].source_feature.lower(), -e[0], -e[1])
+        )
+        return [(suggestion, round(score, 2)) for score, _, suggestion in ranked]
@@ -1,14 +1,40 @@
 #!/usr/bin/env python3
 # technical_debt_tracker.py
 import os
+import sys
 import json
+import argparse
 from datetime import datetime
 
+# 添加脚本目录到路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from debt_scanner import scan_repository
+
+# 偷懒模式 -> 对应的扫描结果类型（没有对应类型的偷懒模式暂不能自动检测）
+SHORTCUT_FINDINGS = {
+    "只做界面不做逻辑": ('empty_body',),
+    "只实现一半的API": ('empty_body', 'todo'),
+    "跳过错误处理": ('swallowed_exception', 'missing_error_handling'),
+    "忽略边界情况": (),
+    "不写测试用例": ('untested_module',),
+    "缺少文档注释": ()
+}
+
 class TechnicalDebtTracker:
-    def __init__(self):
+    def __init__(self, root='.', workers=None):
+        """
+        Args:
+            root: 要扫描的代码仓库根目录
+            workers: 扫描进程数，默认CPU核数
+        """
+        self.root = root
+        self.workers = workers
+        self.scan_result = None
         self.debt_categories = {
             'incomplete_features': [],
             'missing_tests': [],
+            'error_handling_gaps': [],
             'security_issues': [],
             'performance_problems': [],
             'documentation_gaps': []
@@ -22,14 +48,33 @@ class TechnicalDebtTracker:
             "缺少文档注释"
         ]
     
+    def scan(self):
+        """并行扫描整个仓库（每个文件读取一次），结果按分类写入debt_categories"""
+        print(f"🔍 扫描代码仓库: {os.path.abspath(self.root)}")
+        started = datetime.now()
+        self.scan_result = scan_repository(self.root, workers=self.workers)
+        for findings in self.debt_categories.values():
+            findings.clear()
+        for finding in self.scan_result['findings']:
+            self.debt_categories[finding['category']].append(finding)
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"   扫描 {self.scan_result['files']} 个文件，发现 {len(self.scan_result['findings'])} 个问题"
+              f"（{elapsed:.2f} 秒）")
+        return self.scan_result
+    
+    def find_shortcut(self, shortcut_type):
+        """返回某类偷懒行为对应的扫描结果（首次调用时扫描仓库）"""
+        if self.scan_result is None:
+            self.scan()
+        kinds = SHORTCUT_FINDINGS.get(shortcut_type, ())
+        return [finding for finding in self.scan_result['findings'] if finding['kind'] in kinds]
+    
     def detect_shortcut(self, shortcut_type):
         """检测特定类型的偷懒行为"""
-        # 这里可以实现具体的检测逻辑
-        # 例如：扫描代码、检查测试覆盖率等
         print(f"正在检测: {shortcut_type}")
-        return False  # 占位符
+        return bool(self.find_shortcut(shortcut_type))
     
-    def trigger_pm_intervention(self, shortcut):
+    def trigger_pm_intervention(self, shortcut, findings=None):
         """触发PM干预"""
         intervention = {
             'timestamp': datetime.now().isoformat(),
@@ -37,29 +82,33 @@ class TechnicalDebtTracker:
             'severity': 'high',
             'action_required': '立即修复'
         }
-        print(f"🚨 PM干预触发: {shortcut}")
+        if findings is not None:
+            intervention['findings_count'] = len(findings)
+            intervention['locations'] = [f"{f['file']}:{f['line']}" for f in findings[:20]]
+        print(f"🚨 PM干预触发: {shortcut}" + (f"（{len(findings)} 处）" if findings else ""))
         return intervention
     
     def track_manus_shortcuts(self):
-        """专门追踪Manus的偷懒模式"""
+        """专门追踪Manus的偷懒模式（仓库只扫描一次，各偷懒模式从同一份结果中筛选）"""
         detected_issues = []
         
         for shortcut in self.common_shortcuts:
             if self.detect_shortcut(shortcut):
-                issue = self.trigger_pm_intervention(shortcut)
+                issue = self.trigger_pm_intervention(shortcut, self.find_shortcut(shortcut))
                 detected_issues.append(issue)
         
         return detected_issues
     
-    def generate_debt_report(self):
+    def generate_debt_report(self, report_file='technical_debt_report.json'):
         """生成技术债务报告"""
         report = {
             'timestamp': datetime.now().isoformat(),
+            'root': self.scan_result['root'] if self.scan_result else os.path.abspath(self.root),
+            'scanned_files': self.scan_result['files'] if self.scan_result else 0,
             'debt_categories': self.debt_categories,
             'total_issues': sum(len(v) for v in self.debt_categories.values())
         }
         
-        report_file = 'technical_debt_report.json'
         with open(report_file, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
         
@@ -67,7 +116,14 @@ class TechnicalDebtTracker:
         return report
 
 if __name__ == "__main__":
-    tracker = TechnicalDebtTracker()
+    parser = argparse.ArgumentParser(description='技术债务追踪器：扫描代码仓库中的偷懒模式')
+    parser.add_argument('--root', default='.', help='要扫描的代码仓库 (默认: 当前目录)')
+    parser.add_argument('--workers', type=int, default=None, help='扫描进程数 (默认: CPU核数)')
+    parser.add_argument('--output', default='technical_debt_report.json',
+                        help='报告文件 (默认: technical_debt_report.json)')
+    args = parser.parse_args()
+    
+    tracker = TechnicalDebtTracker(root=args.root, workers=args.workers)
     tracker.track_manus_shortcuts()
-    tracker.generate_debt_report()
+    tracker.generate_debt_report(args.output)
 
@@ -0,0 +1,37 @@
+"""
+测试公共配置
+scripts/ 和 pm-supervisor/ 下的模块按文件名互相导入，这里把两个目录加入sys.path
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+for directory in (ROOT / 'scripts', ROOT / 'pm-supervisor'):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+
+
+@pytest.fixture(scope='session')
+def supervisor_module(tmp_path_factory):
+    """导入监督服务模块（模块级的默认存储指向临时SQLite文件，不连接PostgreSQL）"""
+    for name in ('SUPERVISION_DB_URL', 'DB_PM_PASSWORD'):
+        os.environ.pop(name, None)
+    os.environ['SUPERVISION_SQLITE_PATH'] = str(tmp_path_factory.mktemp('supervisor') / 'supervision.db')
+    import supervisor_server
+    return supervisor_server
+
+
+@pytest.fixture
+def supervisor(supervisor_module, tmp_path, monkeypatch):
+    """每个测试使用独立的存储和干预去重缓存；写入只在flush时发生"""
+    from intervention_dedup import InterventionDeduplicator
+    from supervision_store import SQLiteSupervisionStore
+
+    store = SQLiteSupervisionStore(str(tmp_path / 'supervision.db'), flush_interval=3600)
+    monkeypatch.setattr(supervisor_module, 'store', store)
+    monkeypatch.setattr(supervisor_module, 'interventions', InterventionDeduplicator(window=300))
+    yield supervisor_module
+    store.close()
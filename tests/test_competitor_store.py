@@ -0,0 +1,33 @@
+"""
+SQLite竞品存储测试：各线程使用自己的连接，close关闭所有线程打开的连接
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from competitor_store import SQLiteCompetitorStore
+
+
+def test_close_closes_connections_of_all_threads(tmp_path):
+    store = SQLiteCompetitorStore(str(tmp_path / 'competitors.db'))
+    conns = [store._connect()]
+
+    def worker(i):
+        store.save({'id': f"c{i}", 'name': f"竞品{i}", 'category': 'direct'})
+        conns.append(store._connect())
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(conn) for conn in conns}) == 5
+    store.close()
+    for conn in conns:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+    # 关闭后再次使用时重新连接
+    assert store.ids() == ['c0', 'c1', 'c2', 'c3']
+    store.close()
@@ -0,0 +1,116 @@
+"""
+技术债务扫描测试：在临时目录中构造小型代码仓库，检查Python的字符串/注释屏蔽、
+花括号语言的正则检测、未测试模块，以及追踪器按偷懒模式触发干预
+"""
+import textwrap
+
+from debt_scanner import scan_repository, scan_text
+from technical_debt_tracker import TechnicalDebtTracker
+
+PYTHON_SOURCE = textwrap.dedent('''
+    import json
+
+    TEMPLATE = """
+    def inside_string():
+        pass
+    # TODO: 这不是注释
+    """
+    URL = "http://example.com/#TODO not a comment"
+
+
+    def stub():
+        """只有文档字符串"""
+
+
+    def parse(text):
+        return json.loads(text)  # TODO: 处理非法输入
+
+
+    def safe_parse(text):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+
+
+    class Base:
+        @abstractmethod
+        def run(self):
+            ...
+
+        def call(self, values): return sum(
+            values)
+''')
+
+SCRIPT_SOURCE = textwrap.dedent('''
+    // FIXME: 临时方案
+    function handler(req, res) {}
+    const url = "http://example.com";
+    try {
+      load();
+    } catch (e) {}
+    function ok() { return 1; }
+''')
+
+
+def kinds(findings):
+    return [(kind, line) for kind, line, _ in findings]
+
+
+def test_python_strings_and_comments_are_masked():
+    _, findings, is_test, _ = scan_text('app/parser.py', PYTHON_SOURCE)
+
+    assert not is_test
+    assert kinds(findings) == [
+        ('empty_body', 12),
+        ('todo', 17),
+        ('missing_error_handling', 17),
+        ('swallowed_exception', 23),
+    ]
+    assert findings[1][2] == 'TODO: 处理非法输入'
+    assert findings[3][2] == '捕获 ValueError 后未做任何处理'
+
+
+def test_brace_languages_use_regexes():
+    _, findings, _, _ = scan_text('web/handler.js', SCRIPT_SOURCE)
+
+    assert kinds(findings) == [('todo', 2), ('empty_body', 3), ('swallowed_exception', 7)]
+    assert findings[1][2] == '函数 handler 没有实现'
+
+    # 测试文件只收集导入，不报告空函数
+    _, findings, is_test, imports = scan_text('web/handler.test.js', "import x from './handler';\nit('a', function () {});")
+    assert is_test and findings == [] and imports == ('handler',)
+
+
+def make_repo(root):
+    (root / 'app').mkdir()
+    (root / 'app' / 'parser.py').write_text(PYTHON_SOURCE, encoding='utf-8')
+    (root / 'app' / 'covered.py').write_text('def f():\n    return 1\n', encoding='utf-8')
+    (root / 'tests').mkdir()
+    (root / 'tests' / 'test_covered.py').write_text('from app import covered\n', encoding='utf-8')
+    (root / 'web').mkdir()
+    (root / 'web' / 'handler.js').write_text(SCRIPT_SOURCE, encoding='utf-8')
+    (root / 'node_modules').mkdir()
+    (root / 'node_modules' / 'dep.js').write_text('function x() {}', encoding='utf-8')
+
+
+def test_scan_repository_reports_untested_modules(tmp_path):
+    make_repo(tmp_path)
+    result = scan_repository(tmp_path, workers=1)
+
+    assert result['files'] == 4
+    untested = sorted(f['file'] for f in result['findings'] if f['kind'] == 'untested_module')
+    assert untested == ['app/parser.py', 'web/handler.js']
+    assert not any(f['file'].startswith('node_modules') for f in result['findings'])
+
+
+def test_tracker_triggers_interventions_per_shortcut(tmp_path, capsys):
+    make_repo(tmp_path)
+    tracker = TechnicalDebtTracker(root=str(tmp_path), workers=1)
+    issues = tracker.track_manus_shortcuts()
+
+    assert [issue['issue'] for issue in issues] == ['只做界面不做逻辑', '只实现一半的API', '跳过错误处理', '不写测试用例']
+    assert issues[0]['findings_count'] == 2
+    assert issues[2]['locations'] == ['app/parser.py:17', 'app/parser.py:23', 'web/handler.js:7']
+    out = capsys.readouterr().out
+    assert out.count('正在检测: ') == len(tracker.common_shortcuts)
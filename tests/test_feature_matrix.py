@@ -0,0 +1,40 @@
+"""
+功能对比矩阵测试：按名称去重的功能列上，每个竞品的差距使用自己的功能名称和描述
+"""
+from feature_matcher import FeatureMatchIndex
+from feature_matrix import SEVERITY_HIGH, SEVERITY_MEDIUM, FeatureCatalog
+
+
+def make_catalog():
+    catalog = FeatureCatalog(FeatureMatchIndex([{'name': '代码审查'}]))
+    catalog.add_competitor({'id': 'a', 'name': 'A'}, [
+        {'name': 'Auto Fix', 'description': 'A的自动修复', 'category': 'advanced'},
+        {'name': '代码审查', 'description': 'A的审查'},
+    ])
+    catalog.add_competitor({'id': 'b', 'name': 'B'}, [
+        {'name': 'auto-fix', 'description': 'B的自动修复', 'category': 'core'},
+        {'name': 'Auto fix', 'description': 'B的重复功能'},
+    ])
+    return catalog.build()
+
+
+def test_missing_cells_keep_each_competitors_own_feature():
+    catalog = make_catalog()
+
+    assert len(catalog.features) == 2
+    (col_a, feature_a, level_a), = catalog.missing_cells(0)
+    (col_b, feature_b, level_b), = catalog.missing_cells(1)
+    assert col_a == col_b
+    assert (feature_a['name'], feature_a['description'], level_a) == ('Auto Fix', 'A的自动修复', SEVERITY_MEDIUM)
+    # 同一竞品内重名的功能只保留一个单元格，优先保留core
+    assert (feature_b['name'], feature_b['description'], level_b) == ('auto-fix', 'B的自动修复', SEVERITY_HIGH)
+
+
+def test_statistics_and_matches():
+    catalog = make_catalog()
+
+    assert catalog.gaps_per_competitor().tolist() == [1, 1]
+    assert catalog.coverage().tolist() == [0.5, 0.0]
+    assert catalog.competitors_lacking('AUTO FIX') == 2
+    assert catalog.match(catalog.missing_cells(0)[0][0]) is None
+    assert catalog.match(catalog.indices[1])[0] == '代码审查'
@@ -0,0 +1,198 @@
+"""
+GraphQL批量采集测试：用本地伪造的GitHub API（GraphQL + REST）验证别名映射、
+部分错误、README查找和GraphQL失败时回退到REST
+"""
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from competitor_collector import CompetitorCollector
+
+# owner/name -> 仓库数据；readme为根目录README文件名（None表示不在根目录），rest_readme为REST接口返回的路径
+REPOS = {
+    'acme/alpha': {'stars': 10, 'language': 'Python', 'readme': 'README.md', 'rest_readme': 'README.md'},
+    'acme/beta': {'stars': 20, 'language': 'Go', 'readme': 'README.rst', 'rest_readme': 'README.rst'},
+    'acme/gamma': {'stars': 30, 'language': 'Rust', 'readme': None, 'rest_readme': 'docs/README.md'},
+    'acme/delta': {'stars': 40, 'language': 'Java', 'readme': None, 'rest_readme': None},
+}
+
+OBJECT_RE = re.compile(r'(\w+): object\(expression: "HEAD:([^"]+)"\)')
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    """伪造的GitHub API，记录收到的请求"""
+
+    server_version = 'FakeGitHub/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(('POST', self.path))
+        if self.path != '/graphql' or self.server.graphql_status != 200:
+            self._reply(self.server.graphql_status, {'message': 'Server Error'})
+            return
+
+        readme_aliases = OBJECT_RE.findall(body['query'])
+        variables = body['variables']
+        data, errors = {}, []
+        i = 0
+        while f"o{i}" in variables:
+            key = f"{variables[f'o{i}']}/{variables[f'n{i}']}"
+            repo = REPOS.get(key)
+            if repo is None:
+                data[f"r{i}"] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [f"r{i}"],
+                               'message': f"Could not resolve to a Repository with the name '{key}'."})
+            else:
+                node = {
+                    'stargazerCount': repo['stars'],
+                    'forkCount': 1,
+                    'watchers': {'totalCount': 2},
+                    'issues': {'totalCount': 3},
+                    'pullRequests': {'totalCount': 4},
+                    'description': f"{key} description",
+                    'primaryLanguage': {'name': repo['language']},
+                    'repositoryTopics': {'nodes': [{'topic': {'name': 'ai'}}]},
+                    'createdAt': '2024-01-01T00:00:00Z',
+                    'updatedAt': '2024-06-01T00:00:00Z',
+                    'homepageUrl': None,
+                    'url': f"https://github.com/{key}",
+                    'defaultBranchRef': {'name': 'main'},
+                }
+                for alias, name in readme_aliases:
+                    node[alias] = {'__typename': 'Blob'} if name == repo['readme'] else None
+                data[f"r{i}"] = node
+            i += 1
+        result = {'data': data}
+        if errors:
+            result['errors'] = errors
+        self._reply(200, result)
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path))
+        match = re.fullmatch(r'/repos/([^/]+)/([^/]+)(/readme)?', self.path)
+        repo = REPOS.get(f"{match.group(1)}/{match.group(2)}") if match else None
+        if repo is None:
+            self._reply(404, {'message': 'Not Found'})
+        elif match.group(3):
+            if repo['rest_readme'] is None:
+                self._reply(404, {'message': 'Not Found'})
+            else:
+                self._reply(200, {'html_url': f"https://github.com/{match.group(1)}/{match.group(2)}"
+                                              f"/blob/main/{repo['rest_readme']}"})
+        else:
+            self._reply(200, {
+                'stargazers_count': repo['stars'],
+                'forks_count': 1,
+                'watchers_count': 2,
+                'open_issues_count': 7,
+                'description': f"{match.group(1)}/{match.group(2)} description",
+                'language': repo['language'],
+                'topics': ['ai'],
+            })
+
+
+@pytest.fixture
+def fake_github():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGitHub)
+    server.requests = []
+    server.graphql_status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def collector(fake_github, tmp_path, monkeypatch):
+    monkeypatch.setenv('GITHUB_TOKEN', 'test-token')
+    collector = CompetitorCollector(data_dir=str(tmp_path / 'competitors'), max_retries=0)
+    collector.http.API_BASE = f"http://127.0.0.1:{fake_github.server_address[1]}"
+    yield collector
+    collector.http.close()
+
+
+def repo_url(key):
+    return f"https://github.com/{key}"
+
+
+def test_aliases_map_back_to_their_repositories(collector, fake_github):
+    keys = ['acme/beta', 'acme/alpha', 'acme/beta']
+    infos = collector.collect_github_info_bulk([repo_url(k) for k in keys], batch_size=10)
+
+    # 重复的URL只查询一次，每个别名的结果对应到自己的仓库
+    assert set(infos) == {repo_url('acme/alpha'), repo_url('acme/beta')}
+    assert infos[repo_url('acme/alpha')]['stars'] == 10
+    assert infos[repo_url('acme/beta')]['stars'] == 20
+    assert infos[repo_url('acme/beta')]['language'] == 'Go'
+    assert infos[repo_url('acme/alpha')]['open_issues'] == 7
+    assert infos[repo_url('acme/alpha')]['topics'] == ['ai']
+    assert fake_github.requests == [('POST', '/graphql')]
+
+
+def test_batches_are_split_by_batch_size(collector, fake_github):
+    keys = ['acme/alpha', 'acme/beta', 'acme/delta']
+    infos = collector.collect_github_info_bulk([repo_url(k) for k in keys], batch_size=2)
+
+    assert [infos[repo_url(k)]['stars'] for k in keys] == [10, 20, 40]
+    assert fake_github.requests.count(('POST', '/graphql')) == 2
+
+
+def test_missing_repository_does_not_affect_the_rest_of_the_batch(collector):
+    keys = ['acme/alpha', 'acme/missing', 'acme/beta']
+    infos = collector.collect_github_info_bulk([repo_url(k) for k in keys])
+
+    assert infos[repo_url('acme/missing')] == {}
+    assert infos[repo_url('acme/alpha')]['stars'] == 10
+    assert infos[repo_url('acme/beta')]['stars'] == 20
+
+
+def test_readme_is_found_under_any_common_root_name(collector, fake_github):
+    infos = collector.collect_github_info_bulk([repo_url('acme/alpha'), repo_url('acme/beta')])
+
+    assert infos[repo_url('acme/alpha')]['readme_url'] == 'https://github.com/acme/alpha/blob/main/README.md'
+    assert infos[repo_url('acme/beta')]['readme_url'] == 'https://github.com/acme/beta/blob/main/README.rst'
+    # 根目录找到了README，不需要额外的REST请求
+    assert all(method == 'POST' for method, _ in fake_github.requests)
+
+
+def test_readme_outside_the_root_falls_back_to_rest(collector, fake_github):
+    infos = collector.collect_github_info_bulk([repo_url('acme/gamma'), repo_url('acme/delta')])
+
+    assert infos[repo_url('acme/gamma')]['readme_url'] == 'https://github.com/acme/gamma/blob/main/docs/README.md'
+    assert 'readme_url' not in infos[repo_url('acme/delta')]
+    assert ('GET', '/repos/acme/gamma/readme') in fake_github.requests
+    assert ('GET', '/repos/acme/delta/readme') in fake_github.requests
+
+
+def test_graphql_failure_falls_back_to_rest(collector, fake_github):
+    fake_github.graphql_status = 502
+    configs = [
+        {'name': 'Alpha', 'github_repo': repo_url('acme/alpha')},
+        {'name': 'Gamma', 'github_repo': repo_url('acme/gamma')},
+    ]
+    competitors = collector.collect_batch(configs, backend='graphql')
+
+    assert [c.name for c in competitors] == ['Alpha', 'Gamma']
+    assert competitors[0].description == 'acme/alpha description'
+    assert competitors[0].tech_stack == ['Python', 'ai']
+    assert competitors[1].tech_stack == ['Rust', 'ai']
+    # 技术栈在构造时传入，字符串经过驻留
+    assert all(t is sys.intern(t) for c in competitors for t in c.tech_stack)
+    assert ('GET', '/repos/acme/alpha') in fake_github.requests
+    assert ('GET', '/repos/acme/gamma/readme') in fake_github.requests
@@ -0,0 +1,67 @@
+"""
+条件请求缓存测试：只有服务端返回304、由缓存提供响应时才计为命中
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from github_client import GitHubClient
+from http_cache import HTTPResponseCache
+
+
+class FakeRepoAPI(BaseHTTPRequestHandler):
+    """带ETag的仓库接口；server.version变化后旧ETag失效"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        etag = f'"v{self.server.version}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        payload = f'{{"version": {self.server.version}}}'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def client(tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeRepoAPI)
+    server.version = 1
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = GitHubClient(cache=HTTPResponseCache(str(tmp_path / 'cache')), max_retries=0)
+    client.API_BASE = f"http://127.0.0.1:{server.server_address[1]}"
+    client.server = server
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_only_not_modified_responses_count_as_hits(client):
+    assert client.get('/repos/acme/alpha').json() == {'version': 1}
+    stats = client.cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['revalidations']) == (0, 1, 0)
+
+    # 未变化：发送条件请求，304后由缓存提供响应
+    response = client.get('/repos/acme/alpha')
+    assert response.status_code == 200 and response.json() == {'version': 1}
+    assert response.from_cache
+    stats = client.cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['revalidations']) == (1, 1, 1)
+
+    # 已变化：条件请求返回200，只计为一次重新验证，不算命中
+    client.server.version = 2
+    assert client.get('/repos/acme/alpha').json() == {'version': 2}
+    stats = client.cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['revalidations']) == (1, 1, 2)
+    assert stats['hit_rate'] == 0.5
@@ -0,0 +1,85 @@
+"""
+干预去重测试：窗口内的重复请求合并并累加次数、窗口过后重新触发、
+合并次数写入存储，以及非对象请求体被拒绝
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from intervention_dedup import InterventionDeduplicator, fingerprint, intervention_key
+
+
+def test_duplicates_inside_the_window_are_coalesced():
+    dedup = InterventionDeduplicator(window=60)
+    first, created = dedup.register({'issue': 'Slow', 'feature': 'login'}, now=100)
+    assert created and first['hit_count'] == 1
+
+    # 指纹不区分大小写和首尾空白，feature与feature_name等价
+    entry, created = dedup.register({'issue': ' slow ', 'feature_name': 'LOGIN', 'severity': 'MEDIUM'}, now=130)
+    assert not created
+    assert entry['fingerprint'] == first['fingerprint']
+    assert (entry['hit_count'], entry['first_seen'], entry['last_seen']) == (2, 100, 130)
+
+    _, created = dedup.register({'issue': 'Slow', 'feature': 'login', 'severity': 'high'}, now=131)
+    assert created
+
+
+def test_entries_expire_after_the_window():
+    dedup = InterventionDeduplicator(window=60)
+    dedup.register({'issue': 'a'}, now=100)
+    dedup.register({'issue': 'b'}, now=150)
+
+    entry, created = dedup.register({'issue': 'a'}, now=161)
+    assert created and entry['hit_count'] == 1 and entry['first_seen'] == 161
+    # 窗口从首次出现算起，之后的重复不会延长窗口
+    _, created = dedup.register({'issue': 'b'}, now=209)
+    assert not created
+    _, created = dedup.register({'issue': 'b'}, now=211)
+    assert created
+    assert dedup.get_stats()['entries'] == 2
+
+
+def test_non_string_values_are_normalized_like_the_store():
+    assert intervention_key({'issue': {'b': 1, 'a': [2]}, 'feature': ['f'], 'severity': 3}) == \
+        ('{"a": [2], "b": 1}', '["f"]', '3')
+    assert fingerprint({'issue': True}) == fingerprint({'issue': 'true'})
+    assert intervention_key({}) == ('Unknown', 'unknown', 'medium')
+
+
+def test_repeated_intervention_writes_hit_count(supervisor):
+    client = supervisor.app.test_client()
+    payload = {'issue': 'Missing tests', 'feature': 'checkout', 'severity': 'high'}
+    replies = [client.post('/intervention', json=payload).get_json() for _ in range(3)]
+
+    assert [r['status'] for r in replies] == ['intervention_triggered'] + ['intervention_coalesced'] * 2
+    assert [r['hit_count'] for r in replies] == [1, 2, 3]
+    assert len({r['fingerprint'] for r in replies}) == 1
+
+    store = supervisor.store
+    store.flush()
+    with sqlite3.connect(str(store.db_path)) as conn:
+        rows = conn.execute("SELECT issue, hit_count, last_seen_at >= created_at "
+                            "FROM pm_intervention_required").fetchall()
+    assert rows == [('Missing tests', 3, 1)]
+    since = datetime.fromisoformat(replies[0]['first_seen']) - timedelta(seconds=1)
+    assert store.recent_interventions(since)[0]['hit_count'] == 3
+
+
+@pytest.mark.parametrize('route', ['/intervention', '/audit'])
+@pytest.mark.parametrize('body', ['[1, 2]', '"text"', '3', 'null', '{broken'])
+def test_non_object_bodies_are_rejected(supervisor, route, body):
+    client = supervisor.app.test_client()
+    response = client.post(route, data=body, content_type='application/json')
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'invalid'
+    assert supervisor.store.pending() == 0
+
+
+def test_non_string_issue_is_reported_as_text(supervisor):
+    client = supervisor.app.test_client()
+    reply = client.post('/intervention', json={'issue': {'code': 7}, 'severity': ['high']}).get_json()
+
+    assert reply['status'] == 'intervention_triggered'
+    assert reply['issue'] == '{"code": 7}'
@@ -0,0 +1,126 @@
+"""
+LLM响应缓存测试：命中/未命中计数、TTL过期、超出大小上限时按LRU淘汰，
+以及 --refresh-llm-cache 不读缓存、重新请求并更新缓存
+"""
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import ai_pm_cli
+import llm_cache
+from competitor_analyzer import CompetitorAnalyzer, StubLLMClient
+from competitor_store import JSONCompetitorStore
+from llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动拨动的时钟，替换llm_cache模块中的time"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(llm_cache, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_analyzer(tmp_path, client, mode='use'):
+    return CompetitorAnalyzer(data_dir=str(tmp_path / 'competitors'), output_dir=str(tmp_path / 'analysis'),
+                              llm_cache_path=str(tmp_path / 'llm_cache.db'), llm_cache_mode=mode,
+                              llm_client=client)
+
+
+def test_hits_and_misses_with_stub_client(tmp_path):
+    client = StubLLMClient('["a"]')
+    analyzer = make_analyzer(tmp_path, client)
+
+    assert analyzer.analyze_with_llm('提示一') == '["a"]'
+    assert analyzer.analyze_with_llm('提示一') == '["a"]'
+    assert analyzer.analyze_with_llm('提示二') == '["a"]'
+    assert analyzer.analyze_with_llm('提示一', model='other-model') == '["a"]'
+
+    assert len(client.calls) == 3
+    stats = analyzer.llm_cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (1, 3, 3)
+    assert stats['hit_rate'] == 0.25
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.db'), ttl=60)
+    cache.put('k', 'value')
+
+    clock.now += 60
+    assert cache.get('k') == 'value'
+    clock.now += 1
+    assert cache.get('k') is None
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 1)
+
+    # 写入新条目时顺带清理已过期的条目
+    cache.put('old', 'x')
+    clock.now += 61
+    cache.put('new', 'y')
+    assert cache.get('old') is None and cache.get('new') == 'y'
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_cap(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / 'llm_cache.db'), max_size_bytes=10)
+    cache.put('a', 'aaaa')
+    clock.now += 1
+    cache.put('b', 'bbbb')
+    clock.now += 1
+    assert cache.get('a') == 'aaaa'
+    clock.now += 1
+    cache.put('c', 'cccc')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa' and cache.get('c') == 'cccc'
+    assert cache.get_stats()['evictions'] == 1
+    cache.close()
+
+    # 重新打开时按已有条目恢复总大小
+    reopened = LLMResponseCache(str(tmp_path / 'llm_cache.db'), max_size_bytes=10)
+    clock.now += 1
+    reopened.put('d', 'dddd')
+    assert reopened.get('a') is None and reopened.get('c') == 'cccc'
+    reopened.close()
+
+
+def test_refresh_mode_bypasses_reads_and_rewrites_the_cache(tmp_path):
+    make_analyzer(tmp_path, StubLLMClient('old')).analyze_with_llm('提示')
+
+    client = StubLLMClient('new')
+    refreshing = make_analyzer(tmp_path, client, mode='refresh')
+    assert refreshing.analyze_with_llm('提示') == 'new'
+    assert len(client.calls) == 1
+    stats = refreshing.llm_cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (0, 0, 1)
+
+    client = StubLLMClient('unused')
+    assert make_analyzer(tmp_path, client).analyze_with_llm('提示') == 'new'
+    assert client.calls == []
+
+
+def run_analyze(tmp_path, monkeypatch, *options):
+    monkeypatch.setattr(sys, 'argv', [
+        'ai_pm_cli.py', '--data-dir', str(tmp_path / 'competitors'), '--output-dir', str(tmp_path / 'analysis'),
+        'analyze', '--llm-stub', '--llm-cache', str(tmp_path / 'llm_cache.db'), *options])
+    ai_pm_cli.main()
+    with open(tmp_path / 'analysis' / 'analysis_report.json', encoding='utf-8') as f:
+        return json.load(f)['llm_cache']
+
+
+def test_refresh_llm_cache_flag(tmp_path, monkeypatch):
+    JSONCompetitorStore(str(tmp_path / 'competitors')).save(
+        {'id': 'alpha', 'name': 'Alpha', 'website': 'https://alpha.example.com',
+         'description': 'Alpha 是一个AI代码审查工具', 'features': [], 'tech_stack': []})
+
+    first = run_analyze(tmp_path, monkeypatch)
+    assert first['misses'] >= 1 and first['hits'] == 0 and first['stores'] == first['misses']
+
+    second = run_analyze(tmp_path, monkeypatch)
+    assert second['hits'] == first['misses'] and second['misses'] == 0
+
+    refreshed = run_analyze(tmp_path, monkeypatch, '--refresh-llm-cache')
+    assert (refreshed['hits'], refreshed['misses']) == (0, 0)
+    assert refreshed['stores'] == first['stores']
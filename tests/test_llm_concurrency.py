@@ -0,0 +1,150 @@
+"""
+并发功能提取测试：用本地OpenAI兼容的桩服务验证结果保持竞品顺序、
+在途请求数不超过llm_concurrency、单个请求失败只影响对应的竞品、
+不启用SDK自带的重试
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('openai')
+
+from competitor_analyzer import CompetitorAnalyzer
+
+NAME_RE = re.compile(r'产品名称: (\S+)')
+
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """OpenAI兼容的chat completions桩服务；越靠前的竞品回复越慢，使完成顺序与提交顺序相反"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = body['messages'][-1]['content']
+        match = NAME_RE.search(prompt)
+        name = match.group(1) if match else None
+
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.names.append(name)
+        try:
+            if name is not None:
+                time.sleep(server.delays.get(name, 0))
+            if name in server.failing:
+                self._reply(400, {'error': {'message': 'bad request', 'type': 'invalid_request_error'}})
+                return
+            if name in server.throttled:
+                self._reply(429, {'error': {'message': 'rate limited', 'type': 'rate_limit_error'}})
+                return
+            features = [{'name': f"{name}功能", 'description': f"{name}的功能", 'category': 'core'}] if name else []
+            self._reply(200, {
+                'id': 'chatcmpl-test',
+                'object': 'chat.completion',
+                'created': 0,
+                'model': body['model'],
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': json.dumps(features, ensure_ascii=False)},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+NAMES = [f"竞品{i}" for i in range(8)]
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAI)
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.names = []
+    server.failing = set()
+    server.throttled = set()
+    server.delays = {name: 0.05 * (len(NAMES) - i) for i, name in enumerate(NAMES)}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    monkeypatch.setenv('OPENAI_BASE_URL', f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_analyzer(tmp_path, **kwargs):
+    return CompetitorAnalyzer(data_dir=str(tmp_path / 'competitors'), output_dir=str(tmp_path / 'analysis'),
+                              llm_max_retries=0, **kwargs)
+
+
+def competitors():
+    return [{'id': f"c{i}", 'name': name, 'website': f"https://c{i}.example.com",
+             'description': f"{name} 是一个AI代码审查工具", 'features': [], 'tech_stack': []}
+            for i, name in enumerate(NAMES)]
+
+
+def test_results_keep_competitor_order(fake_openai, tmp_path):
+    analyzer = make_analyzer(tmp_path, llm_concurrency=4)
+    results = list(analyzer.iter_with_features(iter(competitors())))
+
+    assert [competitor['name'] for competitor, _ in results] == NAMES
+    assert [features[0]['name'] for _, features in results] == [f"{name}功能" for name in NAMES]
+    assert sorted(fake_openai.names) == sorted(NAMES)
+
+
+def test_in_flight_requests_are_bounded(fake_openai, tmp_path):
+    analyzer = make_analyzer(tmp_path, llm_concurrency=3)
+    list(analyzer.iter_with_features(iter(competitors())))
+
+    assert 1 < fake_openai.max_in_flight <= 3
+
+
+def test_sequential_mode_sends_one_request_at_a_time(fake_openai, tmp_path):
+    analyzer = make_analyzer(tmp_path, llm_concurrency=1)
+    results = list(analyzer.iter_with_features(iter(competitors()[:3])))
+
+    assert [features[0]['name'] for _, features in results] == [f"{name}功能" for name in NAMES[:3]]
+    assert fake_openai.max_in_flight == 1
+
+
+def test_failing_call_only_degrades_its_own_competitor(fake_openai, tmp_path):
+    fake_openai.failing = {NAMES[2], NAMES[5]}
+    analyzer = make_analyzer(tmp_path, llm_concurrency=4)
+    results = dict((competitor['name'], features)
+                   for competitor, features in analyzer.iter_with_features(iter(competitors())))
+
+    assert results[NAMES[2]] == [] and results[NAMES[5]] == []
+    for name in NAMES:
+        if name not in fake_openai.failing:
+            assert results[name] == [{'name': f"{name}功能", 'description': f"{name}的功能", 'category': 'core'}]
+
+
+def test_sdk_retries_are_disabled(fake_openai, tmp_path):
+    # 重试只由llm_max_retries控制：为0时被限流的请求只发送一次
+    fake_openai.throttled = {NAMES[0]}
+    analyzer = make_analyzer(tmp_path, llm_concurrency=1)
+    results = list(analyzer.iter_with_features(iter(competitors()[:1])))
+
+    assert results[0][1] == []
+    assert fake_openai.names == [NAMES[0]]
+    assert analyzer.client.max_retries == 0
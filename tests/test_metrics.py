@@ -0,0 +1,82 @@
+"""
+指标测试：Prometheus文本格式、监督服务的 /metrics 端点，
+以及CLI命令失败时 --metrics-file 仍然写出textfile
+"""
+import sys
+
+import pytest
+
+import ai_pm_cli
+from metrics import REGISTRY, MetricsRegistry
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('app_requests_total', '请求数', ('route', 'status'))
+    requests.inc(route='/a', status=200)
+    requests.inc(2, route='/a"\n', status=500)
+    registry.gauge('app_in_flight', '处理中').set(3)
+    duration = registry.histogram('app_seconds', '耗时', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        duration.observe(value)
+
+    assert registry.render().splitlines() == [
+        '# HELP app_in_flight 处理中',
+        '# TYPE app_in_flight gauge',
+        'app_in_flight 3',
+        '# HELP app_requests_total 请求数',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{route="/a",status="200"} 1',
+        'app_requests_total{route="/a\\"\\n",status="500"} 2',
+        '# HELP app_seconds 耗时',
+        '# TYPE app_seconds histogram',
+        'app_seconds_bucket{le="0.1"} 1',
+        'app_seconds_bucket{le="1"} 2',
+        'app_seconds_bucket{le="+Inf"} 3',
+        'app_seconds_sum 5.55',
+        'app_seconds_count 3',
+    ]
+
+
+def test_registry_rejects_conflicting_registration():
+    registry = MetricsRegistry()
+    counter = registry.counter('app_total', '计数', ('route',))
+    assert registry.counter('app_total', '计数', ('route',)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge('app_total', '计数', ('route',))
+    with pytest.raises(ValueError):
+        registry.counter('app_total', '计数', ('status',))
+
+
+def test_metrics_endpoint(supervisor):
+    client = supervisor.app.test_client()
+    assert client.get('/report').status_code == 200
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == MetricsRegistry.CONTENT_TYPE
+    lines = response.get_data(as_text=True).splitlines()
+    assert '# TYPE supervisor_http_requests_total counter' in lines
+    assert any(line.startswith('supervisor_http_requests_total{method="GET",route="/report",status="200"} ')
+               for line in lines)
+    assert 'supervisor_http_request_duration_seconds_bucket{method="GET",route="/report",le="+Inf"}' in \
+        response.get_data(as_text=True)
+    assert any(line.startswith('supervisor_store_pending_records ') for line in lines)
+
+
+def test_metrics_file_is_written_when_command_fails(tmp_path, monkeypatch):
+    def broken(args):
+        REGISTRY.counter('test_cli_runs_total', 'CLI测试运行次数').inc()
+        raise RuntimeError('boom')
+    monkeypatch.setattr(ai_pm_cli, 'cmd_list', broken)
+    path = tmp_path / 'textfile' / 'ai_pm.prom'
+    monkeypatch.setattr(sys, 'argv', ['ai_pm_cli.py', '--data-dir', str(tmp_path / 'competitors'),
+                                      '--metrics-file', str(path), 'list'])
+
+    with pytest.raises(SystemExit) as excinfo:
+        ai_pm_cli.main()
+
+    assert excinfo.value.code == 1
+    assert 'test_cli_runs_total 1' in path.read_text(encoding='utf-8').splitlines()
+    # 原子写出：目录中没有残留的临时文件
+    assert [p.name for p in path.parent.iterdir()] == ['ai_pm.prom']
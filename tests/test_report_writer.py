@@ -0,0 +1,124 @@
+"""
+报告写出测试：原子写入、流式JSON与json.dump输出一致、建议索引及其过期回退、
+按索引过滤和读取建议
+"""
+import json
+import os
+import sys
+
+import pytest
+
+import ai_pm_cli
+from report_writer import (atomic_open, filter_suggestions, index_path, load_report_index, read_report,
+                           read_suggestions, write_json_report, write_report)
+
+
+def make_report():
+    suggestions = [
+        {'title': f"建议{i}", 'source_competitor': competitor, 'source_feature': f"功能{i}",
+         'priority': priority, 'impact': 'high', 'effort': effort, 'description': '多行\n描述'}
+        for i, (competitor, priority, effort) in enumerate([
+            ('Alpha', 5, 'low'), ('Beta', 3, 'high'), ('alpha', 4, 'high'), ('Gamma', 2, 'low')])
+    ]
+    return {
+        'analysis_date': '2026-01-01T00:00:00',
+        'our_product': {'description': '我们的产品', 'features_count': 2},
+        'competitors_analyzed': 3,
+        'competitor_summaries': [{'name': 'Alpha', 'gaps_count': 1}, {'name': 'Beta', 'gaps_count': 0}],
+        'total_gaps': 1,
+        'total_suggestions': len(suggestions),
+        'high_priority_suggestions': 2,
+        'suggestions': suggestions,
+        'top_missing_features': [],
+        'feature_matrix': {'features': ['a', 'b'], 'ours': [True, False], 'competitors': ['Alpha', 'Beta'],
+                           'presence': [[0, 1], [], [1]], 'empty': {}},
+    }
+
+
+def file_mode():
+    umask = os.umask(0o077)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def test_atomic_open_replaces_target_with_default_mode(tmp_path):
+    path = tmp_path / 'out' / 'report.json'
+    with atomic_open(path) as f:
+        f.write('new')
+
+    assert path.read_text(encoding='utf-8') == 'new'
+    assert path.stat().st_mode & 0o777 == file_mode()
+    assert os.listdir(path.parent) == ['report.json']
+
+
+def test_atomic_open_keeps_target_on_error(tmp_path):
+    path = tmp_path / 'report.json'
+    path.write_text('old', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with atomic_open(path) as f:
+            f.write('half')
+            raise RuntimeError('boom')
+
+    assert path.read_text(encoding='utf-8') == 'old'
+    assert os.listdir(tmp_path) == ['report.json']
+
+
+def test_streamed_json_matches_json_dump(tmp_path):
+    report = make_report()
+    path = tmp_path / 'report.json'
+    with open(path, 'w', encoding='utf-8') as f:
+        write_json_report(report, f)
+
+    assert path.read_text(encoding='utf-8') == json.dumps(report, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('filename', ['report.json', 'report.ndjson'])
+def test_index_locates_suggestions(tmp_path, filename):
+    report = make_report()
+    path = write_report(report, tmp_path / filename)
+
+    assert read_report(path) == report
+    index = load_report_index(path)
+    assert index['summary']['total_suggestions'] == 4
+    entries = index['suggestions']
+    assert [e['source_feature'] for e in entries] == ['功能0', '功能1', '功能2', '功能3']
+    assert read_suggestions(path, entries) == report['suggestions']
+
+    selected = list(filter_suggestions(entries, competitor='ALPHA', min_priority=4))
+    assert [e['source_feature'] for e in selected] == ['功能0', '功能2']
+    selected = list(filter_suggestions(entries, effort='low', min_priority=3))
+    assert read_suggestions(path, selected) == [report['suggestions'][0]]
+
+
+def test_stale_or_missing_index_is_ignored(tmp_path):
+    path = write_report(make_report(), tmp_path / 'report.json')
+    assert load_report_index(path) is not None
+
+    # 报告被其他程序改写后，索引记录的大小或修改时间不再一致
+    path.write_text(json.dumps({'suggestions': []}), encoding='utf-8')
+    assert load_report_index(path) is None
+
+    index_path(path).write_text('{broken', encoding='utf-8')
+    assert load_report_index(path) is None
+    index_path(path).unlink()
+    assert load_report_index(path) is None
+
+
+def run_report(tmp_path, monkeypatch, capsys, *options):
+    monkeypatch.setattr(sys, 'argv', ['ai_pm_cli.py', '--output-dir', str(tmp_path), 'report', *options])
+    ai_pm_cli.main()
+    return capsys.readouterr().out
+
+
+def test_report_command_falls_back_when_index_is_stale(tmp_path, monkeypatch, capsys):
+    report = make_report()
+    path = write_report(report, tmp_path / 'analysis_report.json')
+    out = run_report(tmp_path, monkeypatch, capsys, '--competitor', 'alpha')
+    assert '建议0' in out and '建议2' in out and '建议1' not in out
+
+    # 报告被替换而索引没有更新：不能按旧偏移读取，回退为读取整个报告
+    report['suggestions'] = report['suggestions'][1:]
+    report['suggestions'][1]['title'] = '替换后的建议'
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    out = run_report(tmp_path, monkeypatch, capsys, '--competitor', 'alpha')
+    assert '替换后的建议' in out and '建议0' not in out
@@ -0,0 +1,16 @@
+"""
+CLI启动测试：轻量子命令（list/report/migrate）不导入requests、openai、numpy
+"""
+import pytest
+
+import benchmark_startup
+
+
+@pytest.mark.parametrize('command', ['list', 'report', 'migrate'])
+def test_light_commands_do_not_import_heavy_modules(tmp_path, command):
+    (tmp_path / 'data').mkdir()
+    result = benchmark_startup.measure(command, tmp_path, runs=1)
+
+    assert result['returncode'] == 0
+    assert result['forbidden_loaded'] == []
+    assert result['modules'] > 0
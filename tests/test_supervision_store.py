@@ -0,0 +1,163 @@
+"""
+监督数据存储测试（SQLite后端）：缓冲批量写入、关闭时写入剩余记录、
+/report 汇总，以及坏记录不会阻塞写缓冲区
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from supervision_store import SQLiteSupervisionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteSupervisionStore(str(tmp_path / 'supervision.db'), batch_size=1000, flush_interval=3600)
+    yield store
+    store.close()
+
+
+def count(store, table):
+    with sqlite3.connect(str(store.db_path)) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_records_are_buffered_until_flush(store):
+    for i in range(5):
+        store.record_audit({'feature_name': f"f{i}", 'completion_percentage': 100}, {}, 'completed')
+    store.record_intervention({'issue': 'slow', 'feature': 'f0'})
+
+    assert store.pending() == 6
+    assert count(store, 'pm_supervision_log') == 0
+
+    store.flush()
+    assert store.pending() == 0
+    assert count(store, 'pm_supervision_log') == 5
+    assert count(store, 'pm_intervention_required') == 1
+    assert store.stats['flushes'] == 1 and store.stats['audits_written'] == 5
+
+
+def test_batch_size_wakes_the_writer(tmp_path):
+    store = SQLiteSupervisionStore(str(tmp_path / 'supervision.db'), batch_size=3, flush_interval=3600)
+    try:
+        for i in range(3):
+            store.record_audit({'feature_name': f"f{i}"}, {}, 'completed')
+        for _ in range(100):
+            if store.stats['audits_written'] == 3:
+                break
+            store._writer.join(0.02)
+        assert store.stats['audits_written'] == 3
+    finally:
+        store.close()
+
+
+def test_close_writes_remaining_records(tmp_path):
+    path = tmp_path / 'supervision.db'
+    store = SQLiteSupervisionStore(str(path), flush_interval=3600)
+    store.record_audit({'feature_name': 'f', 'completion_percentage': 50}, {}, 'completed')
+    store.record_intervention({'issue': 'x', 'feature_name': 'f'})
+    store.close()
+
+    reopened = SQLiteSupervisionStore(str(path), flush_interval=3600)
+    try:
+        assert count(reopened, 'pm_supervision_log') == 1
+        # 未完成的审计由触发器产生一条审计干预，加上直接记录的一条
+        assert count(reopened, 'pm_intervention_required') == 2
+    finally:
+        reopened.close()
+
+
+def test_report_aggregates(store):
+    now = datetime.now()
+    store.record_audit({'feature_name': 'a', 'completion_percentage': 100}, {}, 'completed', timestamp=now)
+    store.record_audit({'feature_name': 'b', 'completion_percentage': 40}, {}, 'completed', timestamp=now)
+    store.record_audit({'feature_name': 'b', 'completion_percentage': 60}, {}, 'completed', timestamp=now)
+    store.record_audit({'feature_name': 'c'}, None, 'failed', timestamp=now)
+    store.record_audit({'feature_name': 'old', 'completion_percentage': 0}, {}, 'completed',
+                       timestamp=now - timedelta(days=10))
+
+    report = store.report()
+    assert report['total_audits'] == 5
+    assert report['audits_by_status'] == {'completed': 4, 'failed': 1}
+    # 没有完成度的失败审计不计入达标率
+    assert report['compliance_rate'] == 25.0
+    # 同一功能的重复未完成审计合并为一条审计干预
+    assert report['open_interventions'] == 2
+    assert report['features_requiring_intervention'] == 2
+
+    recent = store.report(days=3)
+    assert recent['total_audits'] == 4
+    assert recent['compliance_rate'] == round(100 / 3, 2)
+
+    store.record_audit({'feature_name': 'b', 'completion_percentage': 100}, {}, 'completed',
+                       timestamp=now + timedelta(seconds=1))
+    assert store.report()['open_interventions'] == 1
+
+
+def test_completion_is_null_when_not_given_or_invalid(store):
+    store.record_audit({'feature_name': 'a'}, {'issues_found': 0}, 'completed')
+    store.record_audit({'feature_name': 'b', 'completion_percentage': 'abc'}, {}, 'completed')
+    store.record_audit({'feature_name': 'c', 'completion_percentage': '75'}, {}, 'completed')
+    store.flush()
+
+    with sqlite3.connect(str(store.db_path)) as conn:
+        rows = conn.execute("SELECT feature_name, completion_percentage FROM pm_supervision_log "
+                            "ORDER BY feature_name").fetchall()
+    assert rows == [('a', None), ('b', None), ('c', 75)]
+
+
+def test_malformed_payload_does_not_jam_the_buffer(store):
+    store.record_intervention({'issue': {'x': 1}, 'feature': ['f'], 'severity': 3})
+    store.record_audit({'feature_name': {'nested': True}, 'completion_percentage': [1]}, {}, 'completed')
+    store.record_audit({'feature_name': 'ok', 'completion_percentage': 100}, {}, 'completed')
+    store.flush()
+
+    assert store.pending() == 0
+    assert count(store, 'pm_supervision_log') == 2
+    with sqlite3.connect(str(store.db_path)) as conn:
+        issue, feature, severity = conn.execute(
+            "SELECT issue, feature_name, severity FROM pm_intervention_required").fetchone()
+    assert (issue, feature, severity) == ('{"x": 1}', '["f"]', '3')
+
+
+def test_unwritable_row_is_rejected_and_others_are_written(store):
+    # 绕过record_*的类型转换，直接放入一条无法绑定参数的记录
+    store._audits.append(({'bad': 1}, None, [], datetime.now(), 'completed'))
+    store.record_audit({'feature_name': 'ok'}, {}, 'completed')
+    store.flush()
+
+    assert store.stats['rejected'] == 1
+    assert store.stats['audits_written'] == 1
+    assert store.pending() == 0
+    store.record_audit({'feature_name': 'later'}, {}, 'completed')
+    store.flush()
+    assert count(store, 'pm_supervision_log') == 2
+
+
+def test_transient_failure_requeues_the_batch(store, monkeypatch):
+    store.record_audit({'feature_name': 'a'}, {}, 'completed')
+
+    def unavailable(*args):
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(store, '_write_batch', unavailable)
+    store.flush()
+    assert store.pending() == 1 and store.stats['rejected'] == 0
+
+    monkeypatch.undo()
+    store.flush()
+    assert store.pending() == 0 and count(store, 'pm_supervision_log') == 1
+
+
+def test_report_endpoint_reads_the_store(supervisor):
+    client = supervisor.app.test_client()
+    for payload in ({'feature_name': 'a', 'completion_percentage': 100},
+                    {'feature_name': 'b', 'completion_percentage': 20}):
+        assert client.post('/audit', json=payload).status_code == 202
+    supervisor.audit_queue.join()
+    assert client.post('/intervention', json={'issue': {'x': 1}, 'feature': 'f'}).status_code == 200
+
+    report = client.get('/report').get_json()
+    assert report['backend'] == 'sqlite'
+    assert report['total_audits'] == 2
+    assert report['compliance_rate'] == 50.0
+    assert report['interventions'] == 2